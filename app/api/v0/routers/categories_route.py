@@ -7,6 +7,7 @@ from starlette.responses import JSONResponse
 
 from app import constants
 from app.api.v0.routers import limiter
+from app.core import etag
 from app.core.dependencies import get_current_user
 from app.models.categories import CategoriesIn, CategoriesUpdate
 from app.models.user import UserModel
@@ -50,11 +51,12 @@ async def create_new_category(
 
 
 @router.get("/{server_id}")
+@etag.conditional("server:{server_id}", "user:{current_user[id]}")
 async def get_server_categories(
     server_id: str,
     current_user: UserModel = Depends(get_current_user),
 ):
-    """Get all categories for a server, using Redis cache."""
+    """Get the categories of a server the user can see"""
     result = await get_categories(server_id, current_user["id"])
     return result
 
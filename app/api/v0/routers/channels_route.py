@@ -2,13 +2,13 @@ import json
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from redis.asyncio import Redis
 from starlette import status
 from starlette.responses import JSONResponse
 
 from app import constants
 from app.api.v0.routers import limiter
-from app.core.dependencies import get_current_user, get_redis
+from app.core import etag
+from app.core.dependencies import get_current_user
 from app.models.channels import ChannelIn, ChannelOut, ChannelUpdate
 from app.models.user import UserModel
 from app.services.v0.audit_log_service import insert_audit_log
@@ -33,11 +33,10 @@ async def create_new_channel(
     category_id: str,
     channel: ChannelIn,
     current_user: UserModel = Depends(get_current_user),
-    redis: Redis = Depends(get_redis),
 ):
     """Create a new channel"""
     result = await create_channel(
-        server_id=server_id, category_id=category_id, name=channel.name, description=channel.description, redis=redis
+        server_id=server_id, category_id=category_id, name=channel.name, description=channel.description
     )
     if not result:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category does not belong to the server")
@@ -57,9 +56,14 @@ async def create_new_channel(
 
 
 @router.get("/{server_id}/{category_id}")
-async def get_category_channels(server_id: str, category_id: str, redis: Redis = Depends(get_redis)):
+@etag.conditional("server:{server_id}", "user:{current_user[id]}")
+async def get_category_channels(
+    server_id: str,
+    category_id: str,
+    current_user: UserModel = Depends(get_current_user),
+):
     """Get all channels for a category"""
-    result = await get_channels(server_id, category_id, redis)
+    result = await get_channels(server_id, category_id, current_user["id"])
     return result
 
 
@@ -72,7 +76,6 @@ async def update_category_channel(
     channel_id: str,
     channel: ChannelUpdate,
     current_user: UserModel = Depends(get_current_user),
-    redis: Redis = Depends(get_redis),
 ):
     """Update a channel"""
     result = await update_channel(
@@ -81,7 +84,6 @@ async def update_category_channel(
         name=channel.name,
         description=channel.description,
         position=channel.position,
-        redis=redis,
     )
     if result is None:
         raise HTTPException(
@@ -112,12 +114,11 @@ async def delete_channel(
     server_id: str,
     channel_id: str,
     current_user: UserModel = Depends(get_current_user),
-    redis: Redis = Depends(get_redis),
 ):
     """Delete a channel"""
     try:
         channel_name = await ChannelOut.get_channel(channel_id)
-        await del_channel(server_id, channel_id, redis)
+        await del_channel(server_id, channel_id)
 
         await insert_audit_log(
             user_id=current_user["username"],
@@ -1,11 +1,13 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
 from app.api.v0.routers import limiter
-from app.core.dependencies import get_current_user
+from app.core.config import settings
+from app.core.dependencies import get_current_user, query_budget
+from app.core.row_mapping import NDJSON, record_stream_response
 from app.models.friend_requests import FriendRequest
 from app.models.user import UserModel
 from app.services.v0.friend_requests_service import FriendService
@@ -48,39 +50,79 @@ async def cancel_friend_request(friend_id: UUID, current_user: UserModel = Depen
     return result
 
 
-@router.get("/", response_model=List[FriendRequest], status_code=status.HTTP_200_OK)
+@router.get(
+    "/",
+    response_model=List[FriendRequest],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))],
+)
 async def get_friends(
+    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Number of friends per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; supersedes page"),
     search_query: str = Query(None, description="Search Keyword"),
     current_user: UserModel = Depends(get_current_user),
 ):
-    friends = await FriendService.get_all_friends(current_user["id"], search_query, page, per_page)
+    friends, next_cursor = await FriendService.get_all_friends(current_user["id"], search_query, page, per_page, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return friends
 
 
-@router.get("/requests", response_model=List[FriendRequest], status_code=status.HTTP_200_OK)
+@router.get(
+    "/requests",
+    response_model=List[FriendRequest],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))],
+)
 async def get_friend_requests(
+    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Number of friend requests per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; supersedes page"),
     search_query: str = Query(None, description="Search Keyword"),
     current_user: UserModel = Depends(get_current_user),
 ):
-    requests = await FriendService.get_pending_requests(current_user["id"], search_query, page, per_page)
+    requests, next_cursor = await FriendService.get_pending_requests(
+        current_user["id"], search_query, page, per_page, cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return requests
 
 
-@router.get("/blocked", response_model=List[FriendRequest], status_code=status.HTTP_200_OK)
+@router.get(
+    "/blocked",
+    response_model=List[FriendRequest],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))],
+)
 async def get_blocked_friends(
+    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Number of blocked user per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; supersedes page"),
     search_query: str = Query(None, description="Search Keyword"),
     current_user: UserModel = Depends(get_current_user),
 ):
-    blocked = await FriendService.get_blocked_friends(current_user["id"], search_query, page, per_page)
+    blocked, next_cursor = await FriendService.get_blocked_friends(
+        current_user["id"], search_query, page, per_page, cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return blocked
 
 
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_friends(
+    export_format: str = Query(NDJSON, alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """Download the full friends list as NDJSON or CSV"""
+    return record_stream_response(FriendService.stream_friends(current_user["id"]), export_format, "friends")
+
+
 @router.get("/mutual_friends/{user_id}", status_code=status.HTTP_200_OK)
 async def get_mutual_friends(
     user_id: UUID,
@@ -2,10 +2,9 @@ import logging
 
 import asyncpg
 from fastapi import APIRouter, Depends
-from redis import Redis
 from starlette import status
 
-from app.core.dependencies import get_current_user, get_redis
+from app.core.dependencies import get_current_user
 from app.models.server_notifications import BatchNotificationCounterUpdate
 from app.models.user import UserModel
 from app.services.v0.server_notifications_service import (
@@ -23,12 +22,11 @@ log = logging.getLogger("fastapi")
 @router.get("/{server_id}", status_code=status.HTTP_200_OK)
 async def get_notification(
     server_id: str,
-    redis: Redis = Depends(get_redis),
     current_user: UserModel = Depends(get_current_user),
 ):
     """Get Notification Preference for the current user on a specific server"""
 
-    res = await get_notification_preference(redis, current_user["id"], server_id)
+    res = await get_notification_preference(current_user["id"], server_id)
     return {"notification_preference": res}
 
 
@@ -36,12 +34,11 @@ async def get_notification(
 async def notification(
     server_id: str,
     notification_preference: str,
-    redis: Redis = Depends(get_redis),
     current_user: UserModel = Depends(get_current_user),
 ):
     """Update Notification Preference of the user"""
     try:
-        await update_notification_preference(redis, current_user["id"], server_id, notification_preference)
+        await update_notification_preference(current_user["id"], server_id, notification_preference)
         return {"message": "Notification Preference Updated"}
     except asyncpg.InvalidTextRepresentationError:
         return {"error": "Invalid Notification Preference"}
@@ -3,12 +3,12 @@ from uuid import UUID
 
 import asyncpg
 from fastapi import APIRouter, Depends
-from redis import Redis
 from starlette import status
 from starlette.responses import JSONResponse
 
 from app import constants
-from app.core.dependencies import get_current_user, get_redis
+from app.core import etag
+from app.core.dependencies import get_current_user
 from app.models.server_permissions import ServerPermission
 from app.models.server_role_permissions import ServerRolePermission
 from app.models.user import UserModel
@@ -17,18 +17,21 @@ from app.services.v0.permission_service import check_permissions
 from app.services.v0.server_permissions_service import (
     assign_permission_to_user,
     assign_role_to_category,
+    assign_role_to_channel,
     get_permissions,
     remove_permission,
     remove_role_from_category,
+    remove_role_from_channel,
 )
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
 @router.get("")
-async def get_server_permissions(redis: Redis = Depends(get_redis)):
+@etag.conditional("permissions")
+async def get_server_permissions():
     """Get all server permissions"""
-    permissions = await get_permissions(redis)
+    permissions = await get_permissions()
     return {"permissions": [permission for permission in permissions]}
 
 
@@ -103,7 +106,7 @@ async def assign_role_category(
     Assign a role to a category.
     """
     try:
-        result = await assign_role_to_category(category_id, role_id)
+        result = await assign_role_to_category(server_id, category_id, role_id)
         return {"data": result}
     except ValueError as e:
         return {"error": str(e)}
@@ -116,7 +119,35 @@ async def remove_role_category(
 ):
     """Remove role from category"""
     try:
-        await remove_role_from_category(category_id, role_id)
+        await remove_role_from_category(server_id, category_id, role_id)
         return {"message": "Role removed from category permission"}
     except ValueError as e:
         return {"error": str(e)}
+
+
+@router.post("/assign_role_to_channel/{server_id}/{channel_id}/{role_id}", status_code=status.HTTP_200_OK)
+@check_permissions(["MANAGE_SERVER", "MANAGE_CHANNELS", "MANAGE_ROLES", "ADMINISTRATOR"])
+async def assign_role_channel(
+    server_id: str, channel_id: str, role_id: str, current_user: dict = Depends(get_current_user)
+):
+    """
+    Assign a role to a channel.
+    """
+    try:
+        result = await assign_role_to_channel(server_id, channel_id, role_id)
+        return {"data": result}
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@router.post("/remove_role_from_channel/{server_id}/{channel_id}/{role_id}", status_code=status.HTTP_200_OK)
+@check_permissions(["MANAGE_SERVER", "MANAGE_CHANNELS", "MANAGE_ROLES", "ADMINISTRATOR"])
+async def remove_role_channel(
+    server_id: str, channel_id: str, role_id: str, current_user: dict = Depends(get_current_user)
+):
+    """Remove role from channel"""
+    try:
+        await remove_role_from_channel(server_id, channel_id, role_id)
+        return {"message": "Role removed from channel permission"}
+    except ValueError as e:
+        return {"error": str(e)}
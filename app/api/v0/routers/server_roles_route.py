@@ -1,13 +1,16 @@
 import json
+from typing import Optional
 from uuid import UUID
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from starlette import status
 from starlette.responses import JSONResponse
 
 from app import constants
-from app.core.dependencies import get_current_user
+from app.core import etag
+from app.core.config import settings
+from app.core.dependencies import get_current_user, query_budget
 from app.models.server_roles import ServerRolesIn, ServerRolesOut, ServerRoleUpdate
 from app.models.user import UserModel
 from app.services.v0.audit_log_service import insert_audit_log
@@ -64,6 +67,7 @@ async def create_server_role(
 
 @router.get("/{server_id}", status_code=200)
 @check_permissions(["MANAGE_ROLES", "MANAGE_SERVER", "ADMINISTRATOR"])
+@etag.conditional("server:{server_id}")
 async def get_server_role(
     server_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
@@ -76,15 +80,20 @@ async def get_server_role(
     return await get_role(server_id=server_id, page=page, per_page=per_page)
 
 
-@router.get("/users/{role_id}", status_code=200)
+@router.get("/users/{role_id}", status_code=200, dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))])
 async def get_role_users(
+    response: Response,
     role_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Users per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; supersedes page"),
     current_user: UserModel = Depends(get_current_user),
 ):
     """Get all users with a particular role"""
-    return await get_all_role_users(role_id, page, per_page)
+    users, next_cursor = await get_all_role_users(role_id, page, per_page, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
 
 
 @router.patch("/{server_id}/{role_id}", status_code=200)
@@ -101,7 +110,7 @@ async def update_server_role(
     """
     try:
         existing_role = await ServerRolesOut.get_role_by_id(role_id)
-        await update_role(role_id, update_data)
+        await update_role(role_id, update_data, server_id)
         updated_data = await request.json()
         changes = {
             key: {"before": getattr(existing_role, key), "after": value}
@@ -131,7 +140,7 @@ async def delete_server_role(role_id: UUID, server_id: UUID, current_user: UserM
     Delete a server role and clean up related data.
     """
     existing_role = await ServerRolesOut.get_role_by_id(role_id)
-    await delete_role(role_id)
+    await delete_role(role_id, server_id)
     await insert_audit_log(
         user_id=current_user["username"],
         entity="roles",
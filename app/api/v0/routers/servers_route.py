@@ -5,33 +5,44 @@ from typing import List, Optional
 
 import asyncpg
 import requests
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from asyncpg.exceptions import QueryCanceledError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from starlette import status
 from starlette.responses import JSONResponse
 
 from app import constants
 from app.api.v0.routers import limiter
+from app.core import etag
 from app.core.config import settings
-from app.core.dependencies import get_current_user
+from app.core.database import DataBase, QueryTimeoutError
+from app.core.dependencies import db_connection, get_current_user, query_budget
+from app.core.row_mapping import NDJSON, RecordJSONResponse, record_stream_response
 from app.models.server import ServerIn, ServerUpdate
 from app.models.server_members import BanRequest
 from app.models.user import UserModel
 from app.services.v0.audit_log_service import insert_audit_log
-from app.services.v0.permission_service import check_permissions
+from app.services.v0.permission_service import PermissionService, check_permissions
 from app.services.v0.server_service import (
     ban_member_from_server,
+    bootstrap_etag,
+    bootstrap_versions,
     create_server,
     get_all_server_users,
     get_all_user_servers,
     get_audit_logs,
     get_banned_members_list,
     get_mutual_servers,
+    get_server_bootstrap,
     get_server_details_by_id,
+    get_unread_counters,
     get_user_roles_permissions,
     join_server,
     kick_user,
     leave_server,
     regenerate_invite_code,
+    server_updated,
+    stream_audit_logs,
+    stream_server_members,
     unban_member_from_server,
     update_server,
     user_server_count,
@@ -61,10 +72,19 @@ async def create_new_server(
 
 
 @router.get("/user_servers", status_code=status.HTTP_200_OK)
-async def get_user_servers(current_user: UserModel = Depends(get_current_user)):
+@etag.conditional("user:{current_user[id]}")
+async def get_user_servers(
+    permission: Optional[List[str]] = Query(None, description="Annotate each server with has_permission for these"),
+    current_user: UserModel = Depends(get_current_user),
+):
     """Get all servers joined by the user"""
-    servers = await get_all_user_servers(current_user["id"])
-    return {"servers": [server.model_dump() for server in servers]}
+    servers = [server.model_dump() for server in await get_all_user_servers(current_user["id"])]
+    if permission:
+        masks = await PermissionService.servers_permissions(current_user["id"], [server["id"] for server in servers])
+        required = await PermissionService.required_mask(permission)
+        for server in servers:
+            server["has_permission"] = masks.allows(server["id"], required)
+    return {"servers": servers}
 
 
 @router.get("/{server_id}/roles_permissions")
@@ -73,7 +93,37 @@ async def get_server_roles_permissions(server_id: str, current_user: UserModel =
     return roles_permissions
 
 
+@router.get("/{server_id}/bootstrap", status_code=status.HTTP_200_OK)
+async def bootstrap_server(
+    request: Request,
+    server_id: str,
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    The server, the caller's roles, effective permissions, notification preference and unread counters, and the
+    categories the caller can see with their channels nested, in one response. Send the returned ETag back as
+    If-None-Match to get a 304 while nothing changed.
+    """
+    if_none_match = request.headers.get("If-None-Match", "")
+    versions = await bootstrap_versions(server_id, current_user["id"])
+    if versions is not None and if_none_match:
+        # Revalidation costs the counters and one unread-counter query, not a rebuild
+        tag = bootstrap_etag(versions, await get_unread_counters(server_id, current_user["id"]))
+        if etag.matches(if_none_match, tag):
+            headers = {"ETag": tag, "Cache-Control": etag.CACHE_CONTROL}
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    result = await get_server_bootstrap(server_id, current_user["id"], versions)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Server not found")
+    bootstrap, tag = result
+    headers = {"Cache-Control": etag.CACHE_CONTROL}
+    if tag is not None:
+        headers["ETag"] = tag
+    return RecordJSONResponse(bootstrap, headers=headers)
+
+
 @router.get("/{server_id}", status_code=status.HTTP_200_OK)
+@etag.conditional("server:{server_id}")
 async def get_server_by_id(server_id: str):
     """Get server details by ID"""
     # Fetch server details by ID
@@ -95,7 +145,7 @@ async def mutual_server(user_id: str, current_user: UserModel = Depends(get_curr
         return JSONResponse({"error": str(e)}, status_code=status.HTTP_400_BAD_REQUEST)
 
 
-@router.get("/audit_logs/{server_id}")
+@router.get("/audit_logs/{server_id}", dependencies=[Depends(query_budget(settings.DB_TIMEOUT_ADMIN))])
 @check_permissions(["MANAGE_SERVER", "ADMINISTRATOR"])
 async def get_server_audit_logs(
     server_id: str,
@@ -105,14 +155,22 @@ async def get_server_audit_logs(
     action: Optional[str] = Query(None, description="Filter by action performed"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(50, ge=1, le=100, description="Number of items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; supersedes page"),
     current_user: UserModel = Depends(get_current_user),
 ):
     try:
         # Calculate the offset for pagination
         offset = (page - 1) * per_page
-        logs = await get_audit_logs(server_id, start_time, end_time, event_type, action, limit=per_page, offset=offset)
+        logs, next_cursor = await get_audit_logs(
+            server_id, start_time, end_time, event_type, action, limit=per_page, offset=offset, cursor=cursor
+        )
 
-        return {"page": page, "per_page": per_page, "count": len(logs), "logs": logs}
+        return RecordJSONResponse(
+            {"page": page, "per_page": per_page, "count": len(logs), "logs": logs, "next_cursor": next_cursor}
+        )
+    except (HTTPException, QueryTimeoutError, QueryCanceledError):
+        # Budget overruns are answered 503 by the app-wide handler
+        raise
     except Exception as e:
         log.error(e)
         return JSONResponse(
@@ -120,6 +178,22 @@ async def get_server_audit_logs(
         )
 
 
+@router.get("/audit_logs/{server_id}/export")
+@check_permissions(["MANAGE_SERVER", "ADMINISTRATOR"])
+async def export_server_audit_logs(
+    server_id: str,
+    start_time: Optional[datetime] = Query(None, description="Start time for filtering logs"),
+    end_time: Optional[datetime] = Query(None, description="End time for filtering logs"),
+    event_type: Optional[str] = Query(None, description="Filter by event type"),
+    action: Optional[str] = Query(None, description="Filter by action performed"),
+    export_format: str = Query(NDJSON, alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """Download all matching audit logs as NDJSON or CSV"""
+    logs = stream_audit_logs(server_id, start_time, end_time, event_type, action)
+    return record_stream_response(logs, export_format, f"server-{server_id}-audit-logs")
+
+
 @router.post("/join/{invite_link}", status_code=status.HTTP_200_OK)
 async def join_server_via_link(invite_link: str, current_user: UserModel = Depends(get_current_user)):
     """Join a server using an invitation link"""
@@ -161,16 +235,18 @@ async def update_server_by_id(
         if existing_server.get(key) != value
     }
 
-    await update_server(server_id, **update_data)
+    async with DataBase.connection(transaction=True):
+        await update_server(server_id, **update_data)
+        if changes:
+            await insert_audit_log(
+                user_id=current_user["username"],
+                entity="server",
+                entity_id=server_id,
+                action=constants.UPDATE,
+                changes=json.dumps(changes),
+            )
+    await server_updated(server_id, "owner_id" in update_data)
     updated_fields = {key: value for key, value in update_data.items() if value is not None}
-    if changes:
-        await insert_audit_log(
-            user_id=current_user["username"],
-            entity="server",
-            entity_id=server_id,
-            action=constants.UPDATE,
-            changes=json.dumps(changes),
-        )
     return {"message": "Successfully updated server", "server": updated_fields}
 
 
@@ -195,15 +271,21 @@ async def re_generate_invite_code(
     return {"server_id": server_id, "invite_code": response}
 
 
-@router.get("/all_users/{server_id}", status_code=status.HTTP_200_OK)
+@router.get(
+    "/all_users/{server_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))],
+)
 async def get_server_users(
     request: Request,
     server_id: str,
     limit: int = Query(25, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; supersedes offset"),
+    permission: Optional[List[str]] = Query(None, description="Annotate each user with has_permission for these"),
 ):
     """Get paginated list of all users in a server with their online statuses"""
-    users = await get_all_server_users(server_id, limit, offset)
+    users, next_cursor = await get_all_server_users(server_id, limit, offset, cursor)
 
     online_users = {}
     try:
@@ -222,10 +304,27 @@ async def get_server_users(
     for user in users:
         user["status"] = online_users.get(str(user["user_id"]), "offline")
 
-    return {"users": users, "limit": limit, "offset": offset}
+    if permission:
+        masks = await PermissionService.members_permissions(server_id, [user["user_id"] for user in users])
+        required = await PermissionService.required_mask(permission)
+        for user in users:
+            user["has_permission"] = masks.allows(user["user_id"], required)
 
+    return {"users": users, "limit": limit, "offset": offset, "next_cursor": next_cursor}
 
-@router.post("/kick_user/{server_id}", status_code=status.HTTP_200_OK)
+
+@router.get("/all_users/{server_id}/export", status_code=status.HTTP_200_OK)
+@check_permissions(["MANAGE_SERVER", "ADMINISTRATOR"])
+async def export_server_users(
+    server_id: str,
+    export_format: str = Query(NDJSON, alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """Download every member of a server as NDJSON or CSV"""
+    return record_stream_response(stream_server_members(server_id), export_format, f"server-{server_id}-members")
+
+
+@router.post("/kick_user/{server_id}", status_code=status.HTTP_200_OK, dependencies=[Depends(db_connection)])
 @check_permissions(["MANAGE_SERVER", "ADMINISTRATOR", "KICK_MEMBERS", "BAN_MEMBERS"])
 async def kick_server_user(
     request: Request, server_id: str, user_ids: List[str], current_user: UserModel = Depends(get_current_user)
@@ -247,7 +346,7 @@ async def kick_server_user(
     return {"message": "user kicked from server successfully"}
 
 
-@router.post("/ban/{server_id}", status_code=status.HTTP_200_OK)
+@router.post("/ban/{server_id}", status_code=status.HTTP_200_OK, dependencies=[Depends(db_connection)])
 @check_permissions(["MANAGE_SERVER", "ADMINISTRATOR", "KICK_MEMBERS", "BAN_MEMBERS"])
 async def ban_member(
     server_id: str,
@@ -278,7 +377,7 @@ async def ban_member(
         return {"error": str(e)}
 
 
-@router.post("/unban/{server_id}", status_code=status.HTTP_200_OK)
+@router.post("/unban/{server_id}", status_code=status.HTTP_200_OK, dependencies=[Depends(db_connection)])
 @check_permissions(["MANAGE_SERVER", "ADMINISTRATOR", "KICK_MEMBERS", "BAN_MEMBERS"])
 async def unban_member(
     server_id: str,
@@ -306,15 +405,20 @@ async def unban_member(
         )
 
 
-@router.get("/banned/{server_id}")
+@router.get("/banned/{server_id}", dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))])
 @check_permissions(["MANAGE_SERVER", "ADMINISTRATOR", "KICK_MEMBERS", "BAN_MEMBERS"])
 async def banned_members(
     request: Request,
+    response: Response,
     server_id: str,
-    limit: int = Query(25, ge=1, le=100),
-    per_page: int = Query(25, ge=0, le=100),
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; supersedes page"),
     search_query: str = Query(None, description="Search Keyword"),
     current_user: UserModel = Depends(get_current_user),
 ):
     """Get list of banned members in a server"""
-    return await get_banned_members_list(server_id, search_query, limit, per_page)
+    members, next_cursor = await get_banned_members_list(server_id, search_query, page, per_page, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return members
@@ -1,11 +1,10 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from redis import Redis
 from starlette.responses import JSONResponse
 
 from app.core.auth import create_access_token, create_refresh_token, get_password_hash
-from app.core.dependencies import get_current_staff, get_redis
+from app.core.dependencies import get_current_staff
 from app.models.staff.staff import StaffCreate, StaffLogin, StaffOut, StaffUpdate
 from app.services.v0.permission_service import staff_required
 from app.services.v0.staff.staff_service import (
@@ -37,11 +36,10 @@ async def login(staff: StaffLogin):
 @router.get("/", response_model=List[StaffOut])
 @staff_required(["superadmin", "admin"])
 async def list_staff(
-    redis: Redis = Depends(get_redis),
     current_user: StaffOut = Depends(get_current_staff),
 ):
     """List all staff members"""
-    return await get_staff_list(redis)
+    return await get_staff_list()
 
 
 @router.get("/{staff_id}", response_model=StaffOut)
@@ -58,13 +56,12 @@ async def get_staff(
 @staff_required(["superadmin", "admin"])
 async def create_staff(
     staff: StaffCreate,
-    redis: Redis = Depends(get_redis),
     current_user: StaffOut = Depends(get_current_staff),
 ):
     """Create a new staff member"""
     try:
-        staff.password = get_password_hash(staff.password)
-        await create_new_staff(redis, staff)
+        staff.password = await get_password_hash(staff.password)
+        await create_new_staff(staff)
         return staff
     except Exception as e:
         return JSONResponse(status_code=400, content={"detail": str(e)})
@@ -74,12 +71,11 @@ async def create_staff(
 async def update_staff(
     staff_id: str,
     staff: StaffUpdate,
-    redis: Redis = Depends(get_redis),
     current_user: StaffOut = Depends(get_current_staff),
 ):
     try:
         if staff_id == current_user.id or current_user.role in ["superadmin", "admin"]:
-            await update_staff_details(redis, staff_id, staff)
+            await update_staff_details(staff_id, staff)
             return JSONResponse(status_code=200, content={"detail": "Staff member updated successfully"})
         else:
             return JSONResponse(status_code=403, content={"detail": "Insufficient permissions"})
@@ -88,12 +84,10 @@ async def update_staff(
 
 
 @router.delete("/{staff_id}")
-async def delete_staff(
-    staff_id: str, redis: Redis = Depends(get_redis), current_user: StaffOut = Depends(get_current_staff)
-):
+async def delete_staff(staff_id: str, current_user: StaffOut = Depends(get_current_staff)):
     try:
         if staff_id == current_user.id or current_user.role in ["superadmin", "admin"]:
-            await delete_staff_record(redis, staff_id)
+            await delete_staff_record(staff_id)
             return JSONResponse(status_code=200, content={"detail": "Staff member deleted successfully"})
         else:
             return JSONResponse(status_code=403, content={"detail": "Insufficient permissions"})
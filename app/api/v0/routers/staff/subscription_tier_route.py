@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends
-from redis import Redis
 from starlette.responses import JSONResponse
 
-from app.core.dependencies import get_current_staff, get_redis
+from app.core.dependencies import get_current_staff
 from app.models.staff.staff import StaffOut
 from app.models.staff.subscription_tier import (
     SubscriptionTierIn,
@@ -22,11 +21,9 @@ router = APIRouter(dependencies=[Depends(get_current_staff)])
 
 
 @router.get("/tiers")
-async def get_all_tiers(
-    redis: Redis = Depends(get_redis),
-):
+async def get_all_tiers():
     """Get list of all the subscription tiers"""
-    return await get_subscription_tiers(redis)
+    return await get_subscription_tiers()
 
 
 @router.post("/create-tier")
@@ -34,11 +31,10 @@ async def get_all_tiers(
 async def create_tier(
     subscription: SubscriptionTierIn,
     current_user: StaffOut = Depends(get_current_staff),
-    redis: Redis = Depends(get_redis),
 ):
     """Create a new subscription tier"""
     try:
-        res = await create_subscription_product(redis, subscription.name, subscription.description)
+        res = await create_subscription_product(subscription.name, subscription.description)
         await create_subscription_price(res, subscription.price, subscription.currency)
         return JSONResponse({"message": "Tier created successfully"})
     except Exception as e:
@@ -49,12 +45,11 @@ async def create_tier(
 @staff_required(["superadmin", "admin"])
 async def delete_tier(
     product_id: str,
-    redis: Redis = Depends(get_redis),
     current_user: StaffOut = Depends(get_current_staff),
 ):
     """Soft Delete a subscription tier"""
     try:
-        await delete_subscription_product(redis, product_id)
+        await delete_subscription_product(product_id)
         return JSONResponse({"message": "Tier deleted successfully"})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
@@ -64,12 +59,11 @@ async def delete_tier(
 @staff_required(["superadmin", "admin"])
 async def reactivate_tier(
     product_id: str,
-    redis: Redis = Depends(get_redis),
     current_user: StaffOut = Depends(get_current_staff),
 ):
     """Undo Soft Deleting a subscription tier"""
     try:
-        await activate_subscription_product(redis, product_id)
+        await activate_subscription_product(product_id)
         return JSONResponse({"message": "Tier activated successfully"})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
@@ -80,10 +74,9 @@ async def reactivate_tier(
 async def update_subscription(
     tier_id: int,
     tier: SubscriptionTierUpdate,
-    redis: Redis = Depends(get_redis),
     current_user: StaffOut = Depends(get_current_staff),
 ):
     try:
-        return await update_subscription_tier(redis, tier_id, tier)
+        return await update_subscription_tier(tier_id, tier)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
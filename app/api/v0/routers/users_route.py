@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from redis.asyncio import Redis
 from starlette import status
 
+from app.core import revocation, user_cache
 from app.core.auth import (
     create_access_token,
     create_refresh_token,
@@ -14,18 +15,17 @@ from app.core.auth import (
     verify_token,
 )
 from app.core.config import settings
-from app.core.dependencies import get_current_user, get_redis, get_sudo_user
-from app.models.user import (
-    ChangePassword,
-    SudoUserModel,
-    UserIn,
-    UserLogin,
-    UserModel,
-    UserUpdate,
+from app.core.dependencies import (
+    get_current_user,
+    get_redis,
+    get_sudo_user,
+    query_budget,
 )
+from app.models.user import ChangePassword, SudoUserModel, UserIn, UserLogin, UserModel
 from app.services.v0.user_service import (
     authenticate_user,
     register_user,
+    update_user,
     update_user_password,
 )
 
@@ -105,7 +105,7 @@ async def read_users_me(current_user: UserModel = Depends(get_current_user)):
     return current_user
 
 
-@protected_router.get("/search/{query}")
+@protected_router.get("/search/{query}", dependencies=[Depends(query_budget(settings.DB_TIMEOUT_LIST))])
 async def search_user(query: str, current_user: UserModel = Depends(get_current_user)):
     """
     Search for a user
@@ -121,7 +121,7 @@ async def update_current_user(request: Request, current_user: UserModel = Depend
     """
     update_data = await request.json()
     try:
-        user = await UserUpdate.update_user(current_user["id"], **update_data)
+        user = await update_user(current_user["id"], **update_data)
     except asyncpg.UniqueViolationError as e:
         raise HTTPException(status_code=400, detail=e.detail)
     except ValueError as e:
@@ -139,7 +139,7 @@ async def change_user_password(
 ):
     # Verify the current password
     current_user_password = await SudoUserModel.get_user(current_user["id"])
-    if not verify_password(change_password.current_password, current_user_password["password"]):
+    if not await verify_password(change_password.current_password, current_user_password["password"]):
         raise HTTPException(status_code=401, detail="Current password is incorrect.")
     await update_user_password(change_password.new_password, current_user["id"])
 
@@ -152,12 +152,11 @@ async def logout_all(current_user: UserModel = Depends(get_current_user), redis:
     Logout user from all devices
     """
     logout_timestamp = int(datetime.now().timestamp())
-    await redis.set(
-        f"blacklist:access:{current_user["id"]}", logout_timestamp, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    )
+    await revocation.revoke_access(current_user["id"], logout_timestamp)
     await redis.set(
         f"logout_all:{current_user["id"]}", logout_timestamp, settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
     )
+    await user_cache.invalidate(current_user["id"])
     return {"detail": "User logged out from all devices."}
 
 
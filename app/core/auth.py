@@ -1,21 +1,33 @@
+import asyncio
 import datetime
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from typing import Optional
 
 import bcrypt
 import jwt
 from fastapi import HTTPException, status
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
+from app.utils.metrics import (
+    JWT_CACHE_LOOKUPS,
+    JWT_CACHE_SIZE,
+    PASSWORD_HASH_DURATION,
+    PASSWORD_HASH_QUEUE_WAIT,
+    PASSWORD_HASH_QUEUED,
+)
+
+from . import revocation
 from .config import settings
-from .redis import RedisClient
+from .local_cache import LocalTTLCache
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 SUDO_TOKEN_EXPIRE_MINUTES = settings.SUDO_TOKEN_EXPIRE_MINUTES
-redis_client = RedisClient()
 
 
 class TokenData(BaseModel):
@@ -25,14 +37,56 @@ class TokenData(BaseModel):
     type: str
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# bcrypt is deliberately slow and holds no locks Python cares about, so it runs on a dedicated pool instead of the
+# event loop. The semaphore keeps at most PASSWORD_HASH_CONCURRENCY hashes in flight per worker; the rest queue here
+# where their wait is measured, rather than invisibly inside the executor.
+_password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_CONCURRENCY, thread_name_prefix="bcrypt")
+_password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_CONCURRENCY)
+
+
+async def _run_bcrypt(operation: str, func, *args):
+    queued_at = time.perf_counter()
+    PASSWORD_HASH_QUEUED.inc()
+    try:
+        await _password_slots.acquire()
+    finally:
+        PASSWORD_HASH_QUEUED.dec()
+    try:
+        started_at = time.perf_counter()
+        PASSWORD_HASH_QUEUE_WAIT.observe(started_at - queued_at)
+        result = await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+        PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started_at)
+        return result
+    finally:
+        _password_slots.release()
+
+
+def _checkpw(plain_password: str, hashed_password) -> bool:
     if isinstance(hashed_password, str):
         hashed_password = hashed_password.encode("utf-8")
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+def _hashpw(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode()
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bcrypt("verify", _checkpw, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run_bcrypt("hash", _hashpw, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when ``hashed_password`` was made with a cost other than BCRYPT_ROUNDS (``$2b$<cost>$...``)."""
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode()
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
 
 
 def _create_token(data: dict, expire: datetime.datetime, token_type: str) -> str:
@@ -56,15 +110,31 @@ def create_sudo_token(data: dict) -> str:
     return _create_token(data, expire, token_type="sudo")
 
 
+# Validated tokens by SHA-256 of the token string, each expiring at the token's own exp. Only the signature
+# check and parsing are skipped on a hit; the type and revocation checks still run on every request.
+_decoded_tokens = LocalTTLCache(settings.JWT_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _decode_token(token: str) -> TokenData:
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = _decoded_tokens.get(key)
+    if token_data is not None:
+        JWT_CACHE_LOOKUPS.labels(result="hit").inc()
+        return token_data
+    JWT_CACHE_LOOKUPS.labels(result="miss").inc()
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    token_data = TokenData(
+        username=payload.get("sub"), id=payload.get("id"), exp=payload.get("exp"), type=payload.get("type")
+    )
+    _decoded_tokens.set(key, token_data, ttl=token_data.exp - time.time())
+    JWT_CACHE_SIZE.set(len(_decoded_tokens))
+    return token_data
+
+
 async def verify_token(token: str, token_type: Optional[str] = "access") -> TokenData:
-    redis = redis_client.client
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: str = payload.get("id")
-        exp: int = payload.get("exp")
-        jwt_token_type: str = payload.get("type")
-        if user_id is None or payload.get("type") != token_type:
+        token_data = _decode_token(token)
+        if token_data.type != token_type:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
@@ -72,17 +142,17 @@ async def verify_token(token: str, token_type: Optional[str] = "access") -> Toke
 
         # Check if the token is blacklisted
         if token_type == "access":
-            access_revoked_timestamp = await redis.get(f"blacklist:access:{user_id}")
+            access_revoked_timestamp = await revocation.access_revoked_at(token_data.id)
             if access_revoked_timestamp is not None:
-                issuance_time = exp - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-                if issuance_time <= float(access_revoked_timestamp):
+                issuance_time = token_data.exp - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+                if issuance_time <= access_revoked_timestamp:
                     raise HTTPException(
                         status_code=status.HTTP_401_UNAUTHORIZED,
                         detail="Access token has been blacklisted.",
                     )
 
-        return TokenData(username=username, id=user_id, exp=exp, type=jwt_token_type)
-    except jwt.PyJWTError:
+        return token_data
+    except (jwt.PyJWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -0,0 +1,423 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.local_cache import LocalTTLCache
+from app.core.redis import RedisClient
+from app.utils.metrics import CACHE_LATENCY, CACHE_LOCAL_BYTES, CACHE_LOOKUPS
+
+log = logging.getLogger("fastapi")
+redis_client = RedisClient()
+
+# Read-through cache for service results, stored as orjson under cache:{namespace}:{key}. A ``model`` type
+# (e.g. List[ChannelOut]) validates cached JSON back into the same Pydantic objects the loader returned.
+# A loader result of None is cached too, for CACHE_NEGATIVE_TTL, so lookups of missing rows stay off the DB.
+# Misses are single-flight: concurrent misses in a process share one load, and across processes a short
+# Redis lock lets one worker load while the others poll for its value. TTLs are spread by CACHE_TTL_JITTER
+# so entries written together do not expire together. Tags group keys for invalidate_tags; every Redis
+# failure degrades to calling the loader.
+# In front of Redis sits a per-process LRU of the same encoded bytes, bounded by entry count and total size and
+# decoded on every hit so callers never share mutable objects. Invalidations drop entries locally and publish
+# their keys to every process. The LRU is only read while the subscription has been confirmed alive within
+# CACHE_LOCAL_MAX_STALENESS, and it is emptied on every (re)subscribe, so a missed message cannot outlive that.
+# Every key and tag has a generation counter that invalidation advances. A fill notes the generations before
+# loading and writes only if none has moved since, so a value loaded before an invalidation is never stored.
+NEGATIVE = b"null"
+LOCK_POLL_INTERVAL = 0.05
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_MISS = object()
+_release_lock = redis_client.client.register_script(
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+)
+# KEYS: the entry, its generation counters, its tag sets. ARGV: value, ttl, tag ttl, the expected generations.
+_write_unless_invalidated = redis_client.client.register_script(
+    """
+    local generations = #ARGV - 3
+    for i = 1, generations do
+        if (redis.call('GET', KEYS[1 + i]) or '0') ~= ARGV[3 + i] then
+            return 0
+        end
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    for i = 2 + generations, #KEYS do
+        redis.call('SADD', KEYS[i], KEYS[1])
+        redis.call('EXPIRE', KEYS[i], ARGV[3])
+    end
+    return 1
+    """
+)
+_inflight: Dict[str, asyncio.Task] = {}
+local_values = LocalTTLCache(settings.CACHE_LOCAL_SIZE, settings.CACHE_LOCAL_TTL, settings.CACHE_LOCAL_MAX_BYTES)
+_fresh_until = 0.0
+
+
+def _key(namespace: str, key: str) -> str:
+    return f"cache:{namespace}:{key}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"cache:tag:{tag}"
+
+
+def _generation_key(redis_key: str) -> str:
+    return f"{redis_key}:generation"
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if hasattr(value, "items"):
+        # asyncpg Records and other mappings
+        return dict(value.items())
+    return str(value)
+
+
+def encode(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default)
+
+
+def decode(raw, model=None) -> Any:
+    raw = raw.encode() if isinstance(raw, str) else raw
+    if raw == NEGATIVE:
+        return None
+    return orjson.loads(raw) if model is None else _adapter(model).validate_json(raw)
+
+
+def jittered(ttl: float) -> int:
+    spread = ttl * settings.CACHE_TTL_JITTER
+    return max(1, round(ttl + random.uniform(-spread, spread)))
+
+
+def local_fresh() -> bool:
+    """True while the invalidation subscription is known to be alive, i.e. process-local copies may be used."""
+    return time.monotonic() < _fresh_until
+
+
+def _remember(redis_key: str, raw: bytes, ttl: float) -> None:
+    if local_fresh():
+        local_values.set(redis_key, raw, min(ttl, settings.CACHE_LOCAL_TTL))
+        CACHE_LOCAL_BYTES.set(local_values.nbytes)
+
+
+def _forget_local(redis_keys: Iterable[str]) -> None:
+    for redis_key in redis_keys:
+        local_values.pop(redis_key)
+    CACHE_LOCAL_BYTES.set(local_values.nbytes)
+
+
+async def _read(namespace: str, redis_key: str, model):
+    start = time.perf_counter()
+    try:
+        raw = await redis_client.client.get(redis_key)
+    except RedisError as e:
+        log.warning(f"Cache read failed for {redis_key}, falling back to the loader: {e}")
+        return _MISS
+    finally:
+        CACHE_LATENCY.labels(namespace=namespace, operation="read").observe(time.perf_counter() - start)
+    if raw is None:
+        return _MISS
+    raw = raw.encode()
+    try:
+        value = decode(raw, model)
+    except ValueError as e:
+        # Written by an older shape of the model: reload it
+        log.warning(f"Dropping undecodable cache entry {redis_key}: {e}")
+        return _MISS
+    _remember(redis_key, raw, settings.CACHE_LOCAL_TTL)
+    return value
+
+
+def _generation_keys(redis_key: str, tags: List[str]) -> List[str]:
+    return [_generation_key(redis_key)] + [_generation_key(_tag_key(tag)) for tag in tags]
+
+
+async def _generations(redis_key: str, tags: List[str]) -> Optional[List[str]]:
+    """Current generations of ``redis_key`` and its tags, or None when Redis cannot tell."""
+    try:
+        return [raw or "0" for raw in await redis_client.client.mget(_generation_keys(redis_key, tags))]
+    except RedisError as e:
+        log.warning(f"Cache generation read failed for {redis_key}: {e}")
+        return None
+
+
+async def _write(redis_key: str, value, ttl: int, tags: List[str], generations: List[str]) -> None:
+    """Store ``value`` unless ``redis_key`` or one of ``tags`` was invalidated since ``generations`` were read."""
+    raw = encode(value)
+    try:
+        written = await _write_unless_invalidated(
+            keys=[redis_key, *_generation_keys(redis_key, tags), *(_tag_key(tag) for tag in tags)],
+            args=[raw, ttl, settings.CACHE_TAG_TTL, *generations],
+        )
+    except RedisError as e:
+        log.warning(f"Cache write failed for {redis_key}: {e}")
+        return
+    if written:
+        _remember(redis_key, raw, ttl)
+
+
+async def _acquire(lock_key: str, token: str) -> bool:
+    try:
+        return bool(await redis_client.client.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000)))
+    except RedisError as e:
+        log.warning(f"Cache lock failed for {lock_key}, loading without it: {e}")
+        return True
+
+
+async def _fill(namespace: str, redis_key: str, loader, model, ttl: float, negative_ttl: float, tags) -> Any:
+    lock_key, token = f"{redis_key}:lock", uuid.uuid4().hex
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    locked = await _acquire(lock_key, token)
+    while not locked and time.monotonic() < deadline:
+        # Another worker is loading this key; take its value as soon as it lands
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        value = await _read(namespace, redis_key, model)
+        if value is not _MISS:
+            return value
+        locked = await _acquire(lock_key, token)
+    try:
+        if locked:
+            # The previous holder may have written the value between our read and our lock
+            value = await _read(namespace, redis_key, model)
+            if value is not _MISS:
+                return value
+        # Before the load, so an invalidation that lands while it runs is seen by _write
+        generations = await _generations(redis_key, tags)
+        start = time.perf_counter()
+        value = await loader()
+        CACHE_LATENCY.labels(namespace=namespace, operation="load").observe(time.perf_counter() - start)
+        if generations is not None:
+            await _write(redis_key, value, jittered(ttl if value is not None else negative_ttl), tags, generations)
+        return value
+    finally:
+        if locked:
+            try:
+                await _release_lock(keys=[lock_key], args=[token])
+            except RedisError as e:
+                log.warning(f"Cache lock release failed for {lock_key}: {e}")
+
+
+def _hit(value) -> str:
+    return "hit" if value is not None else "negative_hit"
+
+
+def _forget(redis_key: str, task: asyncio.Task) -> None:
+    if _inflight.get(redis_key) is task:
+        del _inflight[redis_key]
+    if not task.cancelled():
+        # Every caller may have been cancelled; mark the outcome as retrieved either way
+        task.exception()
+
+
+async def get_or_load(
+    namespace: str,
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    *,
+    ttl: float,
+    model=None,
+    tags: Iterable[str] = (),
+    negative_ttl: Optional[float] = None,
+) -> Any:
+    """Cached ``await loader()``; ``model`` is the type to validate cached JSON into, ``tags`` as in invalidate_tags."""
+    redis_key = _key(namespace, key)
+    raw = local_values.get(redis_key) if local_fresh() else None
+    if raw is not None:
+        value = decode(raw, model)
+        CACHE_LOOKUPS.labels(namespace=namespace, tier="local", result=_hit(value)).inc()
+        return value
+    value = await _read(namespace, redis_key, model)
+    if value is not _MISS:
+        CACHE_LOOKUPS.labels(namespace=namespace, tier="redis", result=_hit(value)).inc()
+        return value
+
+    task = _inflight.get(redis_key)
+    if task is not None:
+        CACHE_LOOKUPS.labels(namespace=namespace, tier="redis", result="coalesced").inc()
+    else:
+        CACHE_LOOKUPS.labels(namespace=namespace, tier="redis", result="miss").inc()
+        negative_ttl = settings.CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        # A task, not a coroutine, so one cancelled caller does not cancel the load for the others. Its context is
+        # empty rather than a copy of this caller's: the result is shared, so the load must not run on the caller's
+        # scoped connection or transaction, nor inherit its query budget.
+        task = asyncio.create_task(
+            _fill(namespace, redis_key, loader, model, ttl, negative_ttl, list(tags)), context=contextvars.Context()
+        )
+        _inflight[redis_key] = task
+        task.add_done_callback(functools.partial(_forget, redis_key))
+    return await asyncio.shield(task)
+
+
+def cached(namespace: str, *, key: str, ttl: float, model=None, tags: Iterable[str] = (), negative_ttl=None):
+    """
+    Decorator form of get_or_load. ``key`` and each of ``tags`` are format strings over the decorated
+    function's arguments, e.g. ``key="{server_id}:{user_id}"``.
+    """
+    tags = tuple(tags)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            return await get_or_load(
+                namespace,
+                key.format(**arguments),
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                model=model,
+                tags=[tag.format(**arguments) for tag in tags],
+                negative_ttl=negative_ttl,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def _version_key(name: str) -> str:
+    return f"cache:version:{name}"
+
+
+async def versions(names: Sequence[str]) -> Optional[List[int]]:
+    """
+    Current values of the counters ``names``, for building versioned keys: an entry keyed by a version is never
+    invalidated, bump() simply moves readers on to a new key and the old one expires by TTL. Counters missing
+    locally are read with one MGET. None when Redis cannot tell, in which case no versioned entry can be trusted.
+    """
+    redis_keys = [_version_key(name) for name in names]
+    fresh = local_fresh()
+    raws = [local_values.get(redis_key) if fresh else None for redis_key in redis_keys]
+    missing = [position for position, raw in enumerate(raws) if raw is None]
+    if missing:
+        try:
+            fetched = await redis_client.client.mget([redis_keys[position] for position in missing])
+        except RedisError as e:
+            log.warning(f"Cache version read failed for {list(names)}: {e}")
+            return None
+        for position, raw in zip(missing, fetched):
+            raws[position] = (raw or "0").encode()
+            _remember(redis_keys[position], raws[position], settings.CACHE_LOCAL_TTL)
+    return [int(raw) for raw in raws]
+
+
+async def version(name: str) -> Optional[int]:
+    """The single-counter form of versions()."""
+    values = await versions([name])
+    return None if values is None else values[0]
+
+
+async def bump(*names: str) -> None:
+    """Atomically advance the counters ``names`` in Redis and drop their local copies in every process."""
+    if not names:
+        return
+    redis_keys = [_version_key(name) for name in names]
+    _forget_local(redis_keys)
+    try:
+        async with redis_client.client.pipeline(transaction=True) as pipe:
+            for redis_key in redis_keys:
+                pipe.incr(redis_key)
+            pipe.publish(INVALIDATION_CHANNEL, orjson.dumps(redis_keys))
+            await pipe.execute()
+    except RedisError as e:
+        log.error(f"Cache version bump failed for {list(names)}: {e}")
+
+
+def _advance(pipe, redis_key: str) -> None:
+    """Queue a generation bump for ``redis_key`` (an entry or a tag set), so fills already loading it do not write."""
+    pipe.incr(_generation_key(redis_key))
+    pipe.expire(_generation_key(redis_key), settings.CACHE_TAG_TTL)
+
+
+def _drop(redis_keys: List[str], pipe) -> None:
+    """Queue the deletion of ``redis_keys`` on ``pipe`` and tell every process to forget them."""
+    _forget_local(redis_keys)
+    for redis_key in redis_keys:
+        _advance(pipe, redis_key)
+    pipe.delete(*redis_keys)
+    pipe.publish(INVALIDATION_CHANNEL, orjson.dumps(redis_keys))
+
+
+async def invalidate(namespace: str, *keys: str) -> None:
+    """Drop entries of ``namespace`` by key, in Redis and in every process."""
+    if not keys:
+        return
+    try:
+        async with redis_client.client.pipeline(transaction=False) as pipe:
+            _drop([_key(namespace, key) for key in keys], pipe)
+            await pipe.execute()
+    except RedisError as e:
+        log.error(f"Cache invalidation failed for {namespace} {keys}: {e}")
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Drop every entry written with any of ``tags``, whatever its namespace."""
+    try:
+        for tag in tags:
+            # First, so a fill of a key not yet in the set is refused rather than missed
+            async with redis_client.client.pipeline(transaction=False) as pipe:
+                _advance(pipe, _tag_key(tag))
+                await pipe.execute()
+            members = list(await redis_client.client.smembers(_tag_key(tag)))
+            if members:
+                # SREM rather than DEL on the set, so entries tagged while this ran stay reachable
+                async with redis_client.client.pipeline(transaction=False) as pipe:
+                    _drop(members, pipe)
+                    pipe.srem(_tag_key(tag), *members)
+                    await pipe.execute()
+    except RedisError as e:
+        log.error(f"Cache invalidation failed for tags {tags}: {e}")
+
+
+async def listen_for_invalidations() -> None:
+    """Background task: forget entries invalidated by other processes, and keep the local tier fresh."""
+    global _fresh_until
+    poll = min(1.0, settings.CACHE_LOCAL_MAX_STALENESS / 2)
+    while True:
+        pubsub = redis_client.client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Anything cached while unsubscribed may have missed an invalidation
+            local_values.clear()
+            last_seen = time.monotonic()
+            while True:
+                message = await pubsub.get_message(timeout=poll)
+                if message is None:
+                    # Quiet channel: a PING proves the subscription is still alive
+                    await pubsub.ping()
+                else:
+                    last_seen = time.monotonic()
+                    if message["type"] == "message":
+                        _forget_local(orjson.loads(message["data"]))
+                _fresh_until = last_seen + settings.CACHE_LOCAL_MAX_STALENESS
+        except RedisError as e:
+            _fresh_until = 0.0
+            local_values.clear()
+            log.warning(f"Cache invalidation listener disconnected, reading Redis directly: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,57 @@
+from typing import List, Optional
+
+from app.core import cache
+from app.models.channels import CategoryChannels, ChannelOut
+
+# Every category of a server with its channels, loaded by one query and cached once per server; category and
+# channel reads slice it. Entries are keyed by a per-server version that every category or channel write bumps,
+# so a write never races a concurrent fill of the old entry: readers simply move on to the next version.
+# The tree is loaded from the primary: a fill from a lagging replica would pin a stale tree to the new version.
+TTL = 86400
+
+
+def _version_name(server_id: str) -> str:
+    return f"channel_tree:{server_id}"
+
+
+async def version(server_id: str) -> Optional[int]:
+    """Current tree version of ``server_id``; None when Redis cannot tell."""
+    return await cache.version(_version_name(str(server_id)))
+
+
+async def channel_tree(server_id: str) -> List[CategoryChannels]:
+    """Categories of ``server_id`` in position order, each with its channels."""
+    return await channel_tree_at(server_id, await version(server_id))
+
+
+async def channel_tree_at(server_id: str, version: Optional[int]) -> List[CategoryChannels]:
+    """The tree as of ``version`` (from version()), for callers that key their own derived state by it."""
+    server_id = str(server_id)
+    if version is None:
+        return await CategoryChannels.get_channel_tree(server_id)
+    return await cache.get_or_load(
+        "channel_tree",
+        f"{server_id}:{version}",
+        lambda: CategoryChannels.get_channel_tree(server_id),
+        ttl=TTL,
+        model=List[CategoryChannels],
+    )
+
+
+async def category(server_id: str, category_id: str) -> Optional[CategoryChannels]:
+    category_id = str(category_id)
+    for node in await channel_tree(server_id):
+        if str(node.id) == category_id:
+            return node
+    return None
+
+
+async def category_channels(server_id: str, category_id: str) -> List[ChannelOut]:
+    """Channels of one category in position order; empty for a category not in the server."""
+    node = await category(server_id, category_id)
+    return [] if node is None else node.channels
+
+
+async def bump(server_id: str) -> None:
+    """Call after any category or channel write in ``server_id``."""
+    await cache.bump(_version_name(str(server_id)))
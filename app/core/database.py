@@ -1,15 +1,79 @@
 import asyncio
+import itertools
 import logging
 import re
 import time
-from typing import ClassVar, List, Type, TypeVar, Union
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    ClassVar,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from asyncpg import Connection, Pool, Record, connect, create_pool
+from asyncpg.exceptions import InvalidCachedStatementError, QueryCanceledError
+from asyncpg.prepared_stmt import PreparedStatement
 from pydantic import BaseModel
 
+from app.core.config import settings
+from app.core.pool_sizing import AdaptivePoolLimit
+from app.core.query_stats import get_query_stats, observe_query
+from app.core.row_mapping import VALIDATE, map_record, map_records
+from app.utils.metrics import (
+    DB_POOL_ACQUIRE_WAIT,
+    DB_POOL_IDLE,
+    DB_POOL_IN_USE,
+    DB_POOL_LIMIT,
+    DB_POOL_SIZE,
+    DB_ROUTED_QUERIES,
+    PREPARED_STATEMENT_HITS,
+    PREPARED_STATEMENT_MISSES,
+    QUERY_TIMEOUTS,
+    REPLICA_HEALTHY,
+    REPLICA_LAG,
+)
+
 BM = TypeVar("BM", bound="Model")
 log = logging.getLogger("fastapi")
 
+# Values for the ``route`` argument of the DataBase query methods
+PRIMARY = "primary"
+REPLICA = "replica"
+
+# Set once the current request has written, so its later reads see that write (read-your-writes).
+# Every request runs in its own task, so the flag never leaks into other requests.
+_sticky_primary: ContextVar[bool] = ContextVar("db_sticky_primary", default=False)
+# Connection bound to the current request/unit of work by DataBase.connection(); picked up by every query
+_scoped_connection: ContextVar[Optional[Connection]] = ContextVar("db_scoped_connection", default=None)
+# Caps how many pooled connections DataBase.gather may hold at once for the current request
+_gather_semaphore: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("db_gather_semaphore", default=None)
+# Event-loop time by which the current request's queries must finish (see DataBase.set_budget)
+_deadline: ContextVar[Optional[float]] = ContextVar("db_deadline", default=None)
+
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+replica_lag_query = """
+    SELECT CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END::float8
+"""
+
+
+class QueryTimeoutError(asyncio.TimeoutError):
+    """A query outran its timeout or the request's query budget (see DataBase.set_budget)."""
+
 
 class CustomRecord(Record):
     def __getattr__(self, item: str):
@@ -21,40 +85,360 @@ class CustomRecord(Record):
         return super().__getattr__(item)
 
 
+class CustomConnection(Connection):
+    """Pool connection that keeps the registry's prepared statements alive for its lifetime."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: Dict[str, PreparedStatement] = {}
+
+
+class PreparedQuery(str):
+    """SQL text registered under a name; DataBase runs it through a per-connection prepared statement."""
+
+    name: str
+
+    def __new__(cls, name: str, query: str):
+        obj = super().__new__(cls, query)
+        obj.name = name
+        return obj
+
+
+_registry: Dict[str, PreparedQuery] = {}
+
+
+def prepared_query(name: str, query: str) -> PreparedQuery:
+    """Declare a query once by name so it is prepared eagerly on every new pool connection."""
+    existing = _registry.get(name)
+    if existing is not None:
+        if existing != query:
+            raise ValueError(f"Prepared query {name!r} is already registered with different SQL")
+        return existing
+    _registry[name] = PreparedQuery(name, query)
+    return _registry[name]
+
+
 class DataBase(BaseModel):
     pool: ClassVar[Pool] = None
+    # Default record-to-model mapping for this model's fetch/fetchrow (see app.core.row_mapping)
+    row_mapping: ClassVar[str] = VALIDATE
+    replica_pools: ClassVar[List[Pool]] = []
+    healthy_replicas: ClassVar[List[Pool]] = []
+    _replica_cycle: ClassVar[itertools.count] = itertools.count()
+    # In-use limit on the primary pool when adaptive sizing is on (see app.core.pool_sizing)
+    pool_limit: ClassVar[Optional[AdaptivePoolLimit]] = None
 
     @classmethod
     async def create_pool(
         cls,
         uri: str,
         *,
-        min_con: int = 1,
-        max_con: int = 10,
+        min_con: int = None,
+        max_con: int = None,
+        adaptive: bool = None,
         loop: asyncio.AbstractEventLoop = None,
         **kwargs,
     ) -> None:
+        min_con = min_con or settings.DB_POOL_MIN_SIZE
+        max_con = max_con or settings.DB_POOL_MAX_SIZE
+        adaptive = settings.DB_POOL_ADAPTIVE if adaptive is None else adaptive
+        # In adaptive mode the pool may open up to the adaptive ceiling; the limit decides how many are used
+        size = max(max_con, settings.DB_POOL_ADAPTIVE_MAX_SIZE) if adaptive else max_con
+        kwargs.setdefault("max_inactive_connection_lifetime", settings.DB_POOL_MAX_INACTIVE_LIFETIME)
+        kwargs.setdefault("statement_cache_size", settings.DB_STATEMENT_CACHE_SIZE)
+        kwargs.setdefault("max_cached_statement_lifetime", settings.DB_MAX_CACHED_STATEMENT_LIFETIME)
+        kwargs.setdefault("max_cacheable_statement_size", settings.DB_MAX_CACHEABLE_STATEMENT_SIZE)
+        # Ceiling for every query that runs without an explicit timeout or request budget
+        kwargs.setdefault("command_timeout", settings.DB_COMMAND_TIMEOUT)
         try:
             cls.pool = await create_pool(
                 uri,
                 min_size=min_con,
-                max_size=max_con,
+                max_size=size,
                 loop=loop,
                 record_class=CustomRecord,
+                connection_class=CustomConnection,
+                init=cls._prepare_registered_queries if settings.DB_PREPARE_ON_CONNECT else None,
                 **kwargs,
             )
-            log.info(f"Established DB pool with {min_con} - {max_con} connections")
+            log.info(f"Established DB pool with {min_con} - {size} connections")
         except Exception as e:
             log.error(f"DB connection failed due to {e}")
+            return
+        if adaptive:
+            target_wait = settings.DB_POOL_TARGET_ACQUIRE_WAIT_MS / 1000
+            cls.pool_limit = AdaptivePoolLimit(min_con, size, max_con, target_wait)
+        else:
+            cls.pool_limit = None
+
+    @classmethod
+    async def create_replica_pools(cls, uris: List[str], *, min_con: int = None, max_con: int = None, **kwargs) -> None:
+        """Open a pool per read replica; reads are routed to them while they are within the lag budget."""
+        min_con = min_con or settings.DB_POOL_MIN_SIZE
+        max_con = max_con or settings.DB_POOL_MAX_SIZE
+        for uri in uris:
+            try:
+                pool = await create_pool(
+                    uri,
+                    min_size=min_con,
+                    max_size=max_con,
+                    record_class=CustomRecord,
+                    connection_class=CustomConnection,
+                    init=cls._prepare_registered_queries if settings.DB_PREPARE_ON_CONNECT else None,
+                    statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+                    max_cached_statement_lifetime=settings.DB_MAX_CACHED_STATEMENT_LIFETIME,
+                    max_cacheable_statement_size=settings.DB_MAX_CACHEABLE_STATEMENT_SIZE,
+                    max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+                    **kwargs,
+                )
+            except Exception as e:
+                log.error(f"Replica DB connection failed due to {e}")
+                continue
+            cls.replica_pools.append(pool)
+        cls.healthy_replicas = list(cls.replica_pools)
+        if cls.replica_pools:
+            log.info(f"Established {len(cls.replica_pools)} replica DB pool(s)")
+
+    @classmethod
+    async def check_replicas(cls) -> None:
+        """Keep only replicas that answer and whose replay lag is within DB_REPLICA_MAX_LAG_SECONDS."""
+        healthy = []
+        for index, pool in enumerate(cls.replica_pools):
+            try:
+                lag = await pool.fetchval(replica_lag_query, timeout=settings.DB_REPLICA_HEALTH_TIMEOUT)
+            except Exception as e:
+                log.warning(f"Replica {index} failed health check: {e}")
+                REPLICA_HEALTHY.labels(replica=index).set(0)
+                continue
+            REPLICA_LAG.labels(replica=index).set(lag)
+            is_healthy = lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+            REPLICA_HEALTHY.labels(replica=index).set(int(is_healthy))
+            if is_healthy:
+                healthy.append(pool)
+        cls.healthy_replicas = healthy
+
+    @classmethod
+    async def monitor_replicas(cls) -> None:
+        while True:
+            await cls.check_replicas()
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL)
+
+    @classmethod
+    def observe_pools(cls) -> None:
+        """Publish size, idle, in-use and limit gauges for the primary and replica pools."""
+        pools = [(PRIMARY, cls.pool)] + [(f"{REPLICA}{index}", pool) for index, pool in enumerate(cls.replica_pools)]
+        for name, pool in pools:
+            if pool is None:
+                continue
+            size, idle = pool.get_size(), pool.get_idle_size()
+            DB_POOL_SIZE.labels(pool=name).set(size)
+            DB_POOL_IDLE.labels(pool=name).set(idle)
+            DB_POOL_IN_USE.labels(pool=name).set(size - idle)
+            limit = cls.pool_limit.limit if pool is cls.pool and cls.pool_limit is not None else pool.get_max_size()
+            DB_POOL_LIMIT.labels(pool=name).set(limit)
+
+    @classmethod
+    async def monitor_pool(cls) -> None:
+        while True:
+            await asyncio.sleep(settings.DB_POOL_MONITOR_INTERVAL)
+            if cls.pool_limit is not None:
+                previous = cls.pool_limit.limit
+                limit = cls.pool_limit.adjust()
+                if limit != previous:
+                    log.info(f"Adaptive DB pool limit changed from {previous} to {limit}")
+            cls.observe_pools()
+
+    @classmethod
+    @asynccontextmanager
+    async def _acquire(cls, pool: Pool) -> AsyncIterator[Connection]:
+        """Check a connection out of ``pool``, recording the wait and applying the adaptive limit on the primary."""
+        limit = cls.pool_limit if pool is cls.pool else None
+        start_time = time.perf_counter()
+        if limit is not None:
+            await limit.acquire()
+        try:
+            async with pool.acquire() as connection:
+                wait = time.perf_counter() - start_time
+                DB_POOL_ACQUIRE_WAIT.labels(pool=PRIMARY if pool is cls.pool else REPLICA).observe(wait)
+                if limit is not None:
+                    limit.record_wait(wait)
+                yield connection
+        finally:
+            if limit is not None:
+                limit.release()
+
+    @classmethod
+    @asynccontextmanager
+    async def connection(cls, transaction: bool = False) -> AsyncIterator[Connection]:
+        """
+        Bind one primary connection to the current task so every DataBase call inside reuses it.
+        Nested use shares the outer connection; a nested transaction becomes a savepoint.
+        """
+        current = _scoped_connection.get()
+        if current is not None:
+            if transaction:
+                async with current.transaction():
+                    yield current
+            else:
+                yield current
+            return
+
+        async with cls._acquire(cls.pool) as connection:
+            _scoped_connection.set(connection)
+            try:
+                if transaction:
+                    async with connection.transaction():
+                        await cls._limit_transaction(connection)
+                        yield connection
+                else:
+                    yield connection
+            finally:
+                _scoped_connection.set(None)
+
+    @classmethod
+    async def gather(cls, *queries: Awaitable[Any]) -> Tuple[Any, ...]:
+        """
+        Run independent DataBase calls concurrently, each on its own pooled connection (outside any
+        scoped connection/transaction, so only use it for reads). Results come back in order; the
+        first failure cancels the remaining calls and is re-raised.
+        """
+        semaphore = _gather_semaphore.get()
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.DB_GATHER_CONCURRENCY)
+            _gather_semaphore.set(semaphore)
+
+        async def run(query: Awaitable):
+            # Runs in the task's own context copy, so this does not unbind the caller's connection
+            _scoped_connection.set(None)
+            async with semaphore:
+                return await query
+
+        tasks = [asyncio.create_task(run(query)) for query in queries]
+        try:
+            return tuple(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    @staticmethod
+    def set_budget(seconds: Optional[float]) -> None:
+        """
+        Bound the total query time of the rest of the current request; each query gets the remaining
+        budget as its timeout. ``None`` lifts the bound.
+        """
+        _deadline.set(None if seconds is None else asyncio.get_running_loop().time() + seconds)
+
+    @staticmethod
+    def _timeout(timeout: Optional[float]) -> Optional[float]:
+        """Effective timeout for the next query: the per-call timeout capped by the remaining request budget."""
+        deadline = _deadline.get()
+        if deadline is None:
+            return timeout
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise QueryTimeoutError("Query budget exhausted")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    @classmethod
+    async def _limit_transaction(cls, connection: Connection, timeout: float = None) -> None:
+        # asyncpg's timeout cancels from the client; statement_timeout also stops the server on its own
+        timeout = cls._timeout(timeout)
+        if timeout is not None:
+            await connection.execute(f"SET LOCAL statement_timeout = {max(int(timeout * 1000), 1)}")
+
+    @staticmethod
+    def stick_to_primary() -> None:
+        """Route the rest of the current request's reads to the primary."""
+        _sticky_primary.set(True)
+
+    @classmethod
+    def _route(cls, query, route: Optional[str]) -> Pool:
+        """Pick the pool for a query: replicas for reads, the primary for writes and sticky requests."""
+        replicas = cls.healthy_replicas
+        if not replicas:
+            return cls.pool
+        if route != PRIMARY:
+            if get_query_stats(query).writes:
+                # e.g. INSERT ... RETURNING issued through fetchrow
+                if settings.DB_STICKY_PRIMARY_AFTER_WRITE:
+                    _sticky_primary.set(True)
+            elif route == REPLICA or not _sticky_primary.get():
+                DB_ROUTED_QUERIES.labels(target=REPLICA).inc()
+                return replicas[next(cls._replica_cycle) % len(replicas)]
+        DB_ROUTED_QUERIES.labels(target=PRIMARY).inc()
+        return cls.pool
 
     @classmethod
     async def create_connection(cls, uri: str, **kwargs) -> Connection:
         return await connect(uri, **kwargs)
 
     @staticmethod
-    def clean_query(query: str) -> str:
-        # Remove leading/trailing spaces and replace multiple spaces/newlines with a single space
-        return re.sub(r"\s+", " ", query.strip())
+    async def _prepare_registered_queries(connection: CustomConnection) -> None:
+        """Pool ``init`` hook: prepare every registered query on a freshly opened connection."""
+        failed = []
+        for name, query in _registry.items():
+            try:
+                connection.prepared_statements[name] = await connection.prepare(query)
+            except Exception:
+                # e.g. the schema is not migrated yet; the statement is prepared lazily on first use
+                failed.append(name)
+        if failed:
+            log.warning(f"Could not prepare {len(failed)} registered queries on connect: {', '.join(failed)}")
+
+    @staticmethod
+    async def _get_statement(connection: CustomConnection, query: PreparedQuery) -> PreparedStatement:
+        statement = connection.prepared_statements.get(query.name)
+        if statement is not None:
+            PREPARED_STATEMENT_HITS.labels(name=query.name).inc()
+            return statement
+        PREPARED_STATEMENT_MISSES.labels(name=query.name).inc()
+        statement = await connection.prepare(query)
+        connection.prepared_statements[query.name] = statement
+        return statement
+
+    @classmethod
+    async def _run_prepared(cls, connection: CustomConnection, method: str, query: PreparedQuery, args, **kwargs):
+        statement = await cls._get_statement(connection, query)
+        try:
+            return await getattr(statement, method)(*args, **kwargs)
+        except InvalidCachedStatementError:
+            # The schema changed under the statement; re-prepare once and retry
+            connection.prepared_statements.pop(query.name, None)
+            statement = await cls._get_statement(connection, query)
+            return await getattr(statement, method)(*args, **kwargs)
+
+    @classmethod
+    async def _run(
+        cls,
+        method: str,
+        query,
+        args,
+        con: Union[Connection, Pool] = None,
+        route: str = None,
+        timeout: float = None,
+        **kwargs,
+    ):
+        try:
+            kwargs["timeout"] = cls._timeout(timeout)
+            return await cls._dispatch(
+                method, query, args, con or _scoped_connection.get() or cls._route(query, route), **kwargs
+            )
+        except (asyncio.TimeoutError, QueryCanceledError) as e:
+            QUERY_TIMEOUTS.labels(fingerprint=get_query_stats(query).fingerprint).inc()
+            if isinstance(e, asyncio.TimeoutError) and not isinstance(e, QueryTimeoutError):
+                raise QueryTimeoutError("Query timed out") from e
+            raise
+
+    @classmethod
+    async def _dispatch(cls, method: str, query, args, con: Union[Connection, Pool], **kwargs):
+        if isinstance(con, Pool):
+            async with cls._acquire(con) as connection:
+                return await cls._dispatch(method, query, args, connection, **kwargs)
+        if not isinstance(query, PreparedQuery) or method == "execute":
+            return await getattr(con, method)(query, *args, **kwargs)
+        return await cls._run_prepared(con, method, query, args, **kwargs)
 
     @classmethod
     async def fetch(
@@ -63,17 +447,16 @@ class DataBase(BaseModel):
         *args,
         con: Union[Connection, Pool] = None,
         convert: bool = True,
+        route: str = None,
+        mapping: str = None,
+        timeout: float = None,
     ) -> Union[List[BM], List[Record]]:
-        if con is None:
-            con = cls.pool
         start_time = time.perf_counter()
-        records = await con.fetch(query, *args)
-        duration = time.perf_counter() - start_time
-        cleaned_query = cls.clean_query(query)
-        log.info(f"Running query: {cleaned_query} with args: {args} ({duration:.6f} seconds)")
+        records = await cls._run("fetch", query, args, con, route, timeout)
+        observe_query(query, args, time.perf_counter() - start_time, len(records))
         if cls is DataBase or convert is False:
             return records
-        return [cls(**record) for record in records]
+        return map_records(cls, records, mapping or cls.row_mapping)
 
     @classmethod
     async def fetchrow(
@@ -82,43 +465,161 @@ class DataBase(BaseModel):
         *args,
         con: Union[Connection, Pool] = None,
         convert: bool = True,
+        route: str = None,
+        mapping: str = None,
+        timeout: float = None,
     ) -> Union[BM, Record, None]:
-        con = con or cls.pool
         start_time = time.perf_counter()
-        async with con.acquire() as connection:
-            record = await connection.fetchrow(query, *args)
-        duration = time.perf_counter() - start_time
-        cleaned_query = cls.clean_query(query)
-        log.info(f"Running query: {cleaned_query} with args: {args} ({duration:.6f} seconds)")
+        record = await cls._run("fetchrow", query, args, con, route, timeout)
+        observe_query(query, args, time.perf_counter() - start_time, 0 if record is None else 1)
         if cls is DataBase or record is None or convert is False:
             return record
-        return cls(**record)
+        return map_record(cls, record, mapping or cls.row_mapping)
 
     @classmethod
-    async def fetchval(cls, query, *args, con: Union[Connection, Pool] = None, column: int = 0):
-        if con is None:
-            con = cls.pool
+    async def fetchval(
+        cls,
+        query,
+        *args,
+        con: Union[Connection, Pool] = None,
+        column: int = 0,
+        route: str = None,
+        timeout: float = None,
+    ):
         start_time = time.perf_counter()
-        result = await con.fetchval(query, *args, column=column)
-        duration = time.perf_counter() - start_time
-        cleaned_query = cls.clean_query(query)
-        log.info(f"Running query: {cleaned_query} with args: {args} ({duration:.6f} seconds)")
+        result = await cls._run("fetchval", query, args, con, route, timeout, column=column)
+        observe_query(query, args, time.perf_counter() - start_time)
         return result
 
     @classmethod
-    async def execute(cls, query: str, *args, con: Union[Connection, Pool] = None) -> str:
-        if con is None:
-            con = cls.pool
+    async def execute(cls, query: str, *args, con: Union[Connection, Pool] = None, timeout: float = None) -> str:
         start_time = time.perf_counter()
-        result = await con.execute(query, *args)
-        duration = time.perf_counter() - start_time
-        cleaned_query = cls.clean_query(query)
-        log.info(f"Running query: {cleaned_query} with args: {args} ({duration:.6f} seconds)")
+        result = await cls._run("execute", query, args, con, PRIMARY, timeout)
+        if settings.DB_STICKY_PRIMARY_AFTER_WRITE:
+            _sticky_primary.set(True)
+        observe_query(query, args, time.perf_counter() - start_time)
         return result
 
+    @classmethod
+    @asynccontextmanager
+    async def _read_transaction(cls, query, route: Optional[str], timeout: float = None) -> AsyncIterator[Connection]:
+        """Connection inside a transaction for server-side cursors: the scoped one if any, else a routed one."""
+        scoped = _scoped_connection.get()
+        if scoped is not None and scoped.is_in_transaction():
+            yield scoped
+            return
+        if scoped is not None:
+            async with scoped.transaction(readonly=True):
+                await cls._limit_transaction(scoped, timeout)
+                yield scoped
+            return
+        async with cls._acquire(cls._route(query, route)) as connection:
+            async with connection.transaction(readonly=True):
+                await cls._limit_transaction(connection, timeout)
+                yield connection
+
+    @classmethod
+    async def stream(
+        cls: Type[BM],
+        query,
+        *args,
+        batch_size: int = 500,
+        convert: bool = True,
+        route: str = None,
+        mapping: str = None,
+        timeout: float = None,
+    ) -> AsyncIterator[Union[BM, Record]]:
+        """
+        Iterate over a read query through a server-side cursor, fetching ``batch_size`` rows per round trip,
+        so memory stays flat however large the result is. The connection is held until iteration ends or the
+        iterator is closed. ``timeout`` bounds each round trip rather than the whole stream, so a long export
+        keeps going as long as every batch arrives in time.
+        """
+        mapping = mapping or cls.row_mapping
+        model = None if cls is DataBase or convert is False else cls
+        rows = 0
+        start_time = time.perf_counter()
+        try:
+            async with cls._read_transaction(query, route, timeout) as connection:
+                cursor = connection.cursor(query, *args, prefetch=batch_size, timeout=cls._timeout(timeout))
+                async for record in cursor:
+                    rows += 1
+                    yield record if model is None else map_record(model, record, mapping)
+        finally:
+            observe_query(query, args, time.perf_counter() - start_time, rows)
+
+    @staticmethod
+    def _identifiers(*names: str) -> None:
+        # Table and column names are interpolated into COPY/merge SQL, so only plain identifiers are allowed
+        for name in names:
+            if not IDENTIFIER.match(name):
+                raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+    @classmethod
+    async def copy_records(
+        cls, table: str, columns: List[str], records: Iterable[tuple], con: Union[Connection, Pool] = None
+    ) -> str:
+        """Bulk insert rows with the binary COPY protocol (no bind-parameter limit, no per-batch planning)."""
+        cls._identifiers(table, *columns)
+        con = con or _scoped_connection.get()
+        if con is None or isinstance(con, Pool):
+            async with cls._acquire(con or cls.pool) as connection:
+                return await cls.copy_records(table, columns, records, con=connection)
+        query = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+        start_time = time.perf_counter()
+        result = await con.copy_records_to_table(table, records=records, columns=columns, timeout=cls._timeout(None))
+        observe_query(query, (), time.perf_counter() - start_time)
+        if settings.DB_STICKY_PRIMARY_AFTER_WRITE:
+            _sticky_primary.set(True)
+        return result
+
+    @classmethod
+    async def copy_upsert(
+        cls,
+        table: str,
+        columns: List[str],
+        records: Iterable[tuple],
+        conflict_columns: List[str],
+        update: Dict[str, str] = None,
+    ) -> str:
+        """
+        COPY rows into a temporary staging table and merge them into ``table`` with a single
+        INSERT ... ON CONFLICT. ``update`` maps columns to SQL expressions for DO UPDATE SET
+        (``EXCLUDED.<column>`` refers to the incoming row); without it conflicting rows are skipped.
+        Rows in one batch must not share a conflict key.
+        """
+        cls._identifiers(table, *columns, *conflict_columns, *(update or {}))
+        staging = f"copy_staging_{table}"
+        column_list = ", ".join(columns)
+        if update:
+            on_conflict = "DO UPDATE SET " + ", ".join(f"{column} = {expr}" for column, expr in update.items())
+        else:
+            on_conflict = "DO NOTHING"
+
+        async with cls.connection(transaction=True) as connection:
+            # A second call in the same outer transaction still has the previous staging table; pg_temp makes sure
+            # only a temp table is dropped, never a permanent table that happens to share the name
+            await cls.execute(f"DROP TABLE IF EXISTS pg_temp.{staging}")
+            await cls.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA"
+            )
+            await cls.copy_records(staging, columns, records, con=connection)
+            return await cls.execute(
+                f"""
+                INSERT INTO {table} ({column_list})
+                     SELECT {column_list} FROM {staging}
+                ON CONFLICT ({', '.join(conflict_columns)}) {on_conflict}
+                """
+            )
+
     @classmethod
     async def close_pool(cls) -> None:
         if cls.pool is not None:
             await cls.pool.close()
             cls.pool = None
+            cls.pool_limit = None
             log.info("Closed the database connection pool\n")
+        for pool in cls.replica_pools:
+            await pool.close()
+        cls.replica_pools = []
+        cls.healthy_replicas = []
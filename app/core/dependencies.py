@@ -1,10 +1,14 @@
-from fastapi import Depends, HTTPException
+import asyncio
+
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from redis.asyncio import Redis
 from starlette import status
 
+from app.core import user_cache
 from app.core.auth import verify_token
+from app.core.database import DataBase
 from app.core.redis import RedisClient
 from app.models.staff.staff import StaffOut
 from app.models.user import UserModel
@@ -22,7 +26,7 @@ credentials_exception = HTTPException(
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         token_data = await verify_token(token)
-        user = await UserModel.get_user(token_data.id)
+        user = await user_cache.get_user(token_data.id)
         if user is None:
             raise credentials_exception
         return user
@@ -59,5 +63,51 @@ async def get_current_staff(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
 
 
+async def db_connection():
+    """Serve the whole request from a single pooled connection."""
+    async with DataBase.connection() as connection:
+        yield connection
+
+
+async def db_transaction():
+    """Serve the whole request from a single pooled connection inside one transaction."""
+    async with DataBase.connection(transaction=True) as connection:
+        yield connection
+
+
+async def _watch_disconnect(request: Request, task: asyncio.Task, disconnected: asyncio.Event):
+    # Cache the body first so the endpoint can still read it, then wait for the client to go away
+    await request.body()
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    disconnected.set()
+    task.cancel()
+
+
+def query_budget(seconds: float):
+    """
+    Route dependency capping the request's total query time at ``seconds`` (see DataBase.set_budget).
+    If the client disconnects first, the in-flight query is cancelled and the request is abandoned.
+    """
+
+    async def dependency(request: Request):
+        DataBase.set_budget(seconds)
+        task = asyncio.current_task()
+        disconnected = asyncio.Event()
+        watcher = asyncio.create_task(_watch_disconnect(request, task, disconnected))
+        try:
+            yield
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+            task.uncancel()
+            raise HTTPException(status_code=499, detail="Client closed request")
+        finally:
+            watcher.cancel()
+            DataBase.set_budget(None)
+
+    return dependency
+
+
 async def get_redis() -> Redis:
     return redis_client.client
@@ -0,0 +1,115 @@
+import functools
+import hashlib
+import inspect
+from typing import Iterable, List, Optional
+
+from fastapi import Request, Response
+from starlette import status
+
+from app.core import cache
+from app.core.database import DataBase, prepared_query
+from app.utils.metrics import CONDITIONAL_REQUESTS
+
+# Conditional GETs from version counters kept in Redis (see cache.versions): one per server, one per user and
+# a few global ones. Mutations bump the counters whose readers they change; a read route declares the counters
+# its response depends on with @conditional, and its ETag is derived from their values, the route and the
+# query string. A matching If-None-Match is answered 304 before the endpoint runs, so no database query and no
+# serialization happen; with the local cache tier live, not even Redis is asked.
+CACHE_CONTROL = "private, no-cache"
+
+server_member_ids_query = prepared_query(
+    "etag.server_members", "SELECT user_id FROM server_members WHERE server_id = $1 AND deleted_at IS NULL"
+)
+
+
+def _counter(scope: str) -> str:
+    return f"etag:{scope}"
+
+
+async def bump(*scopes: str) -> None:
+    await cache.bump(*(_counter(scope) for scope in scopes))
+
+
+async def bump_server(server_id) -> None:
+    """Call after any change to what members read about ``server_id``."""
+    await bump(f"server:{server_id}")
+
+
+async def bump_users(*user_ids) -> None:
+    """Call after a change to a user's own view: server list, roles, direct permissions."""
+    await bump(*(f"user:{user_id}" for user_id in user_ids))
+
+
+async def server_member_ids(server_id) -> List[str]:
+    return [str(record["user_id"]) for record in await DataBase.fetch(server_member_ids_query, server_id)]
+
+
+async def bump_server_members(server_id, user_ids: Optional[Iterable] = None) -> None:
+    """
+    Bump the server and every member (or ``user_ids``, when the members were read before they changed), for
+    changes that reach each member's server list or permissions.
+    """
+    if user_ids is None:
+        user_ids = await server_member_ids(server_id)
+    await bump(f"server:{server_id}", *(f"user:{user_id}" for user_id in user_ids))
+
+
+async def versions(*scopes: str) -> Optional[List[int]]:
+    """Values of the counters of ``scopes``, for routes that build their own ETag; None when Redis cannot tell."""
+    return await cache.versions([_counter(scope) for scope in scopes])
+
+
+def matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header (a list, possibly of weak validators) names ``etag``."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def conditional(*scopes: str):
+    """
+    Route decorator adding ETag / If-None-Match support. ``scopes`` are format strings over the route's
+    arguments naming the counters the response depends on, e.g. ``"server:{server_id}"`` or
+    ``"user:{current_user[id]}"``. Place it below any permission-checking decorator.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, _etag_request: Request, _etag_response: Response, **kwargs):
+            route = _etag_request.scope.get("route")
+            endpoint = route.path if route is not None else func.__name__
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            names = [scope.format(**arguments) for scope in scopes]
+            values = await versions(*names)
+            if values is None:
+                CONDITIONAL_REQUESTS.labels(endpoint=endpoint, result="uncacheable").inc()
+                return await func(*args, **kwargs)
+
+            fingerprint = "\n".join([endpoint, _etag_request.url.path, _etag_request.url.query, *names])
+            digest = hashlib.sha256(f"{fingerprint}\n{values}".encode()).hexdigest()[:20]
+            etag = f'W/"{digest}"'
+            headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+            if matches(_etag_request.headers.get("If-None-Match", ""), etag):
+                CONDITIONAL_REQUESTS.labels(endpoint=endpoint, result="not_modified").inc()
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            CONDITIONAL_REQUESTS.labels(endpoint=endpoint, result="modified").inc()
+            result = await func(*args, **kwargs)
+            if not isinstance(result, Response):
+                _etag_response.headers.update(headers)
+            elif 200 <= result.status_code < 300:
+                result.headers.update(headers)
+            # Errors get no validator, so they can never be revalidated into a 304
+            return result
+
+        extra = [
+            inspect.Parameter("_etag_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter("_etag_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ]
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+        return wrapper
+
+    return decorator
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LocalTTLCache:
+    """
+    Bounded in-process LRU whose entries also expire ``ttl`` seconds after they were stored. With ``maxbytes``
+    the values must be bytes, and the least recently used entries are also evicted to keep their total length
+    within it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def _weigh(self, value: Any) -> int:
+        return 0 if self.maxbytes is None else len(value)
+
+    def _drop(self, key: Hashable) -> None:
+        _, value = self._data.pop(key)
+        self.nbytes -= self._weigh(value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value``; ``ttl`` overrides the cache-wide lifetime for this entry."""
+        size = self._weigh(value)
+        if key in self._data:
+            self._drop(key)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.nbytes += size
+        while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+            self._drop(next(iter(self._data)))
+
+    def pop(self, key: Hashable) -> None:
+        if key in self._data:
+            self._drop(key)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every entry whose key matches ``predicate``."""
+        for key in [key for key in self._data if predicate(key)]:
+            self._drop(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.nbytes = 0
@@ -0,0 +1,78 @@
+import base64
+import binascii
+import hashlib
+import hmac
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+from uuid import UUID
+
+import orjson
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+# Keyset ("seek") pagination: instead of OFFSET, each page resumes after the (sort key, tiebreaker) of the
+# previous page's last row, e.g. ``WHERE ($n IS NULL OR (joined_at, user_id) < ($n, $m)) ORDER BY joined_at DESC,
+# user_id DESC``. Cursors are opaque to clients and signed so they cannot be forged or replayed across endpoints.
+
+_CURSOR_KEY = hashlib.sha256(b"cursor:" + settings.SECRET_KEY.encode()).digest()
+_SIGNATURE_SIZE = 16
+
+
+def _encode_value(value: Any) -> list:
+    if isinstance(value, datetime):
+        return ["d", value.isoformat()]
+    if isinstance(value, UUID):
+        return ["u", str(value)]
+    return ["v", value]
+
+
+def _decode_value(value: list) -> Any:
+    tag, raw = value
+    if tag == "d":
+        return datetime.fromisoformat(raw)
+    if tag == "u":
+        return UUID(raw)
+    return raw
+
+
+def _sign(scope: str, payload: bytes) -> bytes:
+    return hmac.new(_CURSOR_KEY, scope.encode() + b"\x00" + payload, hashlib.sha256).digest()[:_SIGNATURE_SIZE]
+
+
+def encode_cursor(scope: str, values: Sequence[Any]) -> str:
+    """Encode the keyset values of a row into a signed cursor valid only for ``scope``."""
+    payload = orjson.dumps([_encode_value(value) for value in values])
+    return base64.urlsafe_b64encode(_sign(scope, payload) + payload).rstrip(b"=").decode()
+
+
+def decode_cursor(scope: str, cursor: Optional[str], size: int) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by encode_cursor for the same scope. A missing cursor decodes to ``size`` Nones
+    so queries can use ``$n IS NULL`` to start from the first page.
+    """
+    if not cursor:
+        return (None,) * size
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        signature, payload = raw[:_SIGNATURE_SIZE], raw[_SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, _sign(scope, payload)):
+            raise ValueError("Bad signature")
+        values = tuple(_decode_value(value) for value in orjson.loads(payload))
+    except (ValueError, TypeError, binascii.Error, orjson.JSONDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if len(values) != size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def paginate(scope: str, records: Sequence, limit: int, keys: Sequence[str]) -> Tuple[list, Optional[str]]:
+    """
+    Trim a result fetched with ``LIMIT limit + 1`` to one page. The extra row only signals that another page
+    exists; next_cursor points after the last row returned and is None on the final page.
+    """
+    if len(records) <= limit:
+        return list(records), None
+    page = list(records[:limit])
+    last = page[-1]
+    return page, encode_cursor(scope, [last[key] for key in keys])
@@ -0,0 +1,279 @@
+import hashlib
+import logging
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core import cache
+from app.core.config import settings
+from app.core.database import PRIMARY, DataBase, prepared_query
+from app.core.local_cache import LocalTTLCache
+from app.core.redis import RedisClient
+from app.utils.metrics import PERMISSION_CACHE_LOOKUPS
+
+log = logging.getLogger("fastapi")
+redis_client = RedisClient()
+
+# Every permission name maps to one bit, and a user's effective permissions in a server compile to the OR of
+# the bits granted by their roles and direct grants; server owners get OWNER, which passes every check.
+# Masks are cached per process and in a Redis hash per server. The hash key carries a digest of the bit layout
+# so processes that loaded different permission sets never read each other's masks, and a per-server version
+# (see cache.version) that the invalidate_* helpers bump; local copies remember the version they belong to.
+# A compile that raced an invalidation therefore stores its mask under the old version, which no reader asks
+# for any more. Compiles read from the primary, so a lagging replica cannot put a revoked mask back either.
+OWNER = -1
+
+permission_names_query = prepared_query(
+    "permission.names", "SELECT name FROM server_permissions WHERE name != 'OWNER' ORDER BY name"
+)
+effective_permissions_query = prepared_query(
+    "permission.effective",
+    """
+        SELECT EXISTS (SELECT 1 FROM servers WHERE id = $2 AND owner_id = $1) AS is_owner,
+               ARRAY(
+                   SELECT sp.name
+                     FROM server_user_roles sur
+                     JOIN server_roles sr ON sr.id = sur.role_id
+                     JOIN server_role_permissions srp ON srp.role_id = sr.id
+                     JOIN server_permissions sp ON sp.id = srp.permission_id
+                    WHERE sur.user_id = $1
+                      AND sr.server_id = $2
+                    UNION
+                   SELECT sp.name
+                     FROM server_user_permissions sup
+                     JOIN server_permissions sp ON sp.id = sup.permission_id
+                    WHERE sup.server_id = $2
+                      AND sup.user_id = $1
+               ) AS permissions
+    """,
+)
+# The same compilation for many (user, server) pairs at once, one correlated row per pair
+effective_permissions_batch_query = prepared_query(
+    "permission.effective_batch",
+    """
+        SELECT p.user_id, p.server_id,
+               EXISTS (SELECT 1 FROM servers s WHERE s.id = p.server_id AND s.owner_id = p.user_id) AS is_owner,
+               ARRAY(
+                   SELECT sp.name
+                     FROM server_user_roles sur
+                     JOIN server_roles sr ON sr.id = sur.role_id
+                     JOIN server_role_permissions srp ON srp.role_id = sr.id
+                     JOIN server_permissions sp ON sp.id = srp.permission_id
+                    WHERE sur.user_id = p.user_id
+                      AND sr.server_id = p.server_id
+                    UNION
+                   SELECT sp.name
+                     FROM server_user_permissions sup
+                     JOIN server_permissions sp ON sp.id = sup.permission_id
+                    WHERE sup.server_id = p.server_id
+                      AND sup.user_id = p.user_id
+               ) AS permissions
+          FROM unnest($1::uuid[], $2::uuid[]) AS p(user_id, server_id)
+    """,
+)
+_bits: Dict[str, int] = {}
+_layout = ""
+_loaded_at = float("-inf")
+# (server_id, user_id) -> (version, mask)
+local_masks = LocalTTLCache(settings.PERMISSION_CACHE_LOCAL_SIZE, settings.PERMISSION_CACHE_LOCAL_TTL)
+
+
+def _version_name(server_id: str) -> str:
+    return f"permissions:{server_id}"
+
+
+def _redis_key(server_id: str, version: int) -> str:
+    return f"permissions:{_layout}:{server_id}:{version}"
+
+
+def _store(pipe, server_id: str, version: int, user_id: str, mask: int) -> None:
+    pipe.hset(_redis_key(server_id, version), user_id, mask)
+    # NX: later fills do not extend the hash's life, so it still expires PERMISSION_CACHE_TTL after the first
+    pipe.expire(_redis_key(server_id, version), settings.PERMISSION_CACHE_TTL, nx=True)
+
+
+async def _load_bits(force: bool = False) -> None:
+    """(Re)build the name-to-bit table; a forced reload is rate limited so unknown names cannot hammer the DB."""
+    global _bits, _layout, _loaded_at
+    if _layout and (not force or time.monotonic() - _loaded_at < settings.PERMISSION_BITS_RELOAD_INTERVAL):
+        return
+    names = [record["name"] for record in await DataBase.fetch(permission_names_query, route=PRIMARY)]
+    if not _layout or names != list(_bits):
+        _bits = {name: 1 << position for position, name in enumerate(names)}
+        _layout = hashlib.sha256("\n".join(names).encode()).hexdigest()[:12]
+        local_masks.clear()
+    _loaded_at = time.monotonic()
+
+
+async def permission_mask(names: Iterable[str]) -> int:
+    """OR of the bits for ``names``; names that are not permissions contribute nothing."""
+    await _load_bits()
+    names = list(names)
+    if any(name not in _bits for name in names):
+        await _load_bits(force=True)
+    mask = 0
+    for name in names:
+        mask |= _bits.get(name, 0)
+    return mask
+
+
+async def permission_names(mask: int) -> List[str]:
+    """Names of the permissions set in ``mask``; OWNER expands to every permission."""
+    await _load_bits()
+    return [name for name, bit in _bits.items() if mask == OWNER or mask & bit]
+
+
+async def _compile(user_id: str, server_id: str) -> int:
+    record = await DataBase.fetchrow(
+        effective_permissions_query, user_id, server_id, route=PRIMARY, timeout=settings.DB_TIMEOUT_AUTH
+    )
+    if record["is_owner"]:
+        return OWNER
+    return await permission_mask(record["permissions"])
+
+
+def _local_mask(pair: Tuple[str, str], version: int) -> Optional[int]:
+    entry = local_masks.get(pair)
+    return entry[1] if entry is not None and entry[0] == version else None
+
+
+async def effective_permissions(user_id: str, server_id: str) -> int:
+    """Bitmask of everything ``user_id`` may do in ``server_id``, or OWNER."""
+    await _load_bits()
+    user_id, server_id = str(user_id), str(server_id)
+    version = await cache.version(_version_name(server_id))
+    if version is None:
+        # Without a version nothing would tell us the mask was revoked
+        return await _compile(user_id, server_id)
+    key = (server_id, user_id)
+    mask = _local_mask(key, version)
+    if mask is not None:
+        PERMISSION_CACHE_LOOKUPS.labels(tier="local", result="hit").inc()
+        return mask
+    PERMISSION_CACHE_LOOKUPS.labels(tier="local", result="miss").inc()
+
+    try:
+        raw = await redis_client.client.hget(_redis_key(server_id, version), user_id)
+    except RedisError as e:
+        log.warning(f"Permission cache read failed, falling back to the database: {e}")
+        raw = None
+    if raw is not None:
+        PERMISSION_CACHE_LOOKUPS.labels(tier="redis", result="hit").inc()
+        mask = int(raw)
+    else:
+        PERMISSION_CACHE_LOOKUPS.labels(tier="redis", result="miss").inc()
+        mask = await _compile(user_id, server_id)
+        try:
+            async with redis_client.client.pipeline(transaction=False) as pipe:
+                _store(pipe, server_id, version, user_id, mask)
+                await pipe.execute()
+        except RedisError as e:
+            log.warning(f"Permission cache write failed: {e}")
+    local_masks.set(key, (version, mask))
+    return mask
+
+
+async def has_any(user_id: str, server_id: str, names: Iterable[str]) -> bool:
+    """True when the user owns the server or holds at least one of ``names`` there."""
+    mask = await effective_permissions(user_id, server_id)
+    return mask == OWNER or bool(mask & await permission_mask(names))
+
+
+class PermissionMasks:
+    """
+    Effective masks for a batch of ids (users of one server, or servers of one user), stored as a signed 64-bit
+    array in the order the ids were given, so ``masks[i]`` belongs to ``ids[i]``.
+    """
+
+    __slots__ = ("ids", "masks", "_index")
+
+    def __init__(self, ids: Sequence[str], masks: Iterable[int]):
+        self.ids = list(ids)
+        self.masks = array("q", masks)
+        self._index = {id_: position for position, id_ in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(self, id_) -> int:
+        position = self._index.get(str(id_))
+        return 0 if position is None else self.masks[position]
+
+    def allows(self, id_, required: int) -> bool:
+        """True when ``id_`` owns the server or holds any bit of ``required`` (see permission_mask)."""
+        mask = self.mask(id_)
+        return mask == OWNER or bool(mask & required)
+
+    def allowed(self, required: int) -> List[str]:
+        return [id_ for id_, mask in zip(self.ids, self.masks) if mask == OWNER or mask & required]
+
+
+async def _server_versions(server_ids: List[str]) -> Optional[Dict[str, int]]:
+    values = await cache.versions([_version_name(server_id) for server_id in server_ids])
+    return None if values is None else dict(zip(server_ids, values))
+
+
+async def _effective_permissions_batch(pairs: List[Tuple[str, str]]) -> List[int]:
+    """Masks for ``(server_id, user_id)`` pairs: local hits first, then one query for every miss."""
+    await _load_bits()
+    versions = await _server_versions(list(dict.fromkeys(server_id for server_id, _ in pairs)))
+    masks = [None] * len(pairs) if versions is None else [_local_mask(pair, versions[pair[0]]) for pair in pairs]
+    missing = [pair for pair, mask in zip(pairs, masks) if mask is None]
+    PERMISSION_CACHE_LOOKUPS.labels(tier="local", result="hit").inc(len(pairs) - len(missing))
+    PERMISSION_CACHE_LOOKUPS.labels(tier="local", result="miss").inc(len(missing))
+    if not missing:
+        return masks
+
+    records = await DataBase.fetch(
+        effective_permissions_batch_query,
+        [user_id for _, user_id in missing],
+        [server_id for server_id, _ in missing],
+        route=PRIMARY,
+        timeout=settings.DB_TIMEOUT_LIST,
+    )
+    compiled = {}
+    for record in records:
+        pair = (str(record["server_id"]), str(record["user_id"]))
+        compiled[pair] = OWNER if record["is_owner"] else await permission_mask(record["permissions"])
+    if versions is None:
+        # Without versions nothing would tell us these masks were revoked
+        return [compiled[pair] if mask is None else mask for pair, mask in zip(pairs, masks)]
+    for (server_id, user_id), mask in compiled.items():
+        local_masks.set((server_id, user_id), (versions[server_id], mask))
+    try:
+        async with redis_client.client.pipeline(transaction=False) as pipe:
+            for (server_id, user_id), mask in compiled.items():
+                _store(pipe, server_id, versions[server_id], user_id, mask)
+            await pipe.execute()
+    except RedisError as e:
+        log.warning(f"Permission cache write failed: {e}")
+    return [compiled[pair] if mask is None else mask for pair, mask in zip(pairs, masks)]
+
+
+async def members_permissions(server_id: str, user_ids: Iterable[str]) -> PermissionMasks:
+    """Effective masks of many users in one server."""
+    server_id = str(server_id)
+    user_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+    return PermissionMasks(user_ids, await _effective_permissions_batch([(server_id, u) for u in user_ids]))
+
+
+async def servers_permissions(user_id: str, server_ids: Iterable[str]) -> PermissionMasks:
+    """Effective masks of one user in many servers."""
+    user_id = str(user_id)
+    server_ids = list(dict.fromkeys(str(server_id) for server_id in server_ids))
+    return PermissionMasks(server_ids, await _effective_permissions_batch([(s, user_id) for s in server_ids]))
+
+
+async def invalidate_server(server_id: str) -> None:
+    """Retire every cached mask in ``server_id``: role permissions, role deletion, ownership changes."""
+    server_id = str(server_id)
+    local_masks.discard_where(lambda key: key[0] == server_id)
+    await cache.bump(_version_name(server_id))
+
+
+async def invalidate_member(server_id: str, user_id: str) -> None:
+    """Retire the cached mask of one user in one server: role assignment and removal, direct grants."""
+    # The version is per server, so the server's other masks are recompiled too
+    await invalidate_server(server_id)
@@ -0,0 +1,75 @@
+import asyncio
+from collections import deque
+from typing import Deque, Optional
+
+
+def percentile(samples, fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class AdaptivePoolLimit:
+    """
+    Admission limit on how many pooled connections may be in use at once. The asyncpg pool is opened
+    with ``maximum`` connections; this limit moves between ``minimum`` and ``maximum`` with the acquire-wait
+    percentile, and connections idle beyond it are closed by the pool's max_inactive_connection_lifetime.
+    """
+
+    def __init__(self, minimum: int, maximum: int, initial: int, target_wait: float, max_samples: int = 10000):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.target_wait = target_wait
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waits: Deque[float] = deque(maxlen=max_samples)
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        while self.in_use >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken and cancelled at once: hand the slot to the next waiter
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = self.limit - self.in_use
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits.append(seconds)
+
+    def adjust(self) -> int:
+        """
+        Grow by a quarter when the p95 acquire wait of the last window exceeds the target; shrink by one
+        when waits were negligible and under half the limit was ever in use. Returns the new limit.
+        """
+        p95 = percentile(self.waits, 0.95)
+        if p95 is not None and p95 > self.target_wait:
+            self.limit = min(self.maximum, self.limit + max(1, self.limit // 4))
+        elif (p95 is None or p95 < self.target_wait / 4) and self.peak_in_use < self.limit / 2:
+            self.limit = max(self.minimum, self.limit - 1)
+        self.waits.clear()
+        self.peak_in_use = self.in_use
+        self._wake()
+        return self.limit
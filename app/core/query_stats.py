@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import random
+import re
+from typing import NamedTuple
+
+from prometheus_client.metrics import MetricWrapperBase
+
+from app.core.config import settings
+from app.utils.metrics import QUERY_LATENCY, QUERY_ROWS
+
+log = logging.getLogger("fastapi")
+
+# Upper bound on distinct SQL strings we keep stats handles for. Dynamically built queries
+# (e.g. UPDATE ... SET with a variable column list) can create new shapes, so the cache is reset
+# rather than allowed to grow without limit.
+MAX_TRACKED_QUERIES = 2048
+# Statements that must run on the primary: data-modifying statements (including inside CTEs and
+# ON CONFLICT ... DO UPDATE) and row locks (SELECT ... FOR [NO KEY] UPDATE / FOR [KEY] SHARE).
+WRITE_STATEMENT = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP)\b|\bFOR\s+(KEY\s+)?SHARE\b", re.IGNORECASE
+)
+
+
+class QueryStats(NamedTuple):
+    fingerprint: str
+    text: str
+    writes: bool
+    latency: MetricWrapperBase
+    rows: MetricWrapperBase
+
+
+_stats: dict[str, QueryStats] = {}
+
+
+def _normalise(query: str) -> str:
+    # Remove leading/trailing spaces and replace multiple spaces/newlines with a single space
+    return re.sub(r"\s+", " ", query.strip())
+
+
+def get_query_stats(query: str) -> QueryStats:
+    """
+    Return the cached stats handle for a SQL string, normalising and fingerprinting it only
+    the first time it is seen. Query strings are module-level literals, so the dict lookup
+    resolves on identity with the hash already cached on the string object.
+    """
+    stats = _stats.get(query)
+    if stats is None:
+        text = _normalise(query)
+        fingerprint = hashlib.blake2b(text.encode(), digest_size=6).hexdigest()
+        stats = QueryStats(
+            fingerprint=fingerprint,
+            text=text,
+            writes=WRITE_STATEMENT.search(text) is not None,
+            latency=QUERY_LATENCY.labels(fingerprint=fingerprint),
+            rows=QUERY_ROWS.labels(fingerprint=fingerprint),
+        )
+        if len(_stats) >= MAX_TRACKED_QUERIES:
+            _stats.clear()
+        _stats[query] = stats
+    return stats
+
+
+def observe_query(query: str, args: tuple, duration: float, rows: int = None) -> None:
+    """Record latency (and row count when known) for a query, logging only slow or sampled ones."""
+    stats = get_query_stats(query)
+    stats.latency.observe(duration)
+    if rows is not None:
+        stats.rows.observe(rows)
+
+    slow = duration * 1000 >= settings.DB_SLOW_QUERY_MS
+    if not slow and not (settings.DB_QUERY_LOG_SAMPLE_RATE and random.random() < settings.DB_QUERY_LOG_SAMPLE_RATE):
+        return
+    logged_args = args if settings.DB_QUERY_LOG_ARGS else f"<{len(args)} redacted>"
+    log.log(
+        logging.WARNING if slow else logging.INFO,
+        "%s query [%s] (%.6f seconds): %s with args: %s",
+        "Slow" if slow else "Sampled",
+        stats.fingerprint,
+        duration,
+        stats.text,
+        logged_args,
+    )
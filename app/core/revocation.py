@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+from app.utils.metrics import REVOCATION_CHECKS
+
+log = logging.getLogger("fastapi")
+redis_client = RedisClient()
+
+# Logout-all timestamps by user id. Every process mirrors the hash in memory: rebuilt from it on (re)subscribe
+# and every REVOCATION_RESYNC_INTERVAL, and updated live from the channel in between. While the subscription
+# is not confirmed alive within REVOCATION_MAX_STALENESS, verify_token falls back to reading Redis directly.
+REVOCATIONS_KEY = "revocations:access"
+REVOCATIONS_CHANNEL = "revocations:access"
+
+_revoked: Dict[str, float] = {}
+_fresh_until = 0.0
+
+
+def _blacklist_key(user_id: str) -> str:
+    return f"blacklist:access:{user_id}"
+
+
+async def revoke_access(user_id: str, timestamp: int) -> None:
+    """Invalidate every access token of ``user_id`` issued at or before ``timestamp``."""
+    user_id = str(user_id)
+    async with redis_client.client.pipeline(transaction=False) as pipe:
+        pipe.set(_blacklist_key(user_id), timestamp, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        pipe.hset(REVOCATIONS_KEY, user_id, timestamp)
+        pipe.publish(REVOCATIONS_CHANNEL, f"{user_id}:{timestamp}")
+        await pipe.execute()
+    _revoked[user_id] = float(timestamp)
+
+
+async def access_revoked_at(user_id: str) -> Optional[float]:
+    """Logout-all timestamp for ``user_id``, from memory while the mirror is fresh, otherwise from Redis."""
+    user_id = str(user_id)
+    if time.monotonic() < _fresh_until:
+        REVOCATION_CHECKS.labels(source="local").inc()
+        return _revoked.get(user_id)
+    REVOCATION_CHECKS.labels(source="redis").inc()
+    timestamp = await redis_client.client.get(_blacklist_key(user_id))
+    return None if timestamp is None else float(timestamp)
+
+
+async def _rebuild() -> None:
+    global _revoked
+    # Tokens outlive a revocation by at most their lifetime, so older entries no longer matter
+    cutoff = time.time() - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    entries = await redis_client.client.hgetall(REVOCATIONS_KEY)
+    expired = [user_id for user_id, timestamp in entries.items() if float(timestamp) < cutoff]
+    if expired:
+        await redis_client.client.hdel(REVOCATIONS_KEY, *expired)
+    _revoked = {user_id: float(timestamp) for user_id, timestamp in entries.items() if float(timestamp) >= cutoff}
+
+
+def _apply(data: str) -> None:
+    user_id, _, timestamp = data.rpartition(":")
+    _revoked[user_id] = max(float(timestamp), _revoked.get(user_id, 0.0))
+
+
+async def listen_for_revocations() -> None:
+    """Background task keeping the in-memory revocation map current."""
+    global _fresh_until
+    poll = min(1.0, settings.REVOCATION_MAX_STALENESS / 2)
+    while True:
+        pubsub = redis_client.client.pubsub()
+        try:
+            # Subscribe before rebuilding so no revocation falls between the snapshot and the live feed
+            await pubsub.subscribe(REVOCATIONS_CHANNEL)
+            await _rebuild()
+            rebuilt_at = last_seen = time.monotonic()
+            while True:
+                message = await pubsub.get_message(timeout=poll)
+                if message is None:
+                    # Quiet channel: a PING proves the subscription is still alive
+                    await pubsub.ping()
+                else:
+                    last_seen = time.monotonic()
+                    if message["type"] == "message":
+                        _apply(message["data"])
+                if time.monotonic() - rebuilt_at >= settings.REVOCATION_RESYNC_INTERVAL:
+                    await _rebuild()
+                    rebuilt_at = time.monotonic()
+                _fresh_until = last_seen + settings.REVOCATION_MAX_STALENESS
+        except RedisError as e:
+            _fresh_until = 0.0
+            log.warning(f"Token revocation listener disconnected, checking Redis directly: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,150 @@
+import csv
+import io
+import uuid
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, Tuple, Type
+
+import orjson
+from asyncpg import Record
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+# How DataBase turns asyncpg records into results, selectable per model (``row_mapping``) or per call
+VALIDATE = "validate"  # cls(**record): full Pydantic validation per row
+ADAPTER = "adapter"  # one cached TypeAdapter(list[cls]) call for the whole result set
+CONSTRUCT = "construct"  # trusted: build instances straight from the record without validation
+RAW = "raw"  # hand back the asyncpg records untouched (pair with RecordJSONResponse)
+
+# Formats for record_stream_response
+NDJSON = "ndjson"
+CSV = "csv"
+EXPORT_MEDIA_TYPES = {NDJSON: "application/x-ndjson", CSV: "text/csv"}
+# Encoded rows are sent in chunks of about this many bytes
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+_constructors: Dict[Tuple[Type[BaseModel], Tuple[str, ...]], Optional[Callable[[Record], BaseModel]]] = {}
+
+
+def _compile_constructor(model: Type[BaseModel], columns: Tuple[str, ...]) -> Optional[Callable[[Record], BaseModel]]:
+    """
+    Build a row constructor for one model and column set. Returns None when the columns cannot
+    populate the model without validation (a required field is missing or the model has private
+    attributes), in which case rows are validated instead.
+    """
+    if model.__private_attributes__:
+        return None
+    present = tuple(name for name in model.model_fields if name in columns)
+    missing = {name: field for name, field in model.model_fields.items() if name not in columns}
+    if any(field.is_required() for field in missing.values()):
+        return None
+    fields_set = frozenset(present)
+    new = model.__new__
+    set_attr = object.__setattr__
+
+    def construct(record: Record) -> BaseModel:
+        values = {name: record[name] for name in present}
+        for name, field in missing.items():
+            values[name] = field.get_default(call_default_factory=True)
+        instance = new(model)
+        set_attr(instance, "__dict__", values)
+        set_attr(instance, "__pydantic_fields_set__", set(fields_set))
+        set_attr(instance, "__pydantic_extra__", None)
+        set_attr(instance, "__pydantic_private__", None)
+        return instance
+
+    return construct
+
+
+def _get_constructor(model: Type[BaseModel], record: Record) -> Optional[Callable[[Record], BaseModel]]:
+    key = (model, tuple(record.keys()))
+    try:
+        return _constructors[key]
+    except KeyError:
+        constructor = _constructors[key] = _compile_constructor(model, key[1])
+        return constructor
+
+
+def map_records(model: Type[BaseModel], records: Sequence[Record], mapping: str) -> list:
+    if mapping == RAW or not records:
+        return records
+    if mapping == CONSTRUCT:
+        constructor = _get_constructor(model, records[0])
+        if constructor is not None:
+            return [constructor(record) for record in records]
+    elif mapping == ADAPTER:
+        adapter = _adapters.get(model)
+        if adapter is None:
+            adapter = _adapters[model] = TypeAdapter(list[model])
+        return adapter.validate_python([dict(record) for record in records])
+    return [model(**record) for record in records]
+
+
+def map_record(model: Type[BaseModel], record: Optional[Record], mapping: str):
+    if mapping == RAW or record is None:
+        return record
+    if mapping == CONSTRUCT:
+        constructor = _get_constructor(model, record)
+        if constructor is not None:
+            return constructor(record)
+    return model(**record)
+
+
+def _orjson_default(obj: Any):
+    if isinstance(obj, Record):
+        return dict(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError
+
+
+class RecordJSONResponse(ORJSONResponse):
+    """Serialise asyncpg records (e.g. from ``mapping=RAW``) directly with orjson, skipping jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+async def _ndjson_chunks(records: AsyncIterator[Record]) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+    async for record in records:
+        chunk += orjson.dumps(record, default=_orjson_default, option=orjson.OPT_APPEND_NEWLINE)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+async def _csv_chunks(records: AsyncIterator[Record]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header = False
+    async for record in records:
+        if not header:
+            writer.writerow(record.keys())
+            header = True
+        writer.writerow(record.values())
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def record_stream_response(records: AsyncIterator[Record], export_format: str, filename: str) -> StreamingResponse:
+    """
+    Stream records (e.g. from ``DataBase.stream``) to the client as NDJSON or CSV, encoding them as they
+    arrive so memory stays flat regardless of the export size.
+    """
+    chunks = _csv_chunks(records) if export_format == CSV else _ndjson_chunks(records)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from app.core import cache
+from app.core.config import settings
+from app.core.database import PRIMARY
+from app.models.user import UserModel
+
+# UserModel.get_user through app.core.cache, so users get its per-process tier, Redis copy and single-flight
+# misses. Entries are keyed by a per-user version that invalidate() bumps, so a load that raced a write can only
+# store its result under the old version, which no reader asks for any more. Misses load from the primary.
+
+
+def _version_name(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+async def _load(user_id: str) -> Optional[UserModel]:
+    row = await UserModel.get_user(user_id, route=PRIMARY)
+    # Through the model: only its fields are cached (never a password column) and asyncpg types become JSON
+    return None if row is None else UserModel(**row)
+
+
+async def get_user(user_id: str) -> Optional[dict]:
+    """Cached equivalent of UserModel.get_user."""
+    user_id = str(user_id)
+    version = await cache.version(_version_name(user_id))
+    if version is None:
+        # Without a version nothing would tell us the user changed
+        user = await _load(user_id)
+    else:
+        user = await cache.get_or_load(
+            "user",
+            f"{user_id}:{version}",
+            lambda: _load(user_id),
+            ttl=settings.USER_CACHE_TTL,
+            model=Optional[UserModel],
+        )
+    return None if user is None else dict(user)
+
+
+async def invalidate(user_id: str) -> None:
+    """Retire the cached copies of a user in every process."""
+    await cache.bump(_version_name(str(user_id)))
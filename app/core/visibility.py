@@ -0,0 +1,195 @@
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.core import cache, channel_tree
+from app.core.config import settings
+from app.core.database import PRIMARY, DataBase, prepared_query
+from app.core.local_cache import LocalTTLCache
+from app.models.server import get_server_by_id_query
+from app.utils.metrics import VISIBILITY_CACHE_LOOKUPS
+
+# Which categories and channels each role of a server can see, compiled once per server into role-keyed sets.
+# A category or channel with no role assignments is open to every member; one with assignments is visible to
+# those roles only, and a channel is never visible when its category is not. Owners and holders of a role with
+# ADMINISTRATOR see everything. A user's view is the union of the sets for the roles they hold.
+# The index also keeps the server row and its categories and channels (taken from the cached channel tree), so
+# the server bootstrap can assemble a user's tree without touching the database for the per-server parts.
+# Compiled indexes are tagged with the channel tree version and the server's visibility version they were built
+# from, and only served while both are current. Category and channel writes bump the former, invalidate() below
+# bumps the latter, so a compile that raced a write is never served after it. Compiles read from the primary.
+
+server_assignments_query = prepared_query(
+    "visibility.assignments",
+    """
+        SELECT 'category' AS kind, cra.category_id AS target_id, cra.role_id
+          FROM category_role_assignments cra
+          JOIN categories c ON c.id = cra.category_id
+         WHERE c.server_id = $1
+     UNION ALL
+        SELECT 'channel', chra.channel_id, chra.role_id
+          FROM channel_role_assignments chra
+          JOIN channels ch ON ch.id = chra.channel_id
+         WHERE ch.server_id = $1
+     UNION ALL
+        SELECT 'admin', NULL, sr.id
+          FROM server_roles sr
+          JOIN server_role_permissions srp ON srp.role_id = sr.id
+          JOIN server_permissions sp ON sp.id = srp.permission_id
+         WHERE sr.server_id = $1
+           AND sp.name = 'ADMINISTRATOR'
+    """,
+)
+user_roles_query = prepared_query(
+    "visibility.user_roles",
+    """
+        SELECT sur.role_id
+          FROM server_user_roles sur
+          JOIN server_roles sr ON sr.id = sur.role_id
+         WHERE sur.user_id = $1 AND sr.server_id = $2
+    """,
+)
+
+
+class ServerVisibility:
+    """Compiled visibility of one server; roles from other servers simply match nothing."""
+
+    __slots__ = (
+        "server",
+        "owner_id",
+        "categories",
+        "channels",
+        "channel_category",
+        "open_categories",
+        "open_channels",
+        "role_categories",
+        "role_channels",
+        "admin_roles",
+        "versions",
+    )
+
+    def __init__(self, server, categories, channels, assignments, versions: Optional[Tuple[int, int]] = None):
+        # (channel tree version, visibility version) the index was compiled at
+        self.versions = versions
+        self.server: Optional[dict] = None if server is None else dict(server)
+        self.owner_id = None if server is None else str(server["owner_id"])
+        self.categories: List[dict] = [dict(category) for category in categories]
+        self.channels: List[dict] = [dict(channel) for channel in channels]
+        self.channel_category: Dict[str, str] = {
+            str(channel["id"]): str(channel["category_id"]) for channel in self.channels
+        }
+        role_categories: Dict[str, Set[str]] = {}
+        role_channels: Dict[str, Set[str]] = {}
+        admin_roles = set()
+        for assignment in assignments:
+            role_id = str(assignment["role_id"])
+            if assignment["kind"] == "admin":
+                admin_roles.add(role_id)
+            elif assignment["kind"] == "category":
+                role_categories.setdefault(role_id, set()).add(str(assignment["target_id"]))
+            else:
+                role_channels.setdefault(role_id, set()).add(str(assignment["target_id"]))
+        restricted_categories = set().union(*role_categories.values())
+        restricted_channels = set().union(*role_channels.values())
+        self.open_categories = frozenset(
+            str(category["id"]) for category in self.categories if str(category["id"]) not in restricted_categories
+        )
+        self.open_channels = frozenset(self.channel_category.keys() - restricted_channels)
+        self.role_categories: Dict[str, FrozenSet[str]] = {k: frozenset(v) for k, v in role_categories.items()}
+        self.role_channels: Dict[str, FrozenSet[str]] = {k: frozenset(v) for k, v in role_channels.items()}
+        self.admin_roles = frozenset(admin_roles)
+
+    def _sees_everything(self, user_id: str, role_ids: Iterable[str]) -> bool:
+        return user_id == self.owner_id or not self.admin_roles.isdisjoint(role_ids)
+
+    def visible_categories(self, user_id: str, role_ids: Iterable[str]) -> Set[str]:
+        role_ids = list(role_ids)
+        if self._sees_everything(user_id, role_ids):
+            return {str(category["id"]) for category in self.categories}
+        return set(self.open_categories).union(*(self.role_categories.get(role, ()) for role in role_ids))
+
+    def visible_channels(self, user_id: str, role_ids: Iterable[str]) -> Set[str]:
+        role_ids = list(role_ids)
+        if self._sees_everything(user_id, role_ids):
+            return set(self.channel_category)
+        categories = self.visible_categories(user_id, role_ids)
+        channels = set(self.open_channels).union(*(self.role_channels.get(role, ()) for role in role_ids))
+        return {channel for channel in channels if self.channel_category[channel] in categories}
+
+
+local_servers = LocalTTLCache(settings.VISIBILITY_CACHE_SIZE, settings.VISIBILITY_CACHE_TTL)
+
+
+def _version_name(server_id: str) -> str:
+    return f"visibility:{server_id}"
+
+
+async def server_visibility(server_id: str) -> ServerVisibility:
+    server_id = str(server_id)
+    tree_version = await channel_tree.version(server_id)
+    visibility_version = await cache.version(_version_name(server_id))
+    versions = None if tree_version is None or visibility_version is None else (tree_version, visibility_version)
+    index = local_servers.get(server_id)
+    if index is not None and versions is not None and index.versions == versions:
+        VISIBILITY_CACHE_LOOKUPS.labels(result="hit").inc()
+        return index
+    VISIBILITY_CACHE_LOOKUPS.labels(result="miss").inc()
+    server, tree, assignments = await DataBase.gather(
+        DataBase.fetchrow(get_server_by_id_query, server_id, route=PRIMARY),
+        channel_tree.channel_tree_at(server_id, tree_version),
+        DataBase.fetch(server_assignments_query, server_id, route=PRIMARY),
+    )
+    categories = [category.model_dump(exclude={"channels"}) for category in tree]
+    channels = [channel.model_dump() for category in tree for channel in category.channels]
+    index = ServerVisibility(server, categories, channels, assignments, versions)
+    # Without versions nothing would tell us the compiled rows changed
+    if versions is not None:
+        local_servers.set(server_id, index)
+    return index
+
+
+async def _load_user_role_ids(server_id: str, user_id: str) -> List[str]:
+    return [
+        str(record["role_id"]) for record in await DataBase.fetch(user_roles_query, user_id, server_id, route=PRIMARY)
+    ]
+
+
+async def user_role_ids(server_id: str, user_id: str) -> List[str]:
+    """Ids of the roles ``user_id`` holds in ``server_id``."""
+    server_id, user_id = str(server_id), str(user_id)
+    return await cache.get_or_load(
+        "member_roles",
+        f"{server_id}:{user_id}",
+        lambda: _load_user_role_ids(server_id, user_id),
+        ttl=settings.VISIBILITY_CACHE_TTL,
+        tags=[f"server:{server_id}:member_roles"],
+    )
+
+
+async def invalidate_member_roles(server_id: str, user_id: str) -> None:
+    """Call after assigning or removing a role of one member."""
+    await cache.invalidate("member_roles", f"{server_id}:{user_id}")
+
+
+async def invalidate_server_roles(server_id: str) -> None:
+    """Call after deleting a role, or anything else that changes the roles of many members at once."""
+    await cache.invalidate_tags(f"server:{server_id}:member_roles")
+
+
+async def visible_category_ids(server_id: str, user_id: str) -> Set[str]:
+    """Ids of the categories of ``server_id`` that ``user_id`` can see."""
+    user_id = str(user_id)
+    index = await server_visibility(server_id)
+    return index.visible_categories(user_id, await user_role_ids(server_id, user_id))
+
+
+async def visible_channel_ids(server_id: str, user_id: str) -> Set[str]:
+    """Ids of the channels of ``server_id`` that ``user_id`` can see."""
+    user_id = str(user_id)
+    index = await server_visibility(server_id)
+    return index.visible_channels(user_id, await user_role_ids(server_id, user_id))
+
+
+async def invalidate(server_id: str) -> None:
+    """Retire the compiled visibility of ``server_id`` in every process."""
+    server_id = str(server_id)
+    local_servers.pop(server_id)
+    await cache.bump(_version_name(server_id))
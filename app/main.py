@@ -1,11 +1,9 @@
 import asyncio
-import re
 import sys
-import time
 from contextlib import asynccontextmanager
-from http import HTTPStatus
 
-from fastapi import FastAPI, Request, Response
+from asyncpg.exceptions import QueryCanceledError
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import ORJSONResponse
@@ -14,18 +12,14 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
 from app.api.v0.api import api_router
+from app.core import cache, etag, revocation
 from app.core.auth import get_password_hash
 from app.core.config import settings
-from app.core.database import DataBase
+from app.core.database import DataBase, QueryTimeoutError
 from app.core.dependencies import redis_client
+from app.core.instrumentation import InstrumentationMiddleware
 from app.core.logging_config import configure_logging
 from app.utils import s3
-from app.utils.metrics import (
-    REQUEST_COUNT,
-    REQUEST_HISTOGRAM,
-    REQUEST_IN_PROGRESS,
-    REQUEST_LATENCY,
-)
 from app.utils.metrics import router as metrics_router
 from app.utils.metrics import update_system_metrics
 from migrate import check_all_migrations_applied
@@ -39,7 +33,7 @@ async def create_staff_user(db):
     VALUES ($1, $2, $3, $4, $5)
     ON CONFLICT DO NOTHING;
     """
-    password = get_password_hash(settings.ADMIN_PASSWORD)
+    password = await get_password_hash(settings.ADMIN_PASSWORD)
     await db.execute(query, settings.ADMIN_EMAIL, "SuperAdmin", "1234567890", "superadmin", password)
 
 
@@ -47,12 +41,21 @@ async def create_staff_user(db):
 async def lifespan(app: FastAPI):
     database_instance = DataBase()
     await database_instance.create_pool(uri=settings.DATABASE_URL)
+    await database_instance.create_replica_pools(settings.DATABASE_REPLICA_URLS)
     await redis_client.connect()
     all_migrations_applied_check = await check_all_migrations_applied()
     if not all_migrations_applied_check:
         logger.critical("You have pending migrations")
         raise RuntimeError("You have pending migrations")
+    # Permission definitions only change with migrations, which ship with a deploy
+    await cache.invalidate("permissions", "all")
+    await etag.bump("permissions")
     asyncio.create_task(update_system_metrics())
+    asyncio.create_task(database_instance.monitor_pool())
+    asyncio.create_task(cache.listen_for_invalidations())
+    asyncio.create_task(revocation.listen_for_revocations())
+    if database_instance.replica_pools:
+        asyncio.create_task(database_instance.monitor_replicas())
     await create_staff_user(database_instance)
     yield
     await database_instance.close_pool()
@@ -76,49 +79,16 @@ app.state.limiter = limiter
 app.include_router(metrics_router)
 
 
-# Middleware to collect request metrics
-@app.middleware("http")
-async def track_metrics(request: Request, call_next):
-    if request.url.path == "/metrics":
-        return await call_next(request)
-    start_time = time.time()
-    REQUEST_IN_PROGRESS.inc()  # Increment in-progress requests
-    sanitized_path = re.sub(
-        r"/([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)",
-        r"/{id}",
-        request.url.path,
-    )
-
-    response = await call_next(request)
-
-    process_time = time.time() - start_time
-    REQUEST_LATENCY.observe(process_time)
-    REQUEST_HISTOGRAM.labels(endpoint=sanitized_path).observe(process_time)
-
-    REQUEST_COUNT.labels(method=request.method, endpoint=sanitized_path, status_code=response.status_code).inc()
-    REQUEST_IN_PROGRESS.dec()  # Decrement after completion
+app.add_middleware(InstrumentationMiddleware)
 
-    return response
 
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"\033[1;37m{request.method}\033[0m , {request.url} params: {dict(request.query_params)}")
-
-    start_time = time.time()
-    response: Response = await call_next(request)
-    process_time = time.time() - start_time
-    if response.status_code < 400:
-        logger.info(
-            f"Request completed with {response.status_code}"
-            f" {HTTPStatus(response.status_code).phrase} in {process_time:.6f}s"
-        )
-    else:
-        logger.error(
-            f"Request failed with {response.status_code}"
-            f" {HTTPStatus(response.status_code).phrase} in {process_time:.6f}s"
-        )
-    return response
+@app.exception_handler(QueryTimeoutError)
+@app.exception_handler(QueryCanceledError)
+async def query_timeout_handler(request: Request, exc: Exception):
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": [{"msg": "The request took too long to process. Please try again later."}]},
+    )
 
 
 @app.exception_handler(RateLimitExceeded)
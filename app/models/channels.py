@@ -1,9 +1,21 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import Field, constr
 
-from app.core.database import DataBase
+from app.core.database import PRIMARY, DataBase, prepared_query
+
+channel_tree_query = prepared_query(
+    "channels.tree",
+    """
+        SELECT c.id AS category_id, c.name AS category_name, c.position AS category_position,
+               ch.id, ch.name, ch.position, ch.description
+          FROM categories c
+     LEFT JOIN channels ch ON ch.category_id = c.id
+         WHERE c.server_id = $1
+      ORDER BY c.position, c.id, ch.position
+    """,
+)
 
 
 class ChannelIn(DataBase):
@@ -55,6 +67,38 @@ class ChannelOut(DataBase):
         return await cls.fetchrow(query, channel_id)
 
 
+class CategoryChannels(DataBase):
+    """A category with its channels in position order: one node of a server's channel tree."""
+
+    id: UUID
+    name: str
+    position: int
+    channels: List[ChannelOut] = Field(default_factory=list)
+
+    @classmethod
+    async def get_channel_tree(cls, server_id: str) -> List["CategoryChannels"]:
+        """Every category of a server with its channels, from one query against the primary (the result is cached)."""
+        categories = {}
+        for record in await DataBase.fetch(channel_tree_query, server_id, route=PRIMARY):
+            category = categories.get(record["category_id"])
+            if category is None:
+                category = categories[record["category_id"]] = cls(
+                    id=record["category_id"], name=record["category_name"], position=record["category_position"]
+                )
+            if record["id"] is not None:
+                category.channels.append(
+                    ChannelOut(
+                        id=record["id"],
+                        name=record["name"],
+                        position=record["position"],
+                        description=record["description"],
+                        category_id=record["category_id"],
+                        server_id=server_id,
+                    )
+                )
+        return list(categories.values())
+
+
 class ChannelUpdate(DataBase):
     name: constr(min_length=3, max_length=100) = Field(None, description="Channel name")
     description: constr(min_length=3, max_length=100) = Field(None, description="Channel description")
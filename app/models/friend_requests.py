@@ -1,7 +1,12 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 from uuid import UUID
 
+from asyncpg import Record
+
+from app.core.config import settings
 from app.core.database import DataBase
+from app.core.pagination import decode_cursor, paginate
+from app.core.row_mapping import map_records
 
 
 class FriendRequest(DataBase):
@@ -32,7 +37,16 @@ class FriendRequest(DataBase):
         return await cls.fetchrow(query, status, user_id, friend_id)
 
     @classmethod
-    async def get_friends(cls, user_id: UUID, search_query: str, page: int, per_page: int):
+    async def _fetch_page(cls, scope: str, query: str, per_page: int, *args):
+        records = await cls.fetch(query, *args, convert=False)
+        records, next_cursor = paginate(scope, records, per_page, ("created_at", "id"))
+        return map_records(cls, records, cls.row_mapping), next_cursor
+
+    @classmethod
+    async def get_friends(
+        cls, user_id: UUID, search_query: str, page: int, per_page: int, cursor: Optional[str] = None
+    ):
+        created_at, friendship_id = decode_cursor("friends", cursor, 2)
         query = """
             SELECT
               CASE WHEN friends.user_id = $1
@@ -47,7 +61,7 @@ class FriendRequest(DataBase):
                    THEN u2.profile_picture_url
                    ELSE u1.profile_picture_url
                     END AS profile_picture_url,
-                        friends.status, friends.user_id, friends.friend_id
+                        friends.status, friends.user_id, friends.friend_id, friends.created_at, friends.id
                    FROM friends
                    JOIN users u1 ON friends.user_id = u1.id
                    JOIN users u2 ON friends.friend_id = u2.id
@@ -58,15 +72,23 @@ class FriendRequest(DataBase):
                        OR (CASE WHEN friends.user_id = $1 THEN u2.username
                                 ELSE u1.username END) ILIKE '%' || $2::text || '%'
                             )
+                    AND ($5::timestamp IS NULL OR (friends.created_at, friends.id) < ($5::timestamp, $6::int))
+               ORDER BY friends.created_at DESC, friends.id DESC
                   LIMIT $3 OFFSET $4;
             """
-        offset = (page - 1) * per_page
-        return await cls.fetch(query, user_id, search_query, per_page, offset)
+        offset = 0 if cursor else (page - 1) * per_page
+        return await cls._fetch_page(
+            "friends", query, per_page, user_id, search_query, per_page + 1, offset, created_at, friendship_id
+        )
 
     @classmethod
-    async def get_friend_requests(cls, user_id: UUID, search_query: str, page: int, per_page: int):
+    async def get_friend_requests(
+        cls, user_id: UUID, search_query: str, page: int, per_page: int, cursor: Optional[str] = None
+    ):
+        created_at, friendship_id = decode_cursor("friend_requests", cursor, 2)
         query = """
-            SELECT user_id, friend_id, status, username, email, profile_picture_url FROM friends
+            SELECT friends.id, user_id, friend_id, status, username, email, profile_picture_url, friends.created_at
+              FROM friends
               JOIN users ON friends.user_id = users.id
              WHERE friend_id = $1 AND status = 'pending'
                    AND (
@@ -74,16 +96,23 @@ class FriendRequest(DataBase):
                        OR $2::text = ''
                        OR users.username ILIKE '%' || $2::text || '%'
                       )
-          ORDER BY friends.created_at DESC
+               AND ($5::timestamp IS NULL OR (friends.created_at, friends.id) < ($5::timestamp, $6::int))
+          ORDER BY friends.created_at DESC, friends.id DESC
              LIMIT $3 OFFSET $4;
         """
-        offset = (page - 1) * per_page
-        return await cls.fetch(query, user_id, search_query, per_page, offset)
+        offset = 0 if cursor else (page - 1) * per_page
+        return await cls._fetch_page(
+            "friend_requests", query, per_page, user_id, search_query, per_page + 1, offset, created_at, friendship_id
+        )
 
     @classmethod
-    async def get_blocked_friends(cls, user_id: UUID, search_query: str, page: int, per_page: int):
+    async def get_blocked_friends(
+        cls, user_id: UUID, search_query: str, page: int, per_page: int, cursor: Optional[str] = None
+    ):
+        created_at, friendship_id = decode_cursor("blocked_friends", cursor, 2)
         query = """
-            SELECT user_id, friend_id, status, username, email, profile_picture_url FROM friends
+            SELECT friends.id, user_id, friend_id, status, username, email, profile_picture_url, friends.created_at
+              FROM friends
               JOIN users ON friends.user_id = users.id
              WHERE friend_id = $1 AND status = 'blocked'
                     AND (
@@ -91,11 +120,26 @@ class FriendRequest(DataBase):
                        OR $2::text = ''
                        OR users.username ILIKE '%' || $2::text || '%'
                       )
-          ORDER BY friends.created_at DESC
+               AND ($5::timestamp IS NULL OR (friends.created_at, friends.id) < ($5::timestamp, $6::int))
+          ORDER BY friends.created_at DESC, friends.id DESC
              LIMIT $3 OFFSET $4;
         """
-        offset = (page - 1) * per_page
-        return await cls.fetch(query, user_id, search_query, page, offset)
+        offset = 0 if cursor else (page - 1) * per_page
+        return await cls._fetch_page(
+            "blocked_friends", query, per_page, user_id, search_query, per_page + 1, offset, created_at, friendship_id
+        )
+
+    @classmethod
+    def stream_friends(cls, user_id: UUID) -> AsyncIterator[Record]:
+        query = """
+            SELECT CASE WHEN friends.user_id = $1 THEN friends.friend_id ELSE friends.user_id END AS friend_id,
+                   users.username, users.email, friends.created_at
+              FROM friends
+              JOIN users ON users.id = CASE WHEN friends.user_id = $1 THEN friends.friend_id ELSE friends.user_id END
+             WHERE (friends.user_id = $1 OR friends.friend_id = $1) AND status = 'accepted'
+          ORDER BY friends.created_at, friends.id;
+        """
+        return cls.stream(query, user_id, convert=False, timeout=settings.DB_TIMEOUT_ADMIN)
 
     @classmethod
     async def remove_friend(cls, user_id: UUID, friend_id: UUID):
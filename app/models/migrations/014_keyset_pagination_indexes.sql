@@ -0,0 +1,26 @@
+-- up
+-- Composite indexes matching the (sort key, tiebreaker) order of the cursor-paginated list endpoints
+
+-- Server members list: ORDER BY joined_at DESC, user_id DESC
+CREATE INDEX idx_server_members_server_joined ON server_members(server_id, joined_at DESC, user_id DESC);
+
+-- Audit logs: ORDER BY timestamp DESC, id DESC
+CREATE INDEX idx_audit_entity_uuid_timestamp ON audit_logs(entity_uuid, timestamp DESC, id DESC);
+
+-- Friends, incoming requests and blocked users: ORDER BY created_at DESC, id DESC
+CREATE INDEX idx_friends_user_status_created ON friends(user_id, status, created_at DESC, id DESC);
+CREATE INDEX idx_friends_friend_status_created ON friends(friend_id, status, created_at DESC, id DESC);
+
+-- Role members: ORDER BY created_at DESC, user_id DESC
+CREATE INDEX idx_server_user_roles_role_created ON server_user_roles(role_id, created_at DESC, user_id DESC);
+
+-- Banned members: ORDER BY created_at DESC, user_id DESC
+CREATE INDEX idx_server_bans_server_created ON server_bans(server_id, created_at DESC, user_id DESC);
+
+-- down
+DROP INDEX IF EXISTS idx_server_members_server_joined;
+DROP INDEX IF EXISTS idx_audit_entity_uuid_timestamp;
+DROP INDEX IF EXISTS idx_friends_user_status_created;
+DROP INDEX IF EXISTS idx_friends_friend_status_created;
+DROP INDEX IF EXISTS idx_server_user_roles_role_created;
+DROP INDEX IF EXISTS idx_server_bans_server_created;
@@ -0,0 +1,29 @@
+-- up
+-- Direct permission grants belong to one server. Rows written before this migration carried no server and
+-- applied everywhere, so each is copied to every server its user belongs to, which keeps effective access as it was.
+ALTER TABLE server_user_permissions DROP CONSTRAINT server_user_permissions_pkey;
+ALTER TABLE server_user_permissions ADD COLUMN server_id UUID;
+
+INSERT INTO server_user_permissions (server_id, user_id, permission_id, created_at)
+SELECT sm.server_id, sup.user_id, sup.permission_id, sup.created_at
+  FROM server_user_permissions sup
+  JOIN server_members sm ON sm.user_id = sup.user_id
+ WHERE sup.server_id IS NULL;
+DELETE FROM server_user_permissions WHERE server_id IS NULL;
+
+ALTER TABLE server_user_permissions ALTER COLUMN server_id SET NOT NULL;
+ALTER TABLE server_user_permissions
+    ADD CONSTRAINT server_user_permissions_server_id_fkey
+    FOREIGN KEY (server_id) REFERENCES servers(id) ON DELETE CASCADE;
+-- Per-server lookups by (server_id, user_id) are a prefix of the key
+ALTER TABLE server_user_permissions ADD PRIMARY KEY (server_id, user_id, permission_id);
+
+-- down
+ALTER TABLE server_user_permissions DROP CONSTRAINT server_user_permissions_pkey;
+DELETE FROM server_user_permissions a
+      USING server_user_permissions b
+      WHERE a.user_id = b.user_id
+        AND a.permission_id = b.permission_id
+        AND a.server_id > b.server_id;
+ALTER TABLE server_user_permissions DROP COLUMN server_id;
+ALTER TABLE server_user_permissions ADD PRIMARY KEY (user_id, permission_id);
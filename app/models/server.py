@@ -2,13 +2,23 @@ import datetime
 import random
 import re
 import string
-from typing import Optional
+from typing import ClassVar, Optional
 from uuid import UUID
 
 import asyncpg
 from pydantic import Field, constr
 
-from app.core.database import DataBase
+from app.core.database import DataBase, prepared_query
+from app.core.row_mapping import CONSTRUCT
+
+get_server_by_id_query = prepared_query(
+    "server.get_server_by_id",
+    """
+                SELECT s.*, sc.default_notification_setting FROM servers s
+            INNER JOIN server_config sc on s.id = sc.server_id
+                 WHERE id = $1
+    """,
+)
 
 
 def generate_invite_code(length: int = 6) -> str:
@@ -96,6 +106,8 @@ class ServerIn(DataBase):
 
 
 class ServerOut(DataBase):
+    row_mapping: ClassVar[str] = CONSTRUCT
+
     id: UUID = Field(..., description="ID of the server")
     owner_id: UUID = Field(..., description="ID of the owner (must match a user UUID)")
     name: constr(max_length=255) = Field(..., description="Name of the server")
@@ -117,12 +129,7 @@ class ServerOut(DataBase):
 
     @classmethod
     async def get_server_by_id(cls, id: str):
-        query = """
-                SELECT s.*, sc.default_notification_setting FROM servers s
-            INNER JOIN server_config sc on s.id = sc.server_id
-                 WHERE id = $1
-            """
-        return await cls.fetchrow(query, id)
+        return await cls.fetchrow(get_server_by_id_query, id)
 
     @classmethod
     async def get_all_user_servers(cls, user_id):
@@ -26,66 +26,61 @@ class ServerMembers(DataBase):
 
     @classmethod
     async def remove_member(cls, user_id: str, server_id: str):
-        async with cls.pool.acquire() as connection:  # Acquire a connection from the pool
-            async with connection.transaction():  # Start a transaction
-                # Check if the user is the owner of the server
-                owner_id = await cls.fetchval(
+        # Every query below runs on the same connection inside one transaction
+        async with cls.connection(transaction=True):
+            # Check if the user is the owner of the server
+            owner_id = await cls.fetchval(
+                """
+                SELECT owner_id FROM servers
+                WHERE id = $1
+            """,
+                server_id,
+            )
+
+            if owner_id == user_id:
+                await cls.execute(
                     """
-                    SELECT owner_id FROM servers
+                    DELETE FROM servers
                     WHERE id = $1
                 """,
                     server_id,
-                    con=connection,
                 )
 
-                if owner_id == user_id:
-                    await cls.execute(
-                        """
-                        DELETE FROM servers
-                        WHERE id = $1
-                    """,
-                        server_id,
-                        con=connection,
-                    )
-
-                    await cls.execute(
-                        """
-                        DELETE FROM server_members
-                        WHERE server_id = $1
-                    """,
-                        server_id,
-                        con=connection,
-                    )
-
-                    await cls.execute(
-                        """
-                        DELETE FROM server_user_roles
-                        WHERE role_id IN (
-                            SELECT id FROM server_roles
-                            WHERE server_id = $1
-                        )
-                    """,
-                        server_id,
-                        con=connection,
-                    )
+                await cls.execute(
+                    """
+                    DELETE FROM server_members
+                    WHERE server_id = $1
+                """,
+                    server_id,
+                )
 
-                    await cls.execute(
-                        """
-                        DELETE FROM server_roles
+                await cls.execute(
+                    """
+                    DELETE FROM server_user_roles
+                    WHERE role_id IN (
+                        SELECT id FROM server_roles
                         WHERE server_id = $1
-                    """,
-                        server_id,
-                        con=connection,
                     )
+                """,
+                    server_id,
+                )
 
-                else:
-                    # Soft delete from server_members
-                    query = """
-                            UPDATE server_members
-                               SET deleted_at = NOW()
-                             WHERE server_id = $1 AND user_id = $2 AND deleted_at IS NULL
+                await cls.execute(
                     """
-                    await cls.execute(query, server_id, user_id, con=connection)
+                    DELETE FROM server_roles
+                    WHERE server_id = $1
+                """,
+                    server_id,
+                )
+
+            else:
+                # Soft delete from server_members
+                query = """
+                        UPDATE server_members
+                           SET deleted_at = NOW()
+                         WHERE server_id = $1 AND user_id = $2 AND deleted_at IS NULL
+                """
+                await cls.execute(query, server_id, user_id)
 
 
 class BanRequest(DataBase):
@@ -2,7 +2,7 @@ from uuid import UUID
 
 from pydantic import Field
 
-from app.core.database import DataBase
+from app.core.database import PRIMARY, DataBase
 
 
 class ServerPermission(DataBase):
@@ -18,7 +18,8 @@ class ServerPermission(DataBase):
 
     @classmethod
     async def get_all_permissions(cls):
+        """Every grantable permission, read from the primary (the result is cached)."""
         query = """
             SELECT * FROM server_permissions WHERE name != 'OWNER';
             """
-        return await cls.fetch(query)
+        return await cls.fetch(query, route=PRIMARY)
@@ -13,8 +13,8 @@ class ServerRolePermission(DataBase):
     @classmethod
     async def assign_permission(cls, server_id, user_id, permission_id):
         query = """
-           INSERT INTO server_user_permissions (user_id, permission_id)
-                SELECT $2, unnest($3::uuid[])
+           INSERT INTO server_user_permissions (server_id, user_id, permission_id)
+                SELECT $1, $2, unnest($3::uuid[])
                   FROM server_members
                  WHERE server_id = $1 AND user_id = $2
              RETURNING user_id, permission_id;
@@ -28,13 +28,9 @@ class ServerRolePermission(DataBase):
     async def remove_permission(cls, server_id, user_id, permission_ids: List[UUID]):
         query = """
         DELETE FROM server_user_permissions
-              WHERE user_id = $2
+              WHERE server_id = $1
+                AND user_id = $2
                 AND permission_id = ANY($3::uuid[])
-         AND EXISTS (
-             SELECT 1
-               FROM server_members
-              WHERE server_id = $1 AND user_id = $2
-          )
           RETURNING user_id, permission_id;
         """
         result = await cls.execute(query, server_id, user_id, permission_ids)
@@ -1,10 +1,11 @@
 import json
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from uuid import UUID
 
 from pydantic import Field, constr
 
 from app.core.database import DataBase
+from app.core.row_mapping import CONSTRUCT
 
 validation_query = """
                      WITH
@@ -90,6 +91,8 @@ class ServerRolesIn(DataBase):
 
 
 class ServerRolesOut(DataBase):
+    row_mapping: ClassVar[str] = CONSTRUCT
+
     id: UUID
     name: str
     description: str
@@ -1,9 +1,18 @@
 from datetime import datetime
-from typing import Optional
+from typing import ClassVar, Optional
 
 from pydantic import UUID4, EmailStr
 
-from app.core.database import DataBase
+from app.core.config import settings
+from app.core.database import PRIMARY, DataBase, prepared_query
+from app.core.row_mapping import CONSTRUCT
+
+get_staff_by_id_query = prepared_query(
+    "staff.get_staff_by_id",
+    """
+        SELECT id, name, email, phone, role, created_at, updated_at FROM staff WHERE id = $1
+    """,
+)
 
 
 class StaffLogin(DataBase):
@@ -17,7 +26,7 @@ class StaffLogin(DataBase):
         query = """
         SELECT * FROM staff WHERE email = $1
         """
-        return await cls.fetchrow(query, email)
+        return await cls.fetchrow(query, email, timeout=settings.DB_TIMEOUT_AUTH)
 
 
 class StaffCreate(DataBase):
@@ -54,6 +63,13 @@ WHERE id = $5
         """
         return await cls.execute(query, staff.name, staff.email, staff.phone, staff.role, staff_id)
 
+    @classmethod
+    async def update_password(cls, staff_id: str, password: str):
+        query = """
+        UPDATE staff SET password = $1 WHERE id = $2
+        """
+        return await cls.execute(query, password, staff_id)
+
     @classmethod
     async def delete_staff(cls, staff_id):
         query = """
@@ -63,6 +79,8 @@ WHERE id = $5
 
 
 class StaffOut(DataBase):
+    row_mapping: ClassVar[str] = CONSTRUCT
+
     id: Optional[UUID4] = None
     name: str
     email: EmailStr
@@ -73,14 +91,12 @@ class StaffOut(DataBase):
 
     @classmethod
     async def get_staff(cls):
+        """Every staff member, read from the primary (the result is cached)."""
         query = """
         SELECT id, name, email, phone, role, created_at, updated_at FROM staff
         """
-        return await cls.fetch(query)
+        return await cls.fetch(query, route=PRIMARY)
 
     @classmethod
     async def get_staff_by_id(cls, staff_id: str):
-        query = """
-        SELECT id, name, email, phone, role, created_at, updated_at FROM staff WHERE id = $1
-        """
-        return await cls.fetchrow(query, staff_id)
+        return await cls.fetchrow(get_staff_by_id_query, staff_id, timeout=settings.DB_TIMEOUT_AUTH)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from app.core.database import DataBase
+from app.core.database import PRIMARY, DataBase
 
 
 class SubscriptionTierIn(DataBase):
@@ -72,6 +72,7 @@ class SubscriptionTierOut(DataBase):
 
     @classmethod
     async def get_tiers(cls):
+        """Every tier with its price, read from the primary (the result is cached)."""
         query = """
             SELECT st.id, st.name, st.description, st.deleted_at, st.created_at, st.updated_at,
                    sp.amount, sp.stripe_price_id, sp.stripe_product_id, sp.stripe_coupon_id,
@@ -79,7 +80,7 @@ class SubscriptionTierOut(DataBase):
               FROM subscription_tiers st
              JOIN subscription_prices sp ON st.id = sp.subscription_tier_id
             """
-        return await cls.fetch(query)
+        return await cls.fetch(query, route=PRIMARY)
 
     @classmethod
     async def get_tier_by_id(cls, tier_id: int):
@@ -6,7 +6,20 @@ from pydantic import UUID4, EmailStr, Field
 from pydantic_extra_types.phone_numbers import PhoneNumber
 
 from app.core.auth import get_password_hash
-from app.core.database import DataBase
+from app.core.config import settings
+from app.core.database import DataBase, prepared_query
+
+get_user_query = prepared_query(
+    "user.get_user",
+    """
+            SELECT users.id, users.username, users.email, users.profile_picture_url,
+                   aud.first_name, aud.last_name, aud.date_of_birth, aud.gender, aud.phone,
+                   aud.address, aud.country, aud.bio, aud.profile_banner_url
+             FROM users
+        LEFT JOIN additional_user_details aud ON aud.user_id = users.id
+            WHERE users.id = $1;
+    """,
+)
 
 
 class UserIn(DataBase):
@@ -22,7 +35,7 @@ class UserIn(DataBase):
             INSERT INTO users (username, email, password)
                  VALUES ($1, $2, $3);
         """
-        return await cls.execute(query, username, email, get_password_hash(password))
+        return await cls.execute(query, username, email, await get_password_hash(password))
 
 
 class UserLogin(DataBase):
@@ -37,7 +50,7 @@ class UserLogin(DataBase):
             FROM users
             WHERE username = $1;
         """
-        user = await cls.fetchrow(query, username)
+        user = await cls.fetchrow(query, username, timeout=settings.DB_TIMEOUT_AUTH)
         return dict(user) if user else None
 
 
@@ -59,17 +72,8 @@ class UserModel(DataBase):
     profile_banner_url: Optional[str] = None
 
     @classmethod
-    async def get_user(cls, username: str) -> dict:
-        query = """
-            SELECT users.id, users.username, users.email, users.profile_picture_url,
-                   aud.first_name, aud.last_name, aud.date_of_birth, aud.gender, aud.phone,
-                   aud.address, aud.country, aud.bio, aud.profile_banner_url
-             FROM users
-        LEFT JOIN additional_user_details aud ON aud.user_id = users.id
-            WHERE users.id = $1;
-
-        """
-        user = await cls.fetchrow(query, username)
+    async def get_user(cls, username: str, route: str = None) -> dict:
+        user = await cls.fetchrow(get_user_query, username, route=route, timeout=settings.DB_TIMEOUT_AUTH)
         return dict(user) if user else None
 
     @classmethod
@@ -1,19 +1,28 @@
 import logging
 
+from app.core import channel_tree, etag, visibility
 from app.models.categories import CategoriesIn, CategoriesOut, CategoriesUpdate
 
 log = logging.getLogger("fastapi")
 
 
+async def _invalidate(server_id: str) -> None:
+    await channel_tree.bump(server_id)
+    await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
+
+
 async def create_category(server_id, name):
     """Create a new category"""
     await CategoriesIn.create_category(server_id, name)
+    await _invalidate(server_id)
 
 
 async def get_categories(server_id: str, current_user_id):
-    """Get all categories for a server, first checking cache in Redis."""
-    categories = await CategoriesOut.get_categories(server_id, current_user_id)
-    return categories
+    """Get the categories of a server the user can see, from the cached channel tree."""
+    categories = await channel_tree.channel_tree(server_id)
+    visible = await visibility.visible_category_ids(server_id, current_user_id)
+    return [category.model_dump(exclude={"channels"}) for category in categories if str(category.id) in visible]
 
 
 async def get_category_by_id(server_id: str, category_id: str):
@@ -22,11 +31,14 @@ async def get_category_by_id(server_id: str, category_id: str):
 
 
 async def update_categories(server_id, category_id, name=None, position=None):
-    return await CategoriesUpdate.update_category(category_id, name, position)
+    result = await CategoriesUpdate.update_category(category_id, name, position)
+    await _invalidate(server_id)
+    return result
 
 
 async def del_category(server_id, category_id):
     res = await CategoriesUpdate.delete_category(server_id, category_id)
     if res == "DELETE 0":
         raise ValueError("Minimum 1 category with a channel is required")
+    await _invalidate(server_id)
     return res
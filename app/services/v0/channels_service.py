@@ -1,37 +1,38 @@
-import json
+from app.core import channel_tree, etag, visibility
+from app.models.channels import ChannelIn, ChannelUpdate
 
-from app.models.channels import ChannelIn, ChannelOut, ChannelUpdate
 
+async def _invalidate(server_id: str) -> None:
+    await channel_tree.bump(server_id)
+    await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
 
-async def create_channel(server_id: str, category_id: str, name: str, description: str, redis):
+
+async def create_channel(server_id: str, category_id: str, name: str, description: str):
     """Create a new channel"""
-    await redis.delete(f"server:{server_id}:channels")
-    return await ChannelIn.create_channel(server_id, category_id, name, description)
+    result = await ChannelIn.create_channel(server_id, category_id, name, description)
+    await _invalidate(server_id)
+    return result
 
 
-async def get_channels(server_id: str, category_id: str, redis):
-    """Get all channels for a category"""
-    cache_key = f"server:{server_id}:channels"
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        return json.loads(cached_data)
+async def get_channels(server_id: str, category_id: str, user_id: str):
+    """Get the channels of a category the user can see, sliced from the cached channel tree"""
+    channels = await channel_tree.category_channels(server_id, category_id)
+    visible = await visibility.visible_channel_ids(server_id, user_id)
+    return [channel for channel in channels if str(channel.id) in visible]
 
-    result = await ChannelOut.get_channels(server_id, category_id)
-    serializable_result = [channel.model_dump() for channel in result]
-    await redis.set(cache_key, json.dumps(serializable_result, default=lambda o: str(o)), ex=86400)
-    return result
 
-
-async def update_channel(channel_id: str, server_id: str, name: str, description: str, position: int, redis):
+async def update_channel(channel_id: str, server_id: str, name: str, description: str, position: int):
     """Update a channel"""
-    await redis.delete(f"server:{server_id}:channels")
-    return await ChannelUpdate.update_channel(channel_id, name, description, position)
+    result = await ChannelUpdate.update_channel(channel_id, name, description, position)
+    await _invalidate(server_id)
+    return result
 
 
-async def del_channel(server_id: str, channel_id: str, redis):
+async def del_channel(server_id: str, channel_id: str):
     """Delete a channel"""
     result = await ChannelUpdate.del_channel(server_id, channel_id)
     if result == "DELETE 0":
         raise ValueError("Minimum 1 channel is required")
-    await redis.delete(f"server:{server_id}:channels")
+    await _invalidate(server_id)
     return result
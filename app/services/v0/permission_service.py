@@ -1,40 +1,36 @@
 from functools import wraps
+from typing import Iterable
 
 from fastapi import HTTPException
 
-from app.core.database import DataBase
+from app.core import permissions
+from app.core.config import settings
+from app.core.database import DataBase, prepared_query
+
+is_staff_query = prepared_query(
+    "permission.is_staff", "SELECT EXISTS (SELECT 1 FROM staff WHERE id = $1 AND role = $2)"
+)
 
 
 class PermissionService:
     @staticmethod
     async def has_permission(user_id: str, server_id: str, required_permissions: list[str]) -> bool:
-        query = """
-        SELECT EXISTS (
-            -- Check if user has permission via a role
-            SELECT 1
-            FROM server_user_roles sur
-            JOIN server_roles sr ON sr.id = sur.role_id
-            JOIN server_role_permissions srp ON srp.role_id = sr.id
-            JOIN server_permissions sp ON sp.id = srp.permission_id
-            WHERE sur.user_id = $1
-            AND sr.server_id = $2
-            AND sp.name = ANY($3::text[])
-        ) OR EXISTS (
-            -- Check if user has permission directly (user-specific permission)
-            SELECT 1
-            FROM server_user_permissions sup
-            JOIN server_permissions sp ON sp.id = sup.permission_id
-            WHERE sup.user_id = $1
-            AND sp.name = ANY($3::text[])
-        ) OR EXISTS (
-            -- Check if user is the owner of the server
-            SELECT 1
-            FROM servers
-            WHERE id = $2
-            AND owner_id = $1
-        )
-        """
-        return await DataBase.fetchval(query, user_id, server_id, required_permissions)
+        return await permissions.has_any(user_id, server_id, required_permissions)
+
+    @staticmethod
+    async def members_permissions(server_id: str, user_ids: Iterable[str]) -> permissions.PermissionMasks:
+        """Effective permissions of many members of one server, resolved in a single query."""
+        return await permissions.members_permissions(server_id, user_ids)
+
+    @staticmethod
+    async def servers_permissions(user_id: str, server_ids: Iterable[str]) -> permissions.PermissionMasks:
+        """Effective permissions of one user across many servers, resolved in a single query."""
+        return await permissions.servers_permissions(user_id, server_ids)
+
+    @staticmethod
+    async def required_mask(required_permissions: list[str]) -> int:
+        """Mask to test PermissionMasks against: ``masks.allows(id, mask)`` means any of the permissions."""
+        return await permissions.permission_mask(required_permissions)
 
 
 # Decorator to check permissions
@@ -59,8 +55,7 @@ def check_permissions(required_permissions: list[str]):
 
 # staff wrapper
 async def is_staff(user_id: str, role: str) -> bool:
-    query = "SELECT EXISTS (SELECT 1 FROM staff WHERE id = $1 AND role = $2)"
-    return await DataBase.fetchval(query, user_id, role)
+    return await DataBase.fetchval(is_staff_query, user_id, role, timeout=settings.DB_TIMEOUT_AUTH)
 
 
 def staff_required(allowed_roles: list[str]):
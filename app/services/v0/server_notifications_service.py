@@ -1,19 +1,22 @@
-from app.core.database import DataBase
+from app.core import cache, etag
+from app.core.database import PRIMARY, DataBase
 
 
-async def get_notification_preference(redis, user_id: str, server_id: str):
-    cache_key = f"notification_preference:{server_id}:{user_id}"
-    cached_preference = await redis.get(cache_key)
-    if cached_preference:
-        return cached_preference
-
-    # If not cached, fetch from the database
+# Server defaults are part of the cached value; changing one invalidates the server's tag
+@cache.cached(
+    "notification_preference",
+    key="{server_id}:{user_id}",
+    ttl=86400,
+    tags=["server:{server_id}:notification_preferences"],
+)
+async def get_notification_preference(user_id: str, server_id: str):
     query = """
           SELECT notification_preference
             FROM server_notification_settings
            WHERE user_id = $1 AND server_id = $2;
       """
-    result = await DataBase.fetchval(query, user_id, server_id)
+    # From the primary: a lagging replica would put an overwritten preference back in the cache
+    result = await DataBase.fetchval(query, user_id, server_id, route=PRIMARY)
 
     if result is None:
         # If no custom record, use the server's default from the config table
@@ -22,15 +25,11 @@ async def get_notification_preference(redis, user_id: str, server_id: str):
                      FROM server_config
                     WHERE server_id = $1;
                """
-        result = await DataBase.fetchval(query, server_id)
-        return result
-    await redis.set(cache_key, result)
+        result = await DataBase.fetchval(query, server_id, route=PRIMARY)
     return result
 
 
-async def update_notification_preference(redis, user_id: str, server_id: str, notification_preference: str):
-    cache_key = f"notification_preference:{server_id}:{user_id}"
-    await redis.delete(cache_key)
+async def update_notification_preference(user_id: str, server_id: str, notification_preference: str):
     # Fetch server config to get its default notification setting
     config_query = """
           SELECT default_notification_setting
@@ -46,48 +45,40 @@ async def update_notification_preference(redis, user_id: str, server_id: str, no
                  WHERE user_id = $1 AND server_id = $2;
             """
         result = await DataBase.execute(delete_query, user_id, server_id)
-        return result
-
-    # If user is setting a custom preference, insert or update the record
-    query = """
-        INSERT INTO server_notification_settings (user_id, server_id, notification_preference)
-             VALUES ($1, $2, $3)
-        ON CONFLICT (user_id, server_id)
-      DO UPDATE SET notification_preference = $3, updated_at = NOW()
-        """
-    return await DataBase.execute(query, user_id, server_id, notification_preference)
+    else:
+        # If user is setting a custom preference, insert or update the record
+        query = """
+            INSERT INTO server_notification_settings (user_id, server_id, notification_preference)
+                 VALUES ($1, $2, $3)
+            ON CONFLICT (user_id, server_id)
+          DO UPDATE SET notification_preference = $3, updated_at = NOW()
+            """
+        result = await DataBase.execute(query, user_id, server_id, notification_preference)
+    await cache.invalidate("notification_preference", f"{server_id}:{user_id}")
+    # Shown in the user's server list
+    await etag.bump_users(user_id)
+    return result
 
 
 async def insert_batch_notifications(updates):
-    placeholders = []
-    params = []
-    idx = 1
+    # Fold repeated (user, server, channel) updates together; one merge may touch each row only once
+    counters = {}
     for update in updates:
-        # Build a placeholder string like "($1, $2, $3, $4, $5, NOW())"
-        placeholders.append("(" + ", ".join([f"${i}" for i in range(idx, idx + 5)]) + ", NOW())")
-        params.extend(
-            [
-                update.user_id,
-                update.server_id,
-                update.channel_id,
-                update.unread_count,
-                update.mention_count,
-            ]
-        )
-        idx += 5
+        key = (update.user_id, update.server_id, update.channel_id)
+        unread_count, mention_count = counters.get(key, (0, 0))
+        counters[key] = (unread_count + update.unread_count, mention_count + update.mention_count)
 
-    query = f"""
-        INSERT INTO user_notification_counters
-                    (user_id, server_id, channel_id, unread_count, mention_count, updated_at)
-             VALUES {', '.join(placeholders)}
-        ON CONFLICT (user_id, server_id, channel_id)
-      DO UPDATE SET
-                    unread_count = user_notification_counters.unread_count + EXCLUDED.unread_count,
-                    mention_count = user_notification_counters.mention_count + EXCLUDED.mention_count,
-                    updated_at = NOW();
-    """
-    # Unpack the params list so that each value is passed as a separate argument.
-    await DataBase.execute(query, *params)
+    await DataBase.copy_upsert(
+        "user_notification_counters",
+        ["user_id", "server_id", "channel_id", "unread_count", "mention_count"],
+        [(*key, unread_count, mention_count) for key, (unread_count, mention_count) in counters.items()],
+        conflict_columns=["user_id", "server_id", "channel_id"],
+        update={
+            "unread_count": "user_notification_counters.unread_count + EXCLUDED.unread_count",
+            "mention_count": "user_notification_counters.mention_count + EXCLUDED.mention_count",
+            "updated_at": "NOW()",
+        },
+    )
 
 
 async def get_batch_notification(user_id):
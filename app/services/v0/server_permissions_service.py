@@ -1,49 +1,100 @@
-import json
 from typing import List
 from uuid import UUID
 
+from app.core import cache, etag, permissions, visibility
 from app.core.database import DataBase
 from app.models.server_permissions import ServerPermission
 from app.models.server_role_permissions import ServerRolePermission
 
 
-async def get_permissions(redis):
-    cache_key = "permissions"
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        return json.loads(cached_data)
-
-    result = await ServerPermission.get_all_permissions()
-    serializable_result = [perms.dict() for perms in result]
-    await redis.set(cache_key, json.dumps(serializable_result, default=lambda o: str(o)))
-    return result
+@cache.cached("permissions", key="all", ttl=86400, model=List[ServerPermission])
+async def get_permissions() -> List[ServerPermission]:
+    return await ServerPermission.get_all_permissions()
 
 
 async def assign_permission_to_user(server_id: UUID, user_id: UUID, permission_id: List[UUID]):
-    return await ServerRolePermission.assign_permission(server_id, user_id, permission_id)
+    result = await ServerRolePermission.assign_permission(server_id, user_id, permission_id)
+    await permissions.invalidate_member(server_id, user_id)
+    await etag.bump_server_members(server_id, [user_id])
+    return result
 
 
 async def remove_permission(server_id: UUID, user_id: UUID, permission_id: List[UUID]):
-    return await ServerRolePermission.remove_permission(server_id, user_id, permission_id)
+    result = await ServerRolePermission.remove_permission(server_id, user_id, permission_id)
+    await permissions.invalidate_member(server_id, user_id)
+    await etag.bump_server_members(server_id, [user_id])
+    return result
 
 
-async def assign_role_to_category(category_id: str, role_id: str):
-    query = """
-      INSERT INTO category_role_assignments (category_id, role_id)
-      VALUES ($1, $2)
-      ON CONFLICT (category_id, role_id) DO NOTHING
-      RETURNING *;
+# The path's server_id is what check_permissions authorised, so the assignment tables are only written when
+# both the target and the role belong to it. An empty row from the LEFT JOIN means the pair was already assigned.
+def _assign_query(table: str, column: str, targets: str) -> str:
+    return f"""
+      WITH target AS (
+           SELECT t.id AS {column}, sr.id AS role_id
+             FROM {targets} t
+             JOIN server_roles sr ON sr.id = $3 AND sr.server_id = $1
+            WHERE t.id = $2 AND t.server_id = $1
+      ), inserted AS (
+           INSERT INTO {table} ({column}, role_id)
+           SELECT {column}, role_id FROM target
+               ON CONFLICT ({column}, role_id) DO NOTHING
+        RETURNING *
+      )
+      SELECT inserted.* FROM target LEFT JOIN inserted ON TRUE;
       """
-    res = await DataBase.fetchrow(query, category_id, role_id)
+
+
+def _remove_query(table: str, column: str, targets: str) -> str:
+    return f"""
+      DELETE FROM {table} a
+            USING {targets} t, server_roles sr
+            WHERE a.{column} = $2 AND a.role_id = $3
+              AND t.id = a.{column} AND t.server_id = $1
+              AND sr.id = a.role_id AND sr.server_id = $1"""
+
+
+assign_category_role_query = _assign_query("category_role_assignments", "category_id", "categories")
+remove_category_role_query = _remove_query("category_role_assignments", "category_id", "categories")
+assign_channel_role_query = _assign_query("channel_role_assignments", "channel_id", "channels")
+remove_channel_role_query = _remove_query("channel_role_assignments", "channel_id", "channels")
+
+
+async def assign_role_to_category(server_id: str, category_id: str, role_id: str):
+    res = await DataBase.fetchrow(assign_category_role_query, server_id, category_id, role_id)
     if res is None:
+        raise ValueError("Category or role not found in this server")
+    if res["id"] is None:
         raise ValueError("Role Already assigned to category")
+    await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
     return res
 
 
-async def remove_role_from_category(category_id: str, role_id: str):
-    query = """
-    DELETE FROM category_role_assignments WHERE category_id = $1 AND role_id = $2"""
-    res = await DataBase.execute(query, category_id, role_id)
+async def remove_role_from_category(server_id: str, category_id: str, role_id: str):
+    res = await DataBase.execute(remove_category_role_query, server_id, category_id, role_id)
     if res == "DELETE 0":
         raise ValueError("Role not assigned to category")
+    await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
+    return res
+
+
+async def assign_role_to_channel(server_id: str, channel_id: str, role_id: str):
+    res = await DataBase.fetchrow(assign_channel_role_query, server_id, channel_id, role_id)
+    if res is None:
+        raise ValueError("Channel or role not found in this server")
+    if res["id"] is None:
+        raise ValueError("Role Already assigned to channel")
+    await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
+    return res
+
+
+async def remove_role_from_channel(server_id: str, channel_id: str, role_id: str):
+    res = await DataBase.execute(remove_channel_role_query, server_id, channel_id, role_id)
+    if res == "DELETE 0":
+        raise ValueError("Role not assigned to channel")
+    await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
     return res
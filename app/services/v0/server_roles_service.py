@@ -1,10 +1,12 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from fastapi.exceptions import HTTPException
 from starlette import status
 
+from app.core import etag, permissions, visibility
 from app.core.database import DataBase
+from app.core.pagination import decode_cursor, paginate
 from app.models.server_roles import ServerRolesIn, ServerRolesOut, ServerRoleUpdate
 from app.models.server_user_roles import ServerUserRolesIn
 
@@ -14,36 +16,64 @@ async def create_role(server_id: UUID, name: str, description: str, color: str,
         await ServerRolesIn.new_role_with_permissions(server_id, name, description, color, permissions)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if permissions:
+        # The compiled index lists the server's administrator roles; the new one may be among them
+        await visibility.invalidate(server_id)
+    await etag.bump_server(server_id)
 
 
 async def get_role(server_id: UUID, page: int = 1, per_page: int = 25):
     return await ServerRolesOut.get_role(server_id, page, per_page)
 
 
-async def get_all_role_users(role_id: UUID, page: int = 1, per_page: int = 25):
+async def get_all_role_users(role_id: UUID, page: int = 1, per_page: int = 25, cursor: Optional[str] = None):
+    created_at, user_id = decode_cursor("role_users", cursor, 2)
     query = """
-            SELECT u.id, sur.role_id, u.username, u.email, u.is_verified, u.profile_picture_url
+            SELECT u.id, sur.role_id, u.username, u.email, u.is_verified, u.profile_picture_url, sur.created_at
               FROM server_user_roles sur
               JOIN users u ON sur.user_id = u.id
              WHERE role_id = $1
+               AND ($4::timestamptz IS NULL OR (sur.created_at, sur.user_id) < ($4::timestamptz, $5::uuid))
+          ORDER BY sur.created_at DESC, sur.user_id DESC
              LIMIT $2 OFFSET $3"""
-    offset = (page - 1) * per_page
-    return await DataBase.fetch(query, role_id, per_page, offset)
+    offset = 0 if cursor else (page - 1) * per_page
+    users = await DataBase.fetch(query, role_id, per_page + 1, offset, created_at, user_id)
+    return paginate("role_users", users, per_page, ("created_at", "id"))
 
 
-async def update_role(role_id: UUID, update_data):
-    return await ServerRoleUpdate.update_server_role(role_id, update_data)
+async def update_role(role_id: UUID, update_data, server_id: UUID):
+    result = await ServerRoleUpdate.update_server_role(role_id, update_data)
+    if update_data.permissions is not None:
+        await permissions.invalidate_server(server_id)
+        await visibility.invalidate(server_id)
+        # Holders' permissions changed: every member's view may have
+        await etag.bump_server_members(server_id)
+    else:
+        await etag.bump_server(server_id)
+    return result
 
 
-async def delete_role(role_id: UUID):
+async def delete_role(role_id: UUID, server_id: UUID):
     if await ServerRolesIn.delete_role(role_id):
+        await permissions.invalidate_server(server_id)
+        await visibility.invalidate(server_id)
+        await visibility.invalidate_server_roles(server_id)
+        await etag.bump_server_members(server_id)
         return
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role with given id does not exist.")
 
 
 async def assign_role(role_id: UUID, server_id: UUID, user_id: UUID):
-    return await ServerUserRolesIn.assign_role_to_user(user_id, role_id, server_id)
+    result = await ServerUserRolesIn.assign_role_to_user(user_id, role_id, server_id)
+    await permissions.invalidate_member(server_id, user_id)
+    await visibility.invalidate_member_roles(server_id, user_id)
+    await etag.bump_server_members(server_id, [user_id])
+    return result
 
 
 async def remove_role(role_id: UUID, server_id: UUID, user_id: UUID):
-    return await ServerUserRolesIn.remove_role_from_user(user_id, role_id, server_id)
+    result = await ServerUserRolesIn.remove_role_from_user(user_id, role_id, server_id)
+    await permissions.invalidate_member(server_id, user_id)
+    await visibility.invalidate_member_roles(server_id, user_id)
+    await etag.bump_server_members(server_id, [user_id])
+    return result
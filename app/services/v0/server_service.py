@@ -1,14 +1,20 @@
+import hashlib
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 
+import orjson
 from asyncpg import Record
 
-from app.core.database import DataBase
+from app.core import cache, etag, permissions, visibility
+from app.core.config import settings
+from app.core.database import PRIMARY, DataBase, prepared_query
+from app.core.pagination import decode_cursor, paginate
 from app.models.server import ServerIn, ServerOut, ServerUpdate
 from app.models.server_members import ServerMembers
 from app.models.server_permissions import ServerPermission
 from app.models.server_roles import ServerRolesOut
+from app.services.v0.server_notifications_service import get_notification_preference
 
 log = logging.getLogger("fastapi")
 
@@ -40,7 +46,9 @@ async def get_server_config(server_id: str):
 async def create_server(
     current_user, name: str, description: str, is_public: bool = False, server_picture_url: str = None
 ):
-    return await ServerIn.create_server(name, description, current_user["id"], is_public, server_picture_url)
+    server = await ServerIn.create_server(name, description, current_user["id"], is_public, server_picture_url)
+    await etag.bump_users(current_user["id"])
+    return server
 
 
 async def get_server_details_by_id(server_id: str):
@@ -55,36 +63,62 @@ async def join_server(invite_link: str, current_user):
     server = await ServerOut.get_server_by_invite_code(invite_link)
     if server is None:
         raise ValueError("Invalid invite link")
+    ban_query = """
+        SELECT EXISTS (SELECT 1 FROM server_bans
+         WHERE server_id = $1 AND user_id = $2);
+        """
+    member_count, server_config, is_banned = await DataBase.gather(
+        get_server_member_count(server.id),
+        get_server_config(server.id),
+        DataBase.fetchval(ban_query, server.id, current_user["id"]),
+    )
     # Check for server member limit
-    result = await user_server_count(current_user)
-    server_config = await get_server_config(server.id)
-    if result > server_config.max_members:
+    if member_count > server_config.max_members:
         raise ValueError(f"Server has reached its maximum member limit of {server_config.max_members}")
-    query = """
-        SELECT * FROM server_bans
-         WHERE server_id = $1 AND user_id = $2;
-        """
-    res = await DataBase.fetch(query, server.id, current_user["id"])
-    if res:
+    if is_banned:
         raise ValueError("You are banned from this server")
 
-    if 1000 < result < 1010:
+    if 1000 < member_count < 1010:
         query = """
-            UPDATE server_config default_notification_setting = 'mentions' WHERE server_id = $1
+            UPDATE server_config SET default_notification_setting = 'mentions' WHERE server_id = $1
         """
         await DataBase.execute(query, server.id)
+        await visibility.invalidate(server.id)
+        await cache.invalidate_tags(f"server:{server.id}:notification_preferences")
+        # Every member's server list shows the default
+        await etag.bump_server_members(server.id)
 
-    return server, await ServerMembers.add_member(user_id=current_user["id"], server_id=server.id)
+    member = await ServerMembers.add_member(user_id=current_user["id"], server_id=server.id)
+    await etag.bump_server(server.id)
+    await etag.bump_users(current_user["id"])
+    return server, member
 
 
 async def leave_server(server_id: str, current_user):
-    return await ServerMembers.remove_member(user_id=current_user, server_id=server_id)
+    # An owner leaving deletes the server along with its roles, so its members are read first
+    members = await etag.server_member_ids(server_id)
+    result = await ServerMembers.remove_member(user_id=current_user, server_id=server_id)
+    await permissions.invalidate_server(server_id)
+    await visibility.invalidate(server_id)
+    await visibility.invalidate_member_roles(server_id, current_user)
+    await etag.bump_server_members(server_id, members)
+    return result
 
 
 async def update_server(server_id: str, **kwargs):
+    """Write the update; call server_updated once the surrounding transaction, if any, has committed."""
     return await ServerUpdate.update_server(server_id, **kwargs)
 
 
+async def server_updated(server_id: str, owner_changed: bool) -> None:
+    # After the commit, so no reader can pair the new versions with the old rows
+    if owner_changed:
+        await permissions.invalidate_server(server_id)
+    # The compiled index carries the server row
+    await visibility.invalidate(server_id)
+    await etag.bump_server_members(server_id)
+
+
 async def get_mutual_servers(user_id: str, current_user_id: str):
     query = """
             SELECT s.* FROM servers AS s
@@ -161,10 +195,14 @@ async def get_user_roles_permissions(user_id, server_id):
 
 
 async def regenerate_invite_code(server_id: str):
-    return await ServerUpdate.regenerate_invite_code(server_id)
+    invite_code = await ServerUpdate.regenerate_invite_code(server_id)
+    await visibility.invalidate(server_id)
+    await etag.bump_server_members(server_id)
+    return invite_code
 
 
-async def get_all_server_users(server_id: str, limit: int, offset: int):
+async def get_all_server_users(server_id: str, limit: int, offset: int = 0, cursor: Optional[str] = None):
+    joined_at, user_id = decode_cursor("server_users", cursor, 2)
     query = """
         SELECT sm.user_id, sm.server_id, sm.nickname, sm.joined_at, sm.deleted_at,
                 u.username, u.profile_picture_url,
@@ -183,34 +221,55 @@ async def get_all_server_users(server_id: str, limit: int, offset: int):
      LEFT JOIN server_user_roles sr ON sm.user_id = sr.user_id
      LEFT JOIN server_roles r ON sr.role_id = r.id
            AND r.server_id = $1
-     LEFT JOIN server_user_permissions sup ON sm.user_id = sup.user_id
+     LEFT JOIN server_user_permissions sup ON sup.server_id = sm.server_id AND sup.user_id = sm.user_id
      LEFT JOIN server_permissions sp ON sup.permission_id = sp.id
-           AND sm.server_id = $1
          WHERE sm.server_id = $1
+           AND ($4::timestamptz IS NULL OR (sm.joined_at, sm.user_id) < ($4::timestamptz, $5::uuid))
       GROUP BY sm.user_id, sm.server_id, sm.nickname, sm.joined_at, sm.deleted_at, u.username, u.profile_picture_url
-      ORDER BY sm.joined_at DESC
+      ORDER BY sm.joined_at DESC, sm.user_id DESC
          LIMIT $2 OFFSET $3;
 
     """
-    return await DataBase.fetch(query, server_id, limit, offset)
+    # A cursor supersedes the legacy offset
+    offset = 0 if cursor else offset
+    users = await DataBase.fetch(query, server_id, limit + 1, offset, joined_at, user_id)
+    return paginate("server_users", users, limit, ("joined_at", "user_id"))
 
 
-async def kick_user(server_id: str, user_id: List[str]):
+def stream_server_members(server_id: str) -> AsyncIterator[Record]:
+    query = """
+        SELECT sm.user_id, u.username, sm.nickname, sm.joined_at
+          FROM server_members sm
+          JOIN users u ON sm.user_id = u.id
+         WHERE sm.server_id = $1
+      ORDER BY sm.joined_at, sm.user_id;
+    """
+    return DataBase.stream(query, server_id, timeout=settings.DB_TIMEOUT_ADMIN)
+
+
+async def _remove_members(server_id: str, user_ids: List[str]):
     query = """
         DELETE FROM server_members
               WHERE server_id = $1 AND user_id = ANY($2::uuid[]);
         """
-    return await DataBase.execute(query, server_id, user_id)
+    return await DataBase.execute(query, server_id, user_ids)
 
 
-async def ban_member_from_server(server_id: str, user_ids: List[str], reason: str):
-    await kick_user(server_id, user_ids)
-    query = """
-        INSERT INTO server_bans (server_id, user_id, reason)
-            SELECT $1, unnest($2::uuid[]), $3;
+async def kick_user(server_id: str, user_id: List[str]):
+    result = await _remove_members(server_id, user_id)
+    await etag.bump_server_members(server_id, user_id)
+    return result
 
-        """
-    return await DataBase.execute(query, server_id, user_ids, reason)
+
+async def ban_member_from_server(server_id: str, user_ids: List[str], reason: str):
+    async with DataBase.connection(transaction=True):
+        await _remove_members(server_id, user_ids)
+        result = await DataBase.copy_records(
+            "server_bans", ["server_id", "user_id", "reason"], [(server_id, user_id, reason) for user_id in user_ids]
+        )
+    # After the commit, so no reader can pair the new versions with the old rows
+    await etag.bump_server_members(server_id, user_ids)
+    return result
 
 
 async def unban_member_from_server(server_id: str, user_ids: List[str]):
@@ -221,10 +280,14 @@ async def unban_member_from_server(server_id: str, user_ids: List[str]):
     result = await DataBase.execute(query, server_id, user_ids)
     if result == "DELETE 0":
         raise ValueError("User not banned")
+    await etag.bump_server(server_id)
     return result
 
 
-async def get_banned_members_list(server_id: str, search_query: str, page: int, per_page: int):
+async def get_banned_members_list(
+    server_id: str, search_query: str, page: int, per_page: int, cursor: Optional[str] = None
+):
+    created_at, user_id = decode_cursor("banned_members", cursor, 2)
     query = """
     SELECT sb.reason, sb.created_at, sb.user_id,
              u.username, u.profile_picture_url
@@ -236,9 +299,12 @@ async def get_banned_members_list(server_id: str, search_query: str, page: int,
                OR $2::text = ''
                OR u.username ILIKE '%' || $2::text || '%'
           )
+           AND ($5::timestamptz IS NULL OR (sb.created_at, sb.user_id) < ($5::timestamptz, $6::uuid))
+  ORDER BY sb.created_at DESC, sb.user_id DESC
      LIMIT $3 OFFSET $4"""
-    offset = (page - 1) * per_page
-    return await DataBase.fetch(query, search_query, server_id, page, offset)
+    offset = 0 if cursor else (page - 1) * per_page
+    members = await DataBase.fetch(query, server_id, search_query, per_page + 1, offset, created_at, user_id)
+    return paginate("banned_members", members, per_page, ("created_at", "user_id"))
 
 
 async def get_audit_logs(
@@ -249,7 +315,9 @@ async def get_audit_logs(
     action: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
-) -> list[DataBase] | list[Record]:
+    cursor: Optional[str] = None,
+) -> Tuple[List[Record], Optional[str]]:
+    after_timestamp, after_id = decode_cursor("audit_logs", cursor, 2)
     query = """
        SELECT *
          FROM audit_logs
@@ -258,7 +326,118 @@ async def get_audit_logs(
           AND ($3::timestamptz IS NULL OR timestamp <= $3)
           AND ($4::text IS NULL OR entity = $4)
           AND ($5::text is NULL or action = $5)
-     ORDER BY timestamp DESC
+          AND ($8::timestamptz IS NULL OR (timestamp, id) < ($8::timestamptz, $9::int))
+     ORDER BY timestamp DESC, id DESC
         LIMIT $6 OFFSET $7;
     """
-    return await DataBase.fetch(query, server_id, start_time, end_time, event_type, action, limit, offset)
+    offset = 0 if cursor else offset
+    logs = await DataBase.fetch(
+        query, server_id, start_time, end_time, event_type, action, limit + 1, offset, after_timestamp, after_id
+    )
+    return paginate("audit_logs", logs, limit, ("timestamp", "id"))
+
+
+def stream_audit_logs(
+    server_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    action: Optional[str] = None,
+) -> AsyncIterator[Record]:
+    query = """
+       SELECT id, username, entity, entity_uuid, action, changes, timestamp
+         FROM audit_logs
+        WHERE entity_uuid = $1
+          AND ($2::timestamptz IS NULL OR timestamp >= $2)
+          AND ($3::timestamptz IS NULL OR timestamp <= $3)
+          AND ($4::text IS NULL OR entity = $4)
+          AND ($5::text is NULL or action = $5)
+     ORDER BY timestamp DESC, id DESC;
+    """
+    return DataBase.stream(
+        query, server_id, start_time, end_time, event_type, action, timeout=settings.DB_TIMEOUT_ADMIN
+    )
+
+
+user_server_roles_query = prepared_query(
+    "server.user_roles",
+    """
+        SELECT sr.id, sr.name, sr.color, sr.hierarchy
+          FROM server_user_roles sur
+          JOIN server_roles sr ON sr.id = sur.role_id
+         WHERE sur.user_id = $1 AND sr.server_id = $2
+      ORDER BY sr.hierarchy DESC, sr.name
+    """,
+)
+user_server_counters_query = prepared_query(
+    "server.user_counters",
+    """
+        SELECT channel_id, unread_count, mention_count
+          FROM user_notification_counters
+         WHERE user_id = $1 AND server_id = $2
+    """,
+)
+
+
+def _bootstrap_scopes(server_id: str, user_id: str) -> List[str]:
+    # Every write that changes a bootstrap bumps one of these: the server row, roles, role permissions,
+    # categories, channels and visibility the server's; the caller's roles, direct grants and notification
+    # preference the caller's; permission definitions the global one
+    return [f"server:{server_id}", f"user:{user_id}", "permissions"]
+
+
+async def bootstrap_versions(server_id: str, user_id: str) -> Optional[List[int]]:
+    """Counters the bootstrap of ``user_id`` in ``server_id`` depends on; None when Redis cannot tell."""
+    return await etag.versions(*_bootstrap_scopes(server_id, user_id))
+
+
+async def get_unread_counters(server_id: str, user_id: str) -> List[Record]:
+    return await DataBase.fetch(user_server_counters_query, user_id, server_id)
+
+
+def bootstrap_etag(versions: List[int], counters: List[Record]) -> str:
+    """ETag of a bootstrap: its counters, plus the unread counters, which change without bumping any."""
+    digest = hashlib.sha256(orjson.dumps([versions, [tuple(counter) for counter in counters]], default=str))
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+async def get_server_bootstrap(
+    server_id: str, user_id: str, versions: Optional[List[int]]
+) -> Optional[Tuple[dict, Optional[str]]]:
+    """
+    Everything a client needs to open a server, with its ETag (from bootstrap_etag over ``versions``, read
+    before this call so a concurrent write can only make the tag older than the data; None without them).
+    Per-server parts (server row, categories, channels, visibility) come from the compiled visibility index;
+    per-user parts are read concurrently, from the primary where the tag vouches for them. Returns None for an
+    unknown server.
+    """
+    index = await visibility.server_visibility(server_id)
+    if index.server is None:
+        return None
+    roles, mask, notification_preference, counters = await DataBase.gather(
+        DataBase.fetch(user_server_roles_query, user_id, server_id, route=PRIMARY),
+        permissions.effective_permissions(user_id, server_id),
+        get_notification_preference(user_id, server_id),
+        get_unread_counters(server_id, user_id),
+    )
+    role_ids = [str(role["id"]) for role in roles]
+    visible_categories = index.visible_categories(str(user_id), role_ids)
+    visible_channels = index.visible_channels(str(user_id), role_ids)
+    channels_by_category = {}
+    for channel in index.channels:
+        if str(channel["id"]) in visible_channels:
+            channels_by_category.setdefault(str(channel["category_id"]), []).append(channel)
+    bootstrap = {
+        "server": index.server,
+        "categories": [
+            {**category, "channels": channels_by_category.get(str(category["id"]), [])}
+            for category in index.categories
+            if str(category["id"]) in visible_categories
+        ],
+        "roles": [dict(role) for role in roles],
+        "is_owner": mask == permissions.OWNER,
+        "permissions": await permissions.permission_names(mask),
+        "notification_preference": notification_preference,
+        "unread": [dict(counter) for counter in counters],
+    }
+    return bootstrap, None if versions is None else bootstrap_etag(versions, counters)
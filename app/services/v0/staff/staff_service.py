@@ -1,44 +1,41 @@
-import json
+from typing import List
 
-from app.core.auth import verify_password
+from app.core import cache
+from app.core.auth import get_password_hash, password_needs_rehash, verify_password
 from app.models.staff.staff import StaffCreate, StaffLogin, StaffOut, StaffUpdate
 
 
 async def authenticate_staff(email, password):
     staff = await StaffLogin.get_staff_by_email(email)
     print(staff)
-    if staff and verify_password(password, staff.password):
+    if staff and await verify_password(password, staff.password):
+        if password_needs_rehash(staff.password):
+            await StaffUpdate.update_password(staff.id, await get_password_hash(password))
         return staff
     return None
 
 
-async def get_staff_list(redis):
-    cache_key = "staff_list"
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        return json.loads(cached_data)
+@cache.cached("staff", key="list", ttl=86400, model=List[StaffOut])
+async def get_staff_list() -> List[StaffOut]:
+    return await StaffOut.get_staff()
 
-    staff_members = await StaffOut.get_staff()
-    serializable_result = [staff.model_dump() for staff in staff_members]
-    await redis.set(cache_key, json.dumps(serializable_result, default=str), ex=86400)
-    return staff_members
 
-
-async def create_new_staff(redis, staff):
-    await redis.delete("staff_list")
+async def create_new_staff(staff):
     res = await StaffCreate.create_staff(staff.name, staff.email, staff.phone, staff.role, staff.password)
     if res == "INSERT 0 0":
         raise ValueError("Staff member with the given email id already exists")
+    await cache.invalidate("staff", "list")
     return res
 
 
-async def update_staff_details(redis, staff_id, staff):
-    await redis.delete("staff_list")
-    return await StaffUpdate.update_staff(staff_id, staff)
+async def update_staff_details(staff_id, staff):
+    res = await StaffUpdate.update_staff(staff_id, staff)
+    await cache.invalidate("staff", "list")
+    return res
     # return await StaffOut.get_staff_by_id(staff_id)
 
 
-async def delete_staff_record(redis, staff_id):
-    await redis.delete("staff_list")
+async def delete_staff_record(staff_id):
     res = await StaffUpdate.delete_staff(staff_id)
+    await cache.invalidate("staff", "list")
     return res
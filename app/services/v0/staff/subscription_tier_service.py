@@ -1,7 +1,8 @@
-import json
+from typing import List
 
 import stripe
 
+from app.core import cache
 from app.core.config import settings
 from app.models.staff.subscription_tier import (
     SubscriptionTierIn,
@@ -12,27 +13,14 @@ from app.models.staff.subscription_tier import (
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
-async def get_subscription_tiers(redis):
-    cache_key = "subscription_tier"
-    await redis.delete("subscription_tier")
-
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        return cached_data
-    else:
-        tiers = await SubscriptionTierOut.get_tiers()
-        serializable_result = [
-            {**tier.model_dump(), "created_at": str(tier.created_at), "updated_at": str(tier.updated_at)}
-            for tier in tiers
-        ]
-        await redis.set(cache_key, json.dumps(serializable_result), ex=86400)
-        return tiers
+@cache.cached("subscription_tiers", key="all", ttl=86400, model=List[SubscriptionTierOut])
+async def get_subscription_tiers() -> List[SubscriptionTierOut]:
+    return await SubscriptionTierOut.get_tiers()
 
 
 # create product then pass it to subscription price
-async def create_subscription_product(redis, tier: str, description: str):
+async def create_subscription_product(tier: str, description: str):
     product = stripe.Product.create(name=tier, description=description)
-    await redis.delete("subscription_tier")
     return product
 
 
@@ -48,25 +36,27 @@ async def create_subscription_price(product, unit_amount: int, currency="INR", i
         await SubscriptionTierIn.create_tier(
             product.id, product.name, product.description, price.id, unit_amount, None, None, currency
         )
+        await cache.invalidate("subscription_tiers", "all")
         return price
     except Exception as e:
         raise ValueError(str(e))
 
 
-async def delete_subscription_product(redis, product_id):
+async def delete_subscription_product(product_id):
     stripe.Product.modify(product_id, active=False)
-    await redis.delete("subscription_tier")
-    return await SubscriptionTierUpdate.delete_tier(product_id)
+    res = await SubscriptionTierUpdate.delete_tier(product_id)
+    await cache.invalidate("subscription_tiers", "all")
+    return res
 
 
-async def activate_subscription_product(redis, product_id):
+async def activate_subscription_product(product_id):
     stripe.Product.modify(product_id, active=True)
-    await redis.delete("subscription_tier")
-    return await SubscriptionTierUpdate.activate_tier(product_id)
+    res = await SubscriptionTierUpdate.activate_tier(product_id)
+    await cache.invalidate("subscription_tiers", "all")
+    return res
 
 
-async def update_subscription_tier(redis, tier_id: int, tier: SubscriptionTierUpdate):
-    await redis.delete("subscription_tier")
+async def update_subscription_tier(tier_id: int, tier: SubscriptionTierUpdate):
     res = await SubscriptionTierOut.get_tier_by_id(tier_id)
     if tier.name is not None or tier.description is not None:
         stripe.Product.modify(
@@ -82,7 +72,7 @@ async def update_subscription_tier(redis, tier_id: int, tier: SubscriptionTierUp
             recurring={"interval": "month"},
             product=res.stripe_product_id,
         )
-        return await SubscriptionTierUpdate.update_tier(
+        result = await SubscriptionTierUpdate.update_tier(
             tier_id,
             tier.name,
             tier.description,
@@ -92,6 +82,15 @@ async def update_subscription_tier(redis, tier_id: int, tier: SubscriptionTierUp
             tier.currency,
             new_price.id,
         )
-    return await SubscriptionTierUpdate.update_tier(
-        tier_id, tier.name, tier.description, tier.amount, tier.stripe_coupon_id, tier.discount_amount, tier.currency
-    )
+    else:
+        result = await SubscriptionTierUpdate.update_tier(
+            tier_id,
+            tier.name,
+            tier.description,
+            tier.amount,
+            tier.stripe_coupon_id,
+            tier.discount_amount,
+            tier.currency,
+        )
+    await cache.invalidate("subscription_tiers", "all")
+    return result
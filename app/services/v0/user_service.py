@@ -1,8 +1,9 @@
 import logging
 from typing import Optional
 
-from app.core.auth import get_password_hash, verify_password
-from app.models.user import ChangePassword, UserIn, UserLogin
+from app.core import user_cache
+from app.core.auth import get_password_hash, password_needs_rehash, verify_password
+from app.models.user import ChangePassword, UserIn, UserLogin, UserUpdate
 
 log = logging.getLogger("fastapi")
 
@@ -13,10 +14,20 @@ async def register_user(username: str, email: str, password: str) -> dict:
 
 async def authenticate_user(username: str, password: str) -> Optional[dict]:
     user = await UserLogin.get_user_by_username(username=username)
-    if user and verify_password(password, user["password"]):
+    if user and await verify_password(password, user["password"]):
+        if password_needs_rehash(user["password"]):
+            await ChangePassword.change_password(await get_password_hash(password), user["id"])
         return user
     return None
 
 
 async def update_user_password(password: str, user_id: str):
-    return await ChangePassword.change_password(get_password_hash(password), user_id)
+    result = await ChangePassword.change_password(await get_password_hash(password), user_id)
+    await user_cache.invalidate(user_id)
+    return result
+
+
+async def update_user(user_id: str, **update_data):
+    user = await UserUpdate.update_user(user_id, **update_data)
+    await user_cache.invalidate(user_id)
+    return user
@@ -15,11 +15,85 @@ from starlette.responses import Response
 router = APIRouter()
 
 REQUEST_COUNT = Counter("http_requests_total", "Total HTTP Requests", ["method", "endpoint", "status_code"])
+CONDITIONAL_REQUESTS = Counter(
+    "http_conditional_requests_total",
+    "ETag-enabled GETs by endpoint and result: not_modified (304), modified, or uncacheable without Redis",
+    ["endpoint", "result"],
+)
 REQUEST_LATENCY = Summary("http_request_latency_seconds", "Request latency in seconds")
 REQUEST_HISTOGRAM = Histogram("http_request_duration_seconds", "Histogram for request duration", ["endpoint"])
 REQUEST_IN_PROGRESS = Gauge("http_requests_in_progress", "Number of requests in progress")
 CPU_USAGE = Gauge("system_cpu_usage", "Current CPU usage percentage")
 MEMORY_USAGE = Gauge("system_memory_usage", "Current memory usage percentage")
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database query latency by query fingerprint",
+    ["fingerprint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Rows returned per database query by query fingerprint",
+    ["fingerprint"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 1000, 10000),
+)
+DB_ROUTED_QUERIES = Counter("db_routed_queries_total", "Queries routed to the primary or a read replica", ["target"])
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Replication replay lag of each read replica", ["replica"])
+REPLICA_HEALTHY = Gauge("db_replica_healthy", "Whether a read replica is currently used for reads", ["replica"])
+PREPARED_STATEMENT_HITS = Counter(
+    "db_prepared_statement_hits_total", "Registered queries served by an already prepared statement", ["name"]
+)
+PREPARED_STATEMENT_MISSES = Counter(
+    "db_prepared_statement_misses_total", "Registered queries that had to be prepared at request time", ["name"]
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Open connections in the database pool", ["pool"])
+DB_POOL_IDLE = Gauge("db_pool_idle", "Idle connections in the database pool", ["pool"])
+DB_POOL_IN_USE = Gauge("db_pool_in_use", "Connections currently checked out of the database pool", ["pool"])
+DB_POOL_LIMIT = Gauge("db_pool_limit", "Maximum connections the database pool may hand out", ["pool"])
+DB_POOL_ACQUIRE_WAIT = Histogram(
+    "db_pool_acquire_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+REVOCATION_CHECKS = Counter(
+    "token_revocation_checks_total", "Access-token revocation checks by where they were answered", ["source"]
+)
+QUERY_TIMEOUTS = Counter(
+    "db_query_timeouts_total",
+    "Queries cancelled by a timeout or statement_timeout by query fingerprint",
+    ["fingerprint"],
+)
+PERMISSION_CACHE_LOOKUPS = Counter(
+    "permission_cache_lookups_total", "Compiled permission mask lookups by tier and result", ["tier", "result"]
+)
+VISIBILITY_CACHE_LOOKUPS = Counter(
+    "visibility_cache_lookups_total", "Compiled server visibility lookups by result", ["result"]
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Service cache lookups by namespace, tier and result", ["namespace", "tier", "result"]
+)
+CACHE_LOCAL_BYTES = Gauge("cache_local_bytes", "Encoded bytes held in the per-process service cache")
+CACHE_LATENCY = Histogram(
+    "cache_operation_duration_seconds",
+    "Service cache Redis reads and loader calls by namespace",
+    ["namespace", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+JWT_CACHE_LOOKUPS = Counter("jwt_cache_lookups_total", "Decoded-token cache lookups by result", ["result"])
+JWT_CACHE_SIZE = Gauge("jwt_cache_size", "Decoded tokens held in the per-process cache")
+PASSWORD_HASH_QUEUED = Gauge("password_hash_queued", "Password hash operations waiting for a bcrypt thread")
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password hash operations waited for a bcrypt thread",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent in bcrypt by operation",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
 
 
 @router.get("/metrics")
@@ -0,0 +1,69 @@
+"""
+Compare a multi-row VALUES upsert with DataBase.copy_upsert on a scratch table.
+Needs a reachable Postgres at TEST_DATABASE_URL.
+
+    python -m benchmarks.bulk_upsert
+"""
+
+import asyncio
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.database import DataBase
+
+TABLE = "bench_counters"
+COLUMNS = ["user_id", "channel_id", "unread_count"]
+
+
+async def values_upsert(rows):
+    # The approach insert_batch_notifications used: one bind parameter per value (max 32767 per statement)
+    batch_size = 32767 // len(COLUMNS)
+    for start in range(0, len(rows), batch_size):
+        end = start + batch_size
+        batch = rows[start:end]
+        placeholders = ", ".join(f"(${i * 3 + 1}, ${i * 3 + 2}, ${i * 3 + 3})" for i in range(len(batch)))
+        params = [value for row in batch for value in row]
+        await DataBase.execute(
+            f"""
+            INSERT INTO {TABLE} (user_id, channel_id, unread_count) VALUES {placeholders}
+            ON CONFLICT (user_id, channel_id) DO UPDATE SET unread_count = {TABLE}.unread_count + EXCLUDED.unread_count
+            """,
+            *params,
+        )
+
+
+async def copy_upsert(rows):
+    await DataBase.copy_upsert(
+        TABLE,
+        COLUMNS,
+        rows,
+        conflict_columns=["user_id", "channel_id"],
+        update={"unread_count": f"{TABLE}.unread_count + EXCLUDED.unread_count"},
+    )
+
+
+async def main():
+    await DataBase.create_pool(uri=settings.TEST_DATABASE_URL)
+    await DataBase.execute(
+        f"CREATE TABLE IF NOT EXISTS {TABLE} (user_id UUID, channel_id UUID, unread_count INT, "
+        "PRIMARY KEY (user_id, channel_id))"
+    )
+    try:
+        for count in (1_000, 10_000, 100_000):
+            rows = [(uuid.uuid4(), uuid.uuid4(), 1) for _ in range(count)]
+            for name, upsert in (("values", values_upsert), ("copy", copy_upsert)):
+                await DataBase.execute(f"TRUNCATE {TABLE}")
+                start = time.perf_counter()
+                await upsert(rows)
+                # Second pass exercises the conflict/update branch
+                await upsert(rows)
+                duration = time.perf_counter() - start
+                print(f"{count:>7} rows  {name:<6} {duration * 1000:9.1f} ms  ({2 * count / duration:,.0f} rows/s)")
+    finally:
+        await DataBase.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await DataBase.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
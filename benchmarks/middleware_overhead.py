@@ -0,0 +1,133 @@
+"""
+Per-request cost of the request middleware: the two BaseHTTPMiddleware-style decorators app.main used
+(track_metrics with its path regex and log_requests) against app.core.instrumentation.InstrumentationMiddleware,
+on a minimal app with one parameterised JSON route, called in-process through raw ASGI so no server or socket
+is measured. Access log lines go to os.devnull at INFO, so formatting is paid for but not terminal output.
+
+    python -m benchmarks.middleware_overhead
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+from http import HTTPStatus
+
+from fastapi import FastAPI, Request, Response
+
+from app.core.instrumentation import InstrumentationMiddleware
+from app.utils.metrics import (
+    REQUEST_COUNT,
+    REQUEST_HISTOGRAM,
+    REQUEST_IN_PROGRESS,
+    REQUEST_LATENCY,
+)
+
+ITERATIONS = 20000
+
+logger = logging.getLogger("fastapi")
+
+
+def base_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/servers/{server_id}/channels")
+    async def channels(server_id: str):
+        return [{"id": server_id, "name": "general"}]
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    app = base_app()
+
+    @app.middleware("http")
+    async def track_metrics(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+        start_time = time.time()
+        REQUEST_IN_PROGRESS.inc()
+        sanitized_path = re.sub(
+            r"/([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)",
+            r"/{id}",
+            request.url.path,
+        )
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        REQUEST_LATENCY.observe(process_time)
+        REQUEST_HISTOGRAM.labels(endpoint=sanitized_path).observe(process_time)
+        REQUEST_COUNT.labels(method=request.method, endpoint=sanitized_path, status_code=response.status_code).inc()
+        REQUEST_IN_PROGRESS.dec()
+        return response
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        logger.info(f"{request.method} , {request.url} params: {dict(request.query_params)}")
+        start_time = time.time()
+        response: Response = await call_next(request)
+        process_time = time.time() - start_time
+        logger.info(
+            f"Request completed with {response.status_code}"
+            f" {HTTPStatus(response.status_code).phrase} in {process_time:.6f}s"
+        )
+        return response
+
+    return app
+
+
+def instrumented_app() -> FastAPI:
+    app = base_app()
+    app.add_middleware(InstrumentationMiddleware)
+    return app
+
+
+async def call(app, scope):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(scope), receive, send)
+
+
+async def run(name: str, app, baseline: float = 0.0) -> float:
+    path = f"/servers/{uuid.uuid4()}/channels"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"limit=50",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    for _ in range(200):
+        await call(app, scope)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await call(app, scope)
+    per_request = (time.perf_counter() - start) / ITERATIONS * 1e6
+    overhead = f"  (+{per_request - baseline:6.2f} µs middleware)" if baseline else ""
+    print(f"{name:>16}: {per_request:7.2f} µs per request{overhead}")
+    return per_request
+
+
+async def main():
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.FileHandler(os.devnull))
+    baseline = await run("no middleware", base_app())
+    await run("BaseHTTP pair", legacy_app(), baseline)
+    await run("pure ASGI", instrumented_app(), baseline)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
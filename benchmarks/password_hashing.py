@@ -0,0 +1,56 @@
+"""
+Event-loop lag during a login storm, with bcrypt run inline on the loop versus through the bounded executor
+in app.core.auth. A probe task sleeps in short ticks and records how late each wakeup is; while the storm
+runs, every late millisecond is time no other request in the worker could make progress. No services needed.
+
+    python -m benchmarks.password_hashing
+"""
+
+import asyncio
+import time
+
+from app.core import auth
+from app.core.config import settings
+from app.core.pool_sizing import percentile
+
+LOGINS = 64
+TICK = 0.005
+
+
+async def probe(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def inline_login(password: str, hashed: str) -> bool:
+    return auth._checkpw(password, hashed)
+
+
+async def run(name: str, login, hashed: str):
+    stop = asyncio.Event()
+    lags = []
+    prober = asyncio.create_task(probe(stop, lags))
+    await asyncio.sleep(TICK * 2)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login("correct horse", hashed) for _ in range(LOGINS)))
+    duration = time.perf_counter() - start
+    stop.set()
+    await prober
+    assert all(results)
+    print(
+        f"{name:>8}: {LOGINS / duration:6.1f} logins/s, loop lag p50 {percentile(lags, 0.5) * 1000:7.2f} ms, "
+        f"p99 {percentile(lags, 0.99) * 1000:7.2f} ms, max {max(lags) * 1000:7.2f} ms"
+    )
+
+
+async def main():
+    hashed = await auth.get_password_hash("correct horse")
+    print(f"{LOGINS} logins, cost {settings.BCRYPT_ROUNDS}, {settings.PASSWORD_HASH_CONCURRENCY} bcrypt threads")
+    await run("inline", inline_login, hashed)
+    await run("executor", auth.verify_password, hashed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
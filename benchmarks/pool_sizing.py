@@ -0,0 +1,67 @@
+"""
+Compare a fixed-size pool with adaptive sizing under a bursty synthetic load. Each worker runs a short
+query (pg_sleep) in a loop; bursts raise the number of active workers well above the fixed pool size.
+Needs a reachable Postgres at TEST_DATABASE_URL.
+
+    python -m benchmarks.pool_sizing
+"""
+
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.database import DataBase
+from app.core.pool_sizing import percentile
+
+PHASES = ((5, 8), (5, 40), (5, 8), (5, 60))  # (seconds, concurrent workers)
+QUERY = "SELECT pg_sleep(0.005)"
+
+
+async def worker(stop: asyncio.Event, waits: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with DataBase.connection() as connection:
+            waits.append(time.perf_counter() - start)
+            await connection.fetchval(QUERY)
+
+
+async def run(adaptive: bool):
+    await DataBase.create_pool(uri=settings.TEST_DATABASE_URL, adaptive=adaptive)
+    monitor = asyncio.create_task(DataBase.monitor_pool())
+    waits, queries = [], 0
+    start = time.perf_counter()
+    try:
+        for seconds, workers in PHASES:
+            stop = asyncio.Event()
+            phase_waits = []
+            tasks = [asyncio.create_task(worker(stop, phase_waits)) for _ in range(workers)]
+            await asyncio.sleep(seconds)
+            stop.set()
+            await asyncio.gather(*tasks)
+            waits += phase_waits
+            queries += len(phase_waits)
+            limit = DataBase.pool_limit.limit if DataBase.pool_limit else DataBase.pool.get_max_size()
+            print(
+                f"  {workers:>3} workers: p95 wait {percentile(phase_waits, 0.95) * 1000:7.2f} ms, "
+                f"pool size {DataBase.pool.get_size():>2}, limit {limit:>2}"
+            )
+    finally:
+        monitor.cancel()
+        await DataBase.close_pool()
+    duration = time.perf_counter() - start
+    print(
+        f"  total: {queries / duration:,.0f} queries/s, p50 wait {percentile(waits, 0.5) * 1000:.2f} ms, "
+        f"p99 wait {percentile(waits, 0.99) * 1000:.2f} ms"
+    )
+
+
+async def main():
+    # React within a phase rather than every few seconds
+    settings.DB_POOL_MONITOR_INTERVAL = 0.5
+    for adaptive in (False, True):
+        print("adaptive" if adaptive else "fixed")
+        await run(adaptive)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Compare DataBase record-to-model mapping modes on synthetic server rows.
+
+    python -m benchmarks.row_mapping
+"""
+
+import datetime
+import time
+import uuid
+
+from app.core.row_mapping import ADAPTER, CONSTRUCT, VALIDATE, map_records
+from app.models.server import ServerOut
+
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.datetime.now(datetime.UTC)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "name": f"server {i}",
+            "description": "benchmark server",
+            "owner_id": uuid.uuid4(),
+            "invite_code": "ABC123",
+            "is_public": True,
+            "server_picture_url": None,
+            "max_members": 10000,
+            "created_at": now,
+            "updated_at": now,
+            "default_notification_setting": "all",
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(func, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    for count in (1_000, 10_000):
+        rows = make_rows(count)
+        baseline = best_of(lambda: map_records(ServerOut, rows, VALIDATE))
+        print(f"{count} rows")
+        for mode in (VALIDATE, ADAPTER, CONSTRUCT):
+            duration = best_of(lambda: map_records(ServerOut, rows, mode))
+            print(f"  {mode:<10} {duration * 1000:8.2f} ms  ({baseline / duration:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
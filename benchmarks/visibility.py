@@ -0,0 +1,111 @@
+"""
+Visible-category lookups for a member of a server with 50 categories (5 channels each) and 500 roles, where
+every category is restricted to 20 roles and the member holds 10 of them. Compares the per-row SQL that
+CategoriesOut.get_categories used with the compiled visibility index in app.core.visibility.
+Needs a reachable, migrated Postgres at TEST_DATABASE_URL and a reachable Redis.
+
+    python -m benchmarks.visibility
+"""
+
+import asyncio
+import random
+import time
+import uuid
+
+from app.core import visibility
+from app.core.config import settings
+from app.core.database import DataBase
+
+CATEGORIES = 50
+CHANNELS_PER_CATEGORY = 5
+ROLES = 500
+ROLES_PER_CATEGORY = 20
+MEMBER_ROLES = 10
+ITERATIONS = 500
+
+PER_ROW_QUERY = """
+    SELECT DISTINCT c.id, c.name, c.position FROM categories c
+      JOIN servers s ON c.server_id = s.id
+     WHERE c.server_id = $1
+       AND (s.owner_id = $2
+            OR EXISTS (SELECT 1
+                         FROM server_user_roles sur
+                         JOIN server_roles sr ON sur.role_id = sr.id
+                         JOIN server_role_permissions srp ON sur.role_id = srp.role_id
+                         JOIN server_permissions sp ON srp.permission_id = sp.id
+                        WHERE sur.user_id = $2 AND sr.server_id = $1 AND sp.name = 'ADMINISTRATOR')
+            OR NOT EXISTS (SELECT 1 FROM category_role_assignments cra WHERE cra.category_id = c.id)
+            OR EXISTS (SELECT 1
+                         FROM category_role_assignments cra
+                        WHERE cra.category_id = c.id
+                          AND cra.role_id IN (SELECT sur.role_id
+                                                FROM server_user_roles sur
+                                                JOIN server_roles sr ON sur.role_id = sr.id
+                                               WHERE sur.user_id = $2 AND sr.server_id = $1)))
+  ORDER BY c.position
+"""
+
+
+async def seed():
+    tag = uuid.uuid4().hex[:8]
+    owner, member = uuid.uuid4(), uuid.uuid4()
+    await DataBase.execute(
+        "INSERT INTO users (id, username, email, password) VALUES ($1, $2, $3, ''), ($4, $5, $6, '')",
+        owner,
+        f"owner-{tag}",
+        f"owner-{tag}@bench",
+        member,
+        f"member-{tag}",
+        f"member-{tag}@bench",
+    )
+    server = await DataBase.fetchval(
+        "INSERT INTO servers (name, owner_id, invite_code) VALUES ($1, $2, $3) RETURNING id", f"bench-{tag}", owner, tag
+    )
+    categories = [uuid.uuid4() for _ in range(CATEGORIES)]
+    roles = [uuid.uuid4() for _ in range(ROLES)]
+    await DataBase.copy_records(
+        "categories",
+        ["id", "server_id", "name", "position"],
+        [(c, server, f"c{i}", i) for i, c in enumerate(categories)],
+    )
+    await DataBase.copy_records(
+        "channels",
+        ["server_id", "category_id", "name", "position"],
+        [(server, c, f"ch{i}", i) for c in categories for i in range(CHANNELS_PER_CATEGORY)],
+    )
+    await DataBase.copy_records("server_roles", ["id", "server_id", "name"], [(r, server, str(r)) for r in roles])
+    await DataBase.copy_records(
+        "category_role_assignments",
+        ["category_id", "role_id"],
+        [(c, r) for c in categories for r in random.sample(roles, ROLES_PER_CATEGORY)],
+    )
+    await DataBase.copy_records(
+        "server_user_roles", ["user_id", "role_id"], [(member, r) for r in random.sample(roles, MEMBER_ROLES)]
+    )
+    return server, owner, member
+
+
+async def timed(name: str, lookup):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        categories = await lookup()
+    duration = time.perf_counter() - start
+    print(f"{name:>10}: {duration / ITERATIONS * 1000:7.3f} ms per lookup, {len(categories)} visible")
+
+
+async def main():
+    await DataBase.create_pool(uri=settings.TEST_DATABASE_URL)
+    server, owner, member = await seed()
+    try:
+        start = time.perf_counter()
+        await visibility.server_visibility(server)
+        print(f"compile: {(time.perf_counter() - start) * 1000:.2f} ms")
+        await timed("per-row", lambda: DataBase.fetch(PER_ROW_QUERY, server, member))
+        await timed("compiled", lambda: visibility.visible_category_ids(server, member))
+    finally:
+        await DataBase.execute("DELETE FROM users WHERE id = ANY($1::uuid[])", [owner, member])
+        await DataBase.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
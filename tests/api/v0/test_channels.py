@@ -1,6 +1,7 @@
 import pytest
 from httpx import AsyncClient
 
+from app.core.database import DataBase
 from app.main import app
 
 
@@ -147,3 +148,52 @@ async def test_create_channel_without_permission(client: AsyncClient, test_user_
         f"/api/v0/channels/{test_server['id']}/{test_category['id']}", json=channel_data, headers=headers
     )
     assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_categories_do_not_share_cached_channels(client: AsyncClient, test_user_token, test_server):
+    headers = {"Authorization": f"Bearer {test_user_token["access_token"]}"}
+    base = f"/api/v0/channels/{test_server['id']}"
+    await client.post(f"/api/v0/category/{test_server['id']}", json={"name": "second"}, headers=headers)
+    categories = (await client.get(f"/api/v0/category/{test_server['id']}", headers=headers)).json()
+    first, second = categories[0]["id"], categories[-1]["id"]
+    assert first != second
+
+    await client.post(f"{base}/{first}", json={"name": "first-only"}, headers=headers)
+    # Warm the cache with the first category, then write to the second
+    await client.get(f"{base}/{first}", headers=headers)
+    await client.post(f"{base}/{second}", json={"name": "second-only"}, headers=headers)
+
+    first_names = [channel["name"] for channel in (await client.get(f"{base}/{first}", headers=headers)).json()]
+    second_names = [channel["name"] for channel in (await client.get(f"{base}/{second}", headers=headers)).json()]
+    assert "first-only" in first_names and "second-only" not in first_names
+    assert "second-only" in second_names and "first-only" not in second_names
+
+
+@pytest.mark.asyncio
+async def test_role_from_another_server_cannot_be_attached_to_channel(
+    client: AsyncClient, test_user_token2, test_channel
+):
+    headers = {"Authorization": f"Bearer {test_user_token2}"}
+    await client.post("/api/v0/servers/", json={"name": "other"}, headers=headers)
+    other = (await client.get("/api/v0/servers/user_servers", headers=headers)).json()["servers"][0]["id"]
+    role_id = await DataBase.fetchval(
+        "INSERT INTO server_roles (server_id, name) VALUES ($1, 'intruder') RETURNING id", other
+    )
+    count = "SELECT count(*) FROM channel_role_assignments WHERE channel_id = $1"
+
+    # Manager of their own server, naming someone else's channel
+    response = await client.post(
+        f"/api/v0/permission/assign_role_to_channel/{other}/{test_channel['id']}/{role_id}", headers=headers
+    )
+    assert response.json() == {"error": "Channel or role not found in this server"}
+    assert await DataBase.fetchval(count, test_channel["id"]) == 0
+
+    await DataBase.execute(
+        "INSERT INTO channel_role_assignments (channel_id, role_id) VALUES ($1, $2)", test_channel["id"], role_id
+    )
+    response = await client.post(
+        f"/api/v0/permission/remove_role_from_channel/{other}/{test_channel['id']}/{role_id}", headers=headers
+    )
+    assert response.json() == {"error": "Role not assigned to channel"}
+    assert await DataBase.fetchval(count, test_channel["id"]) == 1
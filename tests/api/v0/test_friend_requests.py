@@ -1,7 +1,9 @@
 import pytest
 from httpx import AsyncClient
 
+from app.core.config import settings
 from app.main import app
+from app.models.friend_requests import FriendRequest
 
 
 @pytest.fixture(scope="function")
@@ -59,6 +61,24 @@ async def test_get_friends(client: AsyncClient, test_user_token):
     assert isinstance(response.json(), list)
 
 
+@pytest.mark.asyncio
+async def test_export_friends(client: AsyncClient, test_user_token, monkeypatch):
+    stream = FriendRequest.stream
+    timeouts = []
+
+    def record_timeout(*args, **kwargs):
+        timeouts.append(kwargs.get("timeout"))
+        return stream(*args, **kwargs)
+
+    monkeypatch.setattr(FriendRequest, "stream", record_timeout)
+    headers = {"Authorization": f"Bearer {test_user_token['access_token']}"}
+    response = await client.get("/api/v0/friends/export", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert timeouts == [settings.DB_TIMEOUT_ADMIN]
+
+
 @pytest.mark.asyncio
 async def test_get_friend_requests(client: AsyncClient, test_user_token):
     headers = {"Authorization": f"Bearer {test_user_token["access_token"]}"}
@@ -1,9 +1,11 @@
+import json
 from datetime import datetime, timedelta
 
 import jwt
 import pytest
 from httpx import AsyncClient
 
+from app.core import visibility
 from app.core.auth import ALGORITHM, SECRET_KEY
 
 
@@ -48,6 +50,39 @@ async def test_get_server_roles_permission(client: AsyncClient, test_user_token,
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_bootstrap_server(client: AsyncClient, test_user_token, test_server, test_category, monkeypatch):
+    headers = {"Authorization": f"Bearer {test_user_token["access_token"]}"}
+    response = await client.get(f"/api/v0/servers/{test_server['id']}/bootstrap", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["server"]["id"] == test_server["id"]
+    assert data["is_owner"] is True
+    assert {category["name"] for category in data["categories"]} >= {"testcategory", "testcategory2"}
+
+    # Nothing changed: revalidating with the ETag returns 304 without rebuilding the bootstrap
+    etag = response.headers["ETag"]
+    monkeypatch.setattr(visibility, "server_visibility", None)
+    response = await client.get(
+        f"/api/v0/servers/{test_server['id']}/bootstrap", headers={**headers, "If-None-Match": f'"other", {etag}'}
+    )
+    assert response.status_code == 304
+    monkeypatch.undo()
+    # A header that merely contains the tag is not a match
+    response = await client.get(
+        f"/api/v0/servers/{test_server['id']}/bootstrap", headers={**headers, "If-None-Match": f"{etag}x"}
+    )
+    assert response.status_code == 200
+
+    # A new category changes the per-server part and so the ETag
+    await client.post(f"/api/v0/category/{test_server['id']}", json={"name": "newcategory"}, headers=headers)
+    response = await client.get(
+        f"/api/v0/servers/{test_server['id']}/bootstrap", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
 @pytest.mark.asyncio
 async def test_join_server_by_invite_code(client: AsyncClient, test_user_token2, test_server):
     # Define user data for creation
@@ -242,6 +277,24 @@ async def test_audit_logs(client: AsyncClient, test_user_token, test_server, tes
     assert data["count"] == len(data["logs"]), "Count does not match the number of logs returned"
 
 
+@pytest.mark.asyncio
+async def test_export_server_users(client: AsyncClient, test_user_token, test_server, test_user):
+    server_id = test_server["id"]
+    headers = {"Authorization": f"Bearer {test_user_token['access_token']}"}
+
+    response = await client.get(f"/api/v0/servers/all_users/{server_id}/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    members = [json.loads(line) for line in response.text.splitlines()]
+    assert [member["username"] for member in members] == [test_user["username"]]
+
+    response = await client.get(
+        f"/api/v0/servers/all_users/{server_id}/export", headers=headers, params={"format": "csv"}
+    )
+    assert response.status_code == 200
+    assert response.text.splitlines()[0] == "user_id,username,nickname,joined_at"
+
+
 @pytest.mark.asyncio
 async def test_ban_unban_member(client: AsyncClient, test_server, test_user_token, test_user_token2, test_user):
     server_id = test_server["id"]
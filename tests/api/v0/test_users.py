@@ -95,6 +95,20 @@ async def test_update_user(client: AsyncClient, test_user_token):
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_update_user_invalidates_cached_user(client: AsyncClient, test_user_token):
+    headers = {"Authorization": f"Bearer {test_user_token["access_token"]}"}
+    # Warm both cache tiers
+    response = await client.get("/api/v0/users/me", headers=headers)
+    assert response.json()["email"] == "test@test.com"
+
+    response = await client.patch("/api/v0/users/update", headers=headers, json={"email": "cached@test.com"})
+    assert response.status_code == 200
+
+    response = await client.get("/api/v0/users/me", headers=headers)
+    assert response.json()["email"] == "cached@test.com"
+
+
 @pytest.mark.asyncio
 async def test_refresh_token(client: AsyncClient, test_user_token):
     response = await client.post(
@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import uuid
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from app.core import cache
+from app.core.config import settings
+from app.core.local_cache import LocalTTLCache
+
+
+class Item(BaseModel):
+    id: uuid.UUID
+    name: str
+    note: Optional[str] = None
+
+
+def test_models_round_trip():
+    items = [Item(id=uuid.uuid4(), name="a"), Item(id=uuid.uuid4(), name="b", note="x")]
+    assert cache.decode(cache.encode(items), List[Item]) == items
+    assert cache.decode(cache.encode(None), List[Item]) is None
+
+
+def test_ttl_jitter_stays_in_bounds():
+    spread = 1000 * settings.CACHE_TTL_JITTER
+    ttls = {cache.jittered(1000) for _ in range(200)}
+    assert len(ttls) > 1
+    assert all(1000 - spread <= ttl <= 1000 + spread for ttl in ttls)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [Item(id=uuid.uuid4(), name="a")]
+
+    namespace = f"test-{uuid.uuid4().hex}"
+    results = await asyncio.gather(
+        *(cache.get_or_load(namespace, "k", loader, ttl=60, model=List[Item]) for _ in range(10))
+    )
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+    # Now served from Redis, validated back into models
+    assert await cache.get_or_load(namespace, "k", loader, ttl=60, model=List[Item]) == results[0]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_none_is_cached_and_tags_invalidate():
+    calls = []
+
+    @cache.cached("test-decorated", key="{server_id}:{user_id}", ttl=60, tags=["server:{server_id}:test"])
+    async def lookup(user_id, server_id):
+        calls.append((user_id, server_id))
+        return None
+
+    server = uuid.uuid4().hex
+    assert await lookup("u", server) is None
+    assert await lookup("u", server) is None
+    assert len(calls) == 1
+
+    await cache.invalidate_tags(f"server:{server}:test")
+    assert await lookup("u", server) is None
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_loader_errors_reach_every_caller_and_are_not_cached():
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    namespace = f"test-{uuid.uuid4().hex}"
+    results = await asyncio.gather(
+        *(cache.get_or_load(namespace, "k", loader, ttl=60) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await cache.redis_client.client.get(cache._key(namespace, "k")) is None
+
+
+@pytest.mark.asyncio
+async def test_loads_racing_an_invalidation_are_not_stored():
+    calls = []
+    namespace = f"test-{uuid.uuid4().hex}"
+
+    async def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            await cache.invalidate(namespace, "k")
+        elif len(calls) == 2:
+            await cache.invalidate_tags(f"{namespace}-tag")
+        return len(calls)
+
+    for expected in (1, 2, 3, 3):
+        assert await cache.get_or_load(namespace, "k", loader, ttl=60, tags=[f"{namespace}-tag"]) == expected
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_loads_do_not_inherit_the_callers_context():
+    request_state = contextvars.ContextVar("request_state", default=None)
+    request_state.set("caller")
+
+    async def loader():
+        return request_state.get()
+
+    assert await cache.get_or_load(f"test-{uuid.uuid4().hex}", "k", loader, ttl=60) is None
+
+
+def test_local_tier_is_bounded_by_bytes():
+    local = LocalTTLCache(maxsize=100, ttl=60, maxbytes=10)
+    local.set("a", b"12345")
+    local.set("b", b"12345")
+    local.set("c", b"123")
+    assert local.get("a") is None
+    assert local.nbytes == 8
+    local.set("huge", b"x" * 11)
+    assert local.get("huge") is None and local.nbytes == 8
+
+
+@pytest.mark.asyncio
+async def test_hot_keys_are_served_locally_while_subscribed(monkeypatch):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"name": "a"}
+
+    namespace = f"test-{uuid.uuid4().hex}"
+    monkeypatch.setattr(cache, "_fresh_until", float("inf"))
+    cache.local_values.clear()
+    first = await cache.get_or_load(namespace, "k", loader, ttl=60)
+    second = await cache.get_or_load(namespace, "k", loader, ttl=60)
+    assert first == second == {"name": "a"} and first is not second
+    assert len(calls) == 1
+
+    # Without a live subscription the local copy might have missed an invalidation
+    monkeypatch.setattr(cache, "_fresh_until", 0.0)
+    assert cache.local_values.get(cache._key(namespace, "k")) is not None
+    await cache.redis_client.client.delete(cache._key(namespace, "k"))
+    await cache.get_or_load(namespace, "k", loader, ttl=60)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_another_process_drops_local_copy():
+    listener = asyncio.create_task(cache.listen_for_invalidations())
+    try:
+        for _ in range(100):
+            if cache.local_fresh():
+                break
+            await asyncio.sleep(0.05)
+        redis_key = cache._key("test-remote", "k")
+        cache.local_values.set(redis_key, b"1")
+        await cache.redis_client.client.publish(cache.INVALIDATION_CHANNEL, cache.orjson.dumps([redis_key]))
+        await asyncio.sleep(0.5)
+        assert cache.local_values.get(redis_key) is None
+    finally:
+        listener.cancel()
@@ -0,0 +1,115 @@
+import uuid
+from typing import List
+
+import pytest
+
+from app.core import cache, channel_tree, visibility
+from app.core.database import PRIMARY, DataBase
+from app.models.channels import CategoryChannels
+
+
+def rows(server_id):
+    general, empty = uuid.uuid4(), uuid.uuid4()
+    lobby, news = uuid.uuid4(), uuid.uuid4()
+    return [
+        {"category_id": general, "category_name": "general", "category_position": 1, "id": lobby, "name": "lobby",
+         "position": 1, "description": None},
+        {"category_id": general, "category_name": "general", "category_position": 1, "id": news, "name": "news",
+         "position": 2, "description": "x"},
+        {"category_id": empty, "category_name": "empty", "category_position": 2, "id": None, "name": None,
+         "position": None, "description": None},
+    ]  # fmt: skip
+
+
+@pytest.mark.asyncio
+async def test_one_query_builds_the_whole_tree(monkeypatch):
+    server_id = str(uuid.uuid4())
+    records = rows(server_id)
+
+    async def fetch(query, *args, **kwargs):
+        assert kwargs["route"] == PRIMARY
+        return records
+
+    monkeypatch.setattr(DataBase, "fetch", fetch)
+    tree = await CategoryChannels.get_channel_tree(server_id)
+    assert [category.name for category in tree] == ["general", "empty"]
+    assert [channel.name for channel in tree[0].channels] == ["lobby", "news"]
+    assert tree[1].channels == []
+    assert cache.decode(cache.encode(tree), List[CategoryChannels]) == tree
+
+
+@pytest.mark.asyncio
+async def test_writes_move_readers_to_a_new_version(monkeypatch):
+    server_id = str(uuid.uuid4())
+    loads = []
+
+    async def get_channel_tree(server_id):
+        loads.append(server_id)
+        return []
+
+    monkeypatch.setattr(CategoryChannels, "get_channel_tree", get_channel_tree)
+    await channel_tree.channel_tree(server_id)
+    await channel_tree.channel_tree(server_id)
+    assert len(loads) == 1
+    await channel_tree.bump(server_id)
+    await channel_tree.channel_tree(server_id)
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_visibility_index_follows_the_tree_version(monkeypatch):
+    server_id = str(uuid.uuid4())
+    current = {"version": 1}
+    trees = {1: [], 2: [CategoryChannels(id=uuid.uuid4(), name="new", position=1, channels=[])]}
+
+    async def version(server_id):
+        return current["version"]
+
+    async def channel_tree_at(server_id, version):
+        return trees[version]
+
+    async def fetchrow(query, *args, **kwargs):
+        return {"id": server_id, "owner_id": "owner"}
+
+    async def fetch(query, *args, **kwargs):
+        return []
+
+    monkeypatch.setattr(channel_tree, "version", version)
+    monkeypatch.setattr(channel_tree, "channel_tree_at", channel_tree_at)
+    monkeypatch.setattr(DataBase, "fetchrow", fetchrow)
+    monkeypatch.setattr(DataBase, "fetch", fetch)
+    first = await visibility.server_visibility(server_id)
+    assert await visibility.server_visibility(server_id) is first and first.categories == []
+
+    # A bump this process has not been told about over visibility:invalidate still retires the index
+    current["version"] = 2
+    index = await visibility.server_visibility(server_id)
+    assert [category["name"] for category in index.categories] == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_visibility_compile_racing_an_invalidation_is_not_served(monkeypatch):
+    server_id = str(uuid.uuid4())
+    compiles = []
+
+    async def channel_tree_at(server_id, version):
+        return []
+
+    async def fetchrow(query, *args, **kwargs):
+        return {"id": server_id, "owner_id": "owner"}
+
+    async def fetch(query, *args, **kwargs):
+        assert kwargs["route"] == PRIMARY
+        compiles.append(query)
+        if len(compiles) == 1:
+            # An assignment commits while the first compile is still loading
+            await visibility.invalidate(server_id)
+        return []
+
+    monkeypatch.setattr(channel_tree, "channel_tree_at", channel_tree_at)
+    monkeypatch.setattr(DataBase, "fetchrow", fetchrow)
+    monkeypatch.setattr(DataBase, "fetch", fetch)
+    first = await visibility.server_visibility(server_id)
+    second = await visibility.server_visibility(server_id)
+    assert second is not first and len(compiles) == 2
+    assert await visibility.server_visibility(server_id) is second
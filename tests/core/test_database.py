@@ -0,0 +1,154 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from app.core.config import settings
+from app.core.database import PRIMARY, REPLICA, DataBase, QueryTimeoutError
+
+
+@pytest.fixture(scope="function")
+async def replica_pool():
+    # The test database doubles as a replica; it is not in recovery so its lag is always 0
+    await DataBase.create_replica_pools([settings.TEST_DATABASE_URL])
+    yield DataBase.replica_pools[0]
+    for pool in DataBase.replica_pools:
+        await pool.close()
+    DataBase.replica_pools = []
+    DataBase.healthy_replicas = []
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_and_writes_use_primary(replica_pool):
+    await DataBase.check_replicas()
+    assert DataBase.healthy_replicas == [replica_pool]
+
+    assert DataBase._route("SELECT 1", None) is replica_pool
+    assert DataBase._route("SELECT 1", PRIMARY) is DataBase.pool
+    assert DataBase._route("UPDATE servers SET name = $1 RETURNING *", None) is DataBase.pool
+    # Row locks cannot be taken on a read-only replica
+    assert DataBase._route("SELECT id FROM servers WHERE id = $1 FOR KEY SHARE", None) is DataBase.pool
+    assert DataBase._route("SELECT id FROM servers WHERE id = $1 FOR SHARE", None) is DataBase.pool
+
+
+@pytest.mark.asyncio
+async def test_reads_stick_to_primary_after_write(replica_pool):
+    assert await DataBase.fetchval("SELECT 1") == 1
+    assert DataBase._route("SELECT 1", None) is replica_pool
+
+    await DataBase.execute("SELECT 1")
+
+    assert DataBase._route("SELECT 1", None) is DataBase.pool
+    # An explicit override still reaches the replica
+    assert DataBase._route("SELECT 1", REPLICA) is replica_pool
+
+
+@pytest.mark.asyncio
+async def test_scoped_connection_is_reused():
+    async with DataBase.connection() as connection:
+        pid = await DataBase.fetchval("SELECT pg_backend_pid()")
+        assert pid == await connection.fetchval("SELECT pg_backend_pid()")
+        async with DataBase.connection() as nested:
+            assert nested is connection
+
+
+@pytest.mark.asyncio
+async def test_scoped_transaction_rolls_back_on_error():
+    await DataBase.execute("CREATE TABLE uow_test (id INT)")
+    with pytest.raises(RuntimeError):
+        async with DataBase.connection(transaction=True):
+            await DataBase.execute("INSERT INTO uow_test VALUES (1)")
+            raise RuntimeError("abort")
+    assert await DataBase.fetchval("SELECT COUNT(*) FROM uow_test") == 0
+    await DataBase.execute("DROP TABLE uow_test")
+
+
+@pytest.mark.asyncio
+async def test_gather_returns_results_in_order():
+    first, second, third = await DataBase.gather(
+        DataBase.fetchval("SELECT 1"),
+        DataBase.fetchval("SELECT pg_sleep(0.05)::text || 'slow'"),
+        DataBase.fetchrow("SELECT 3 AS value"),
+    )
+    assert (first, second, third["value"]) == (1, "slow", 3)
+
+
+@pytest.mark.asyncio
+async def test_gather_cancels_siblings_on_failure():
+    slow = asyncio.ensure_future(DataBase.fetchval("SELECT pg_sleep(5)"))
+    with pytest.raises(asyncpg.UndefinedTableError):
+        await DataBase.gather(DataBase.fetchval("SELECT * FROM missing_table"), slow)
+    assert slow.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_copy_upsert_inserts_and_merges():
+    await DataBase.execute("CREATE TABLE copy_test (id INT PRIMARY KEY, total INT)")
+    await DataBase.copy_upsert("copy_test", ["id", "total"], [(1, 1), (2, 2)], conflict_columns=["id"])
+    await DataBase.copy_upsert(
+        "copy_test",
+        ["id", "total"],
+        [(2, 5), (3, 3)],
+        conflict_columns=["id"],
+        update={"total": "copy_test.total + EXCLUDED.total"},
+    )
+    rows = await DataBase.fetch("SELECT id, total FROM copy_test ORDER BY id")
+    assert [tuple(row) for row in rows] == [(1, 1), (2, 7), (3, 3)]
+    await DataBase.execute("DROP TABLE copy_test")
+
+
+@pytest.mark.asyncio
+async def test_copy_upsert_leaves_permanent_tables_alone():
+    await DataBase.execute("CREATE TABLE copy_test (id INT PRIMARY KEY, total INT)")
+    await DataBase.execute("CREATE TABLE copy_staging_copy_test (id INT)")
+    await DataBase.copy_upsert("copy_test", ["id", "total"], [(1, 1)], conflict_columns=["id"])
+    assert await DataBase.fetchval("SELECT to_regclass('public.copy_staging_copy_test') IS NOT NULL")
+    await DataBase.execute("DROP TABLE copy_staging_copy_test")
+    await DataBase.execute("DROP TABLE copy_test")
+
+
+@pytest.mark.asyncio
+async def test_query_budget_cancels_slow_query():
+    DataBase.set_budget(0.1)
+    try:
+        with pytest.raises(QueryTimeoutError):
+            await DataBase.fetchval("SELECT pg_sleep(2)")
+        # The budget is spent, so later queries fail without reaching the database
+        with pytest.raises(QueryTimeoutError):
+            await DataBase.fetchval("SELECT 1")
+    finally:
+        DataBase.set_budget(None)
+    assert await DataBase.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.asyncio
+async def test_query_budget_sets_transaction_statement_timeout():
+    DataBase.set_budget(5)
+    try:
+        async with DataBase.connection(transaction=True):
+            statement_timeout = await DataBase.fetchval("SELECT current_setting('statement_timeout')")
+    finally:
+        DataBase.set_budget(None)
+    assert statement_timeout != "0"
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_in_batches():
+    rows = [record[0] async for record in DataBase.stream("SELECT generate_series(1, 1000)", batch_size=64)]
+    assert rows == list(range(1, 1001))
+
+
+@pytest.mark.asyncio
+async def test_stream_timeout_bounds_each_batch():
+    query = "SELECT current_setting('statement_timeout') FROM generate_series(1, 3)"
+    rows = [record[0] async for record in DataBase.stream(query, batch_size=1, timeout=2)]
+    assert rows == ["2s"] * 3
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_connection_when_closed_early():
+    stream = DataBase.stream("SELECT generate_series(1, 1000)", batch_size=10)
+    async for _ in stream:
+        break
+    await stream.aclose()
+    assert DataBase.pool.get_idle_size() == DataBase.pool.get_size()
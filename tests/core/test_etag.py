@@ -0,0 +1,68 @@
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient
+
+from app.core import cache, etag
+
+calls = []
+app = FastAPI()
+
+
+def current_user():
+    return {"id": "user-a"}
+
+
+@app.get("/servers/{server_id}")
+@etag.conditional("server:{server_id}", "user:{user[id]}")
+async def read_server(server_id: str, user: dict = Depends(current_user)):
+    calls.append(server_id)
+    return {"id": server_id}
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    values = {}
+
+    async def versions(names):
+        return [values.get(name, 0) for name in names]
+
+    monkeypatch.setattr(cache, "versions", versions)
+    calls.clear()
+    return values
+
+
+@pytest.mark.asyncio
+async def test_unchanged_resource_is_not_modified(counters):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = await client.get("/servers/s1")
+        assert first.status_code == 200 and first.json() == {"id": "s1"}
+        tag = first.headers["ETag"]
+
+        second = await client.get("/servers/s1", headers={"If-None-Match": tag})
+        assert second.status_code == 304 and second.content == b""
+        assert second.headers["ETag"] == tag
+        assert calls == ["s1"]
+
+
+@pytest.mark.asyncio
+async def test_bumped_counter_changes_the_tag(counters):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        tag = (await client.get("/servers/s1")).headers["ETag"]
+        counters["etag:user:user-a"] = 1
+        response = await client.get("/servers/s1", headers={"If-None-Match": tag})
+        assert response.status_code == 200 and response.headers["ETag"] != tag
+
+        # Other resources and query strings never share a tag
+        assert (await client.get("/servers/s2")).headers["ETag"] != response.headers["ETag"]
+        assert (await client.get("/servers/s1?page=2")).headers["ETag"] != response.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_without_counters_every_request_is_served(monkeypatch):
+    async def versions(names):
+        return None
+
+    monkeypatch.setattr(cache, "versions", versions)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/servers/s1", headers={"If-None-Match": "*"})
+        assert response.status_code == 200 and "ETag" not in response.headers
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+
+from app.core.instrumentation import UNMATCHED, InstrumentationMiddleware
+from app.utils.metrics import REQUEST_COUNT
+
+app = FastAPI()
+app.add_middleware(InstrumentationMiddleware, log_sample_rate=1.0)
+
+
+@app.get("/servers/{server_id}/channels")
+async def channels(server_id: str):
+    if server_id == "missing":
+        raise HTTPException(status_code=404)
+    return []
+
+
+def count(endpoint: str, status_code: int) -> float:
+    return REQUEST_COUNT.labels(method="GET", endpoint=endpoint, status_code=status_code)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_with_the_route_template():
+    template = "/servers/{server_id}/channels"
+    ok, missing, unmatched = count(template, 200), count(template, 404), count(UNMATCHED, 404)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.get("/servers/a1/channels")).status_code == 200
+        assert (await client.get("/servers/b2/channels?limit=5")).status_code == 200
+        assert (await client.get("/servers/missing/channels")).status_code == 404
+        assert (await client.get("/nowhere/123")).status_code == 404
+    assert count(template, 200) == ok + 2
+    assert count(template, 404) == missing + 1
+    assert count(UNMATCHED, 404) == unmatched + 1
+
+
+@pytest.mark.asyncio
+async def test_access_log_lines_carry_the_template_not_the_url(caplog):
+    caplog.set_level("INFO", logger="fastapi")
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/servers/secret-id/channels?token=abc")
+    line = caplog.records[-1].getMessage()
+    assert '"route":"/servers/{server_id}/channels"' in line and '"status":200' in line
+    assert "secret-id" not in line and "token" not in line
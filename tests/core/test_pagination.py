@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    values = (datetime.now(timezone.utc), uuid4(), 42)
+    assert decode_cursor("scope", encode_cursor("scope", values), 3) == values
+
+
+def test_missing_cursor_decodes_to_nulls():
+    assert decode_cursor("scope", None, 2) == (None, None)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("other", (1, 2)), encode_cursor("scope", (1,))])
+def test_invalid_cursor_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("scope", cursor, 2)
+    assert exc.value.status_code == 400
+
+
+def test_tampered_cursor_rejected():
+    cursor = encode_cursor("scope", (1, 2))
+    tampered = cursor[:-2] + ("A" if cursor[-2] != "A" else "B") + cursor[-1]
+    with pytest.raises(HTTPException):
+        decode_cursor("scope", tampered, 2)
+
+
+def test_paginate_sets_next_cursor_only_when_more_rows():
+    rows = [{"created_at": i, "id": i} for i in range(3)]
+    page, next_cursor = paginate("scope", rows, 2, ("created_at", "id"))
+    assert page == rows[:2]
+    assert decode_cursor("scope", next_cursor, 2) == (1, 1)
+    assert paginate("scope", rows, 3, ("created_at", "id")) == (rows, None)
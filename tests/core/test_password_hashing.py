@@ -0,0 +1,23 @@
+import pytest
+
+from app.core import auth
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_hash_round_trips_through_executor(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    hashed = await auth.get_password_hash("hunter2")
+    assert hashed.startswith("$2b$04$")
+    assert await auth.verify_password("hunter2", hashed)
+    assert not await auth.verify_password("hunter3", hashed)
+
+
+@pytest.mark.asyncio
+async def test_rehash_needed_only_when_cost_changes(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    hashed = await auth.get_password_hash("hunter2")
+    assert not auth.password_needs_rehash(hashed)
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    assert auth.password_needs_rehash(hashed)
+    assert auth.password_needs_rehash("not-a-bcrypt-hash")
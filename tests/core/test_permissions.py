@@ -0,0 +1,121 @@
+import uuid
+
+import pytest
+
+from app.core import cache, permissions
+from app.core.database import PRIMARY, DataBase
+from app.models.server import ServerIn
+from app.models.server_members import ServerMembers
+from app.models.server_role_permissions import ServerRolePermission
+from app.models.user import UserIn
+
+
+@pytest.mark.asyncio
+async def test_permission_names_map_to_distinct_bits():
+    view = await permissions.permission_mask(["VIEW_CHANNEL"])
+    send = await permissions.permission_mask(["SEND_MESSAGES"])
+    assert view and send and view & send == 0
+    assert await permissions.permission_mask(["VIEW_CHANNEL", "SEND_MESSAGES"]) == view | send
+    assert await permissions.permission_mask(["NOT_A_PERMISSION"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_owner_holds_every_permission(test_server):
+    assert await permissions.effective_permissions(test_server["owner_id"], test_server["id"]) == permissions.OWNER
+    assert await permissions.has_any(test_server["owner_id"], test_server["id"], ["MANAGE_ROLES"])
+    assert not await permissions.has_any(str(uuid.uuid4()), test_server["id"], ["MANAGE_ROLES"])
+
+
+@pytest.mark.asyncio
+async def test_invalidation_retires_cached_masks(test_server):
+    owner, server = str(test_server["owner_id"]), str(test_server["id"])
+    await permissions.effective_permissions(owner, server)
+    version = await cache.version(permissions._version_name(server))
+    assert permissions.local_masks.get((server, owner)) == (version, permissions.OWNER)
+    assert int(await permissions.redis_client.client.hget(permissions._redis_key(server, version), owner)) == -1
+
+    await permissions.invalidate_member(server, owner)
+    assert permissions.local_masks.get((server, owner)) is None
+    assert await cache.version(permissions._version_name(server)) == version + 1
+
+    await permissions.effective_permissions(owner, server)
+    await permissions.invalidate_server(server)
+    assert permissions.local_masks.get((server, owner)) is None
+
+
+@pytest.mark.asyncio
+async def test_compile_racing_an_invalidation_is_not_served(test_server, monkeypatch):
+    owner, server = str(test_server["owner_id"]), str(test_server["id"])
+    compile_mask = permissions._compile
+    compiles = []
+
+    async def compile_and_revoke(user_id, server_id):
+        compiles.append(user_id)
+        mask = await compile_mask(user_id, server_id)
+        if len(compiles) == 1:
+            # The ownership transfer commits and invalidates while this compile is in flight
+            await permissions.invalidate_server(server_id)
+        return mask
+
+    monkeypatch.setattr(permissions, "_compile", compile_and_revoke)
+    await permissions.effective_permissions(owner, server)
+    await permissions.effective_permissions(owner, server)
+    assert len(compiles) == 2
+    await permissions.effective_permissions(owner, server)
+    assert len(compiles) == 2
+
+
+@pytest.mark.asyncio
+async def test_compiles_read_from_the_primary(test_server, monkeypatch):
+    owner, server = str(test_server["owner_id"]), str(test_server["id"])
+    route = DataBase._route
+    routes = []
+
+    def record_route(query, requested):
+        routes.append(requested)
+        return route(query, requested)
+
+    monkeypatch.setattr(DataBase, "_route", record_route)
+    permissions.local_masks.clear()
+    await permissions.effective_permissions(owner, server)
+    await permissions.members_permissions(server, [str(uuid.uuid4())])
+    assert routes and set(routes) == {PRIMARY}
+
+
+@pytest.mark.asyncio
+async def test_batch_resolves_members_and_servers_in_order(test_server):
+    owner, server = str(test_server["owner_id"]), str(test_server["id"])
+    stranger = str(uuid.uuid4())
+    required = await permissions.permission_mask(["KICK_MEMBERS"])
+
+    members = await permissions.members_permissions(server, [stranger, owner])
+    assert members.ids == [stranger, owner]
+    assert list(members.masks) == [0, permissions.OWNER]
+    assert members.allowed(required) == [owner]
+
+    servers = await permissions.servers_permissions(owner, [server, str(uuid.uuid4())])
+    assert servers.allows(server, required)
+    assert servers.mask("not-in-batch") == 0
+
+
+def test_permission_masks_is_array_backed():
+    masks = permissions.PermissionMasks(["a", "b", "c"], [0b01, 0b10, permissions.OWNER])
+    assert masks.masks.typecode == "q"
+    assert masks.allowed(0b10) == ["b", "c"]
+    assert not masks.allows("a", 0b10)
+
+
+@pytest.mark.asyncio
+async def test_direct_grants_apply_only_in_their_server(test_server):
+    server = str(test_server["id"])
+    await ServerIn.create_server("otherserver", None, str(test_server["owner_id"]), True, None)
+    other = str(await DataBase.fetchval("SELECT id FROM servers WHERE name = 'otherserver'"))
+    await UserIn.create_user("member", "member@test.com", "memberpassword")
+    member = str(await DataBase.fetchval("SELECT id FROM users WHERE username = 'member'"))
+    await ServerMembers.add_member(member, server)
+    await ServerMembers.add_member(member, other)
+    kick = await DataBase.fetchval("SELECT id FROM server_permissions WHERE name = 'KICK_MEMBERS'")
+
+    await ServerRolePermission.assign_permission(server, member, [kick])
+    assert await permissions.has_any(member, server, ["KICK_MEMBERS"])
+    assert not await permissions.has_any(member, other, ["KICK_MEMBERS"])
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from app.core.pool_sizing import AdaptivePoolLimit
+
+
+@pytest.mark.asyncio
+async def test_limit_blocks_until_release():
+    limit = AdaptivePoolLimit(minimum=1, maximum=4, initial=1, target_wait=0.005)
+    await limit.acquire()
+    waiter = asyncio.create_task(limit.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    limit.release()
+    await asyncio.wait_for(waiter, 1)
+    assert limit.in_use == 1
+
+
+def test_limit_grows_on_slow_acquires_and_shrinks_when_idle():
+    limit = AdaptivePoolLimit(minimum=2, maximum=10, initial=4, target_wait=0.005)
+    for _ in range(100):
+        limit.record_wait(0.05)
+    assert limit.adjust() == 5
+    # A quiet window: no waits and nothing in use
+    assert limit.adjust() == 4
+    for _ in range(10):
+        limit.adjust()
+    assert limit.limit == 2
+
+
+def test_limit_stays_within_bounds():
+    limit = AdaptivePoolLimit(minimum=1, maximum=6, initial=6, target_wait=0.005)
+    limit.record_wait(1)
+    assert limit.adjust() == 6
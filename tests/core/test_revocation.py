@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import revocation
+
+
+async def wait_until_fresh():
+    for _ in range(100):
+        if revocation._fresh_until > time.monotonic():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("Revocation listener never became fresh")
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_redis_without_listener():
+    revocation._fresh_until = 0.0
+    now = int(time.time())
+    await revocation.revoke_access("user-a", now)
+    revocation._revoked.clear()
+    assert await revocation.access_revoked_at("user-a") == now
+
+
+@pytest.mark.asyncio
+async def test_listener_mirrors_existing_and_published_revocations():
+    now = int(time.time())
+    await revocation.redis_client.client.hset(revocation.REVOCATIONS_KEY, "user-b", now)
+    listener = asyncio.create_task(revocation.listen_for_revocations())
+    try:
+        await wait_until_fresh()
+        assert await revocation.access_revoked_at("user-b") == now
+
+        # Another process revoking: only the pub/sub message reaches this one
+        await revocation.redis_client.client.publish(revocation.REVOCATIONS_CHANNEL, f"user-c:{now}")
+        await asyncio.sleep(0.5)
+        assert await revocation.access_revoked_at("user-c") == now
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        revocation._fresh_until = 0.0
@@ -0,0 +1,41 @@
+import datetime
+import hashlib
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import auth, local_cache
+
+
+@pytest.mark.asyncio
+async def test_repeated_token_is_served_from_cache():
+    auth._decoded_tokens.clear()
+    token = auth.create_refresh_token({"sub": "alice", "id": "user-a"})
+    first = await auth.verify_token(token, "refresh")
+    assert len(auth._decoded_tokens) == 1
+    assert await auth.verify_token(token, "refresh") is first
+
+
+@pytest.mark.asyncio
+async def test_cached_token_still_checked_for_type():
+    auth._decoded_tokens.clear()
+    token = auth.create_refresh_token({"sub": "alice", "id": "user-a"})
+    await auth.verify_token(token, "refresh")
+    with pytest.raises(HTTPException) as exc:
+        await auth.verify_token(token, "sudo")
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_cache_entry_expires_with_token(monkeypatch):
+    auth._decoded_tokens.clear()
+    expire = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=30)
+    token = auth._create_token({"sub": "alice", "id": "user-a"}, expire, token_type="refresh")
+    await auth.verify_token(token, "refresh")
+    key = hashlib.sha256(token.encode()).digest()
+    assert auth._decoded_tokens.get(key) is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(local_cache.time, "monotonic", lambda: now + 31)
+    assert auth._decoded_tokens.get(key) is None
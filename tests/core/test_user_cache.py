@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+from asyncpg.pgproto.pgproto import UUID
+
+from app.core import cache, user_cache
+from app.core.database import PRIMARY
+from app.models.user import UserModel
+
+
+@pytest.mark.asyncio
+async def test_cold_miss_caches_only_model_fields(monkeypatch):
+    user_id = str(uuid.uuid4())
+
+    async def get_user(user_id, route=None):
+        # asyncpg hands back its own UUID type, which orjson cannot serialize
+        return {"id": UUID(user_id), "username": "cold", "email": "cold@test.com", "profile_picture_url": None,
+                "password": "$2b$12$hash"}  # fmt: skip
+
+    monkeypatch.setattr(UserModel, "get_user", get_user)
+
+    miss = await user_cache.get_user(user_id)
+    version = await cache.version(user_cache._version_name(user_id))
+    raw = await cache.redis_client.client.get(cache._key("user", f"{user_id}:{version}"))
+    assert "password" not in miss and "password" not in raw
+
+    hit = await user_cache.get_user(user_id)
+    assert hit == miss and str(hit["id"]) == user_id
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_served(monkeypatch):
+    user_id = str(uuid.uuid4())
+    names = iter(["before", "after"])
+
+    async def get_user(user_id, route=None):
+        assert route == PRIMARY
+        name = next(names)
+        if name == "before":
+            # The update commits and invalidates while this load is still in flight
+            await user_cache.invalidate(user_id)
+        return {"id": UUID(user_id), "username": name, "email": "race@test.com", "profile_picture_url": None}
+
+    monkeypatch.setattr(UserModel, "get_user", get_user)
+
+    assert (await user_cache.get_user(user_id))["username"] == "before"
+    assert (await user_cache.get_user(user_id))["username"] == "after"
+    assert (await user_cache.get_user(user_id))["username"] == "after"
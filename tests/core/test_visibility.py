@@ -0,0 +1,39 @@
+from app.core.visibility import ServerVisibility
+
+OWNER, MEMBER = "owner", "member"
+
+
+def build(assignments):
+    categories = [{"id": "general", "name": "general", "position": 1}, {"id": "staff", "name": "staff", "position": 2}]
+    channels = [
+        {"id": "lobby", "category_id": "general"},
+        {"id": "mods-only", "category_id": "general"},
+        {"id": "staff-chat", "category_id": "staff"},
+    ]
+    rows = [{"kind": kind, "target_id": target, "role_id": role} for kind, target, role in assignments]
+    return ServerVisibility({"id": "server", "owner_id": OWNER}, categories, channels, rows)
+
+
+def test_unassigned_categories_and_channels_are_open():
+    index = build([])
+    assert index.visible_categories(MEMBER, []) == {"general", "staff"}
+    assert index.visible_channels(MEMBER, []) == {"lobby", "mods-only", "staff-chat"}
+
+
+def test_restricted_entries_need_an_assigned_role():
+    index = build([("category", "staff", "staff-role"), ("channel", "mods-only", "mod-role")])
+    assert index.visible_categories(MEMBER, []) == {"general"}
+    assert index.visible_channels(MEMBER, []) == {"lobby"}
+    assert index.visible_channels(MEMBER, ["mod-role"]) == {"lobby", "mods-only"}
+    assert index.visible_channels(MEMBER, ["staff-role", "mod-role"]) == {"lobby", "mods-only", "staff-chat"}
+
+
+def test_channel_hidden_with_its_category():
+    index = build([("category", "staff", "staff-role"), ("channel", "staff-chat", "mod-role")])
+    assert index.visible_channels(MEMBER, ["mod-role"]) == {"lobby", "mods-only"}
+
+
+def test_owner_and_administrators_see_everything():
+    index = build([("category", "staff", "staff-role"), ("admin", None, "admin-role")])
+    assert index.visible_categories(OWNER, []) == {"general", "staff"}
+    assert index.visible_channels(MEMBER, ["admin-role"]) == {"lobby", "mods-only", "staff-chat"}